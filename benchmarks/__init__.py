@@ -0,0 +1,9 @@
+"""
+API benchmark suite.
+
+    python -m benchmarks --retailers 20000 --sodas 12
+
+Generates a seeded synthetic dataset in a throwaway test database (SQLite or Postgres, per
+DATABASE_URL), then requests every inventory route and reports latency percentiles, queries
+per request and throughput. Geocoding is stubbed; no request leaves the machine.
+"""
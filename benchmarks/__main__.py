@@ -0,0 +1,59 @@
+import argparse
+import os
+import time
+
+from decimal import Decimal
+from unittest.mock import patch
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Benchmark the inventory API.")
+    parser.add_argument('--retailers', type=int, default=10_000, help="Retailers to generate.")
+    parser.add_argument('--sodas', type=int, default=12, help="Sodas to generate (max 63).")
+    parser.add_argument('--sodas-per-retailer', type=float, default=3.0, help="Mean sodas stocked per retailer.")
+    parser.add_argument('--requests', type=int, default=200, help="Requests per route.")
+    parser.add_argument('--seed', type=int, default=0, help="Seed for the dataset and the request mix.")
+    parser.add_argument('--warm-cache', action='store_true',
+                        help="Keep the response cache between requests (default: measure uncached requests).")
+    parser.add_argument('--render-repeat', type=int, default=5,
+                        help="Times the full inventory is rendered per JSON renderer (0 to skip).")
+    parser.add_argument('--keepdb', action='store_true', help="Keep the benchmark database after the run.")
+    options = parser.parse_args()
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+    import django
+    django.setup()
+
+    from django.db import connection
+    from django.test.utils import setup_test_environment
+
+    from benchmarks.dataset import generate_dataset
+    from benchmarks.driver import build_routes, format_report, run_routes
+    from benchmarks.renderers import compare_renderers, format_renderer_report, serialized_inventory
+    from inventory.services.geocoding import GeocodingResult
+
+    setup_test_environment()
+    # a throwaway test database (test_<NAME>) on the configured server; development data is never touched
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=options.keepdb)
+    try:
+        started_at = time.perf_counter()
+        dataset = generate_dataset(options.retailers, options.sodas, options.sodas_per_retailer, options.seed)
+        print(f"Generated {dataset.retailer_count} retailers, {dataset.soda_count} sodas and "
+              f"{dataset.link_count} retailer-soda links in {time.perf_counter() - started_at:.1f}s "
+              f"on {connection.vendor}.\n")
+
+        stub_result = GeocodingResult(latitude=Decimal("37.7749"), longitude=Decimal("-122.4194"), postcode="94102")
+        with patch('inventory.services.geocoding.GeocodingService.geocode_address', return_value=stub_result):
+            results = run_routes(build_routes(), options.requests, options.seed, options.warm_cache)
+        print(format_report(results))
+
+        if options.render_repeat > 0:
+            print(f"\nRendering all {dataset.retailer_count} serialized retailers as JSON:\n")
+            print(format_renderer_report(compare_renderers(serialized_inventory(), options.render_repeat)))
+    finally:
+        if not options.keepdb:
+            connection.creation.destroy_test_db(connection.settings_dict['NAME'], verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
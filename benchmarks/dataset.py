@@ -0,0 +1,121 @@
+"""Seeded generator of a large, realistic-looking dataset of retailers and sodas."""
+
+import random
+
+from dataclasses import dataclass
+from decimal import Decimal
+from django.db import transaction
+
+from inventory.models import GeocodingStatus, Retailer, Soda
+from inventory.signals import retailers_bulk_changed
+from inventory.soda_mask import MAX_SODAS, mask_for_bits
+from inventory.spatial import encode_geohash
+
+# retailers cluster around city centres: (city, latitude, longitude, first postcode)
+CITIES = (
+    ("San Francisco", 37.7749, -122.4194, 94102),
+    ("Oakland", 37.8044, -122.2712, 94601),
+    ("New York", 40.7128, -74.0060, 10001),
+    ("Chicago", 41.8781, -87.6298, 60601),
+    ("Austin", 30.2672, -97.7431, 78701),
+    ("Seattle", 47.6062, -122.3321, 98101),
+)
+# standard deviation of the distance from the city centre, in degrees (~5km)
+CLUSTER_SPREAD_DEGREES = 0.045
+POSTCODES_PER_CITY = 40
+
+BATCH_SIZE = 2000
+
+
+@dataclass(frozen=True)
+class Dataset:
+    retailer_count: int
+    soda_count: int
+    link_count: int
+
+
+def generate_dataset(
+    retailer_count: int,
+    soda_count: int,
+    sodas_per_retailer: float = 3.0,
+    seed: int = 0,
+) -> Dataset:
+    """
+    Create soda_count sodas and retailer_count geocoded retailers, each stocking on average
+    sodas_per_retailer sodas. Popular sodas are stocked far more often than rare ones (Zipf-like
+    weights), as in real data. The same arguments always produce the same rows.
+    """
+
+    if not 0 < soda_count <= MAX_SODAS:
+        raise ValueError(f"soda_count must be between 1 and {MAX_SODAS}.")
+
+    rng = random.Random(seed)
+    with transaction.atomic():
+        sodas = _create_sodas(soda_count)
+        soda_weights = [1 / rank for rank in range(1, soda_count + 1)]
+
+        link_count = 0
+        for start in range(0, retailer_count, BATCH_SIZE):
+            numbers = range(start, min(start + BATCH_SIZE, retailer_count))
+            retailers, stocked = zip(*(_build_retailer(rng, number, sodas, soda_weights, sodas_per_retailer)
+                                       for number in numbers))
+            created = Retailer.objects.bulk_create(retailers)
+            link_count += _link_sodas(created, stocked)
+            # bulk_create bypasses the signals that invalidate cached responses and maintain availability rollups
+            retailers_bulk_changed.send(sender=Retailer, retailer_ids=[retailer.id for retailer in created])
+
+    return Dataset(retailer_count=retailer_count, soda_count=soda_count, link_count=link_count)
+
+
+def _create_sodas(soda_count: int) -> list[Soda]:
+    # created one by one so each gets its soda_mask bit (see inventory.signals)
+    return [
+        Soda.objects.create(name=f"Benchmark Soda {index}", abbreviation=_abbreviation(index), low_calorie=index % 2 == 0)
+        for index in range(soda_count)
+    ]
+
+
+def _abbreviation(index: int) -> str:
+    letters = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+    return letters[index // len(letters)] + letters[index % len(letters)]
+
+
+def _build_retailer(
+    rng: random.Random,
+    number: int,
+    sodas: list[Soda],
+    soda_weights: list[float],
+    sodas_per_retailer: float,
+) -> tuple[Retailer, list[Soda]]:
+    city, centre_lat, centre_lng, first_postcode = rng.choice(CITIES)
+    latitude = Decimal(f"{rng.gauss(centre_lat, CLUSTER_SPREAD_DEGREES):.7f}")
+    longitude = Decimal(f"{rng.gauss(centre_lng, CLUSTER_SPREAD_DEGREES):.7f}")
+
+    stocked_count = min(len(sodas), max(0, round(rng.expovariate(1 / sodas_per_retailer))))
+    stocked: set[Soda] = set()
+    while len(stocked) < stocked_count:
+        stocked.add(rng.choices(sodas, weights=soda_weights)[0])
+
+    retailer = Retailer(
+        name=f"Benchmark Retailer {number}",
+        street_address=f"{number} Benchmark Street",
+        city=city,
+        postcode=first_postcode + rng.randrange(POSTCODES_PER_CITY),
+        country="USA",
+        latitude=latitude,
+        longitude=longitude,
+        # bulk_create skips save() and its signals, so derived fields are set here
+        geohash=encode_geohash(latitude, longitude),
+        geocoding_status=GeocodingStatus.SUCCEEDED,
+        soda_mask=mask_for_bits(soda.bit_index for soda in stocked),
+    )
+    return retailer, sorted(stocked, key=lambda soda: soda.id)
+
+
+def _link_sodas(retailers: list[Retailer], stocked: tuple[list[Soda], ...]) -> int:
+    # SQLite and Postgres both return the new ids from bulk_create
+    Link = Retailer.sodas.through
+    links = [Link(retailer_id=retailer.pk, soda_id=soda.id)
+             for retailer, sodas in zip(retailers, stocked) for soda in sodas]
+    Link.objects.bulk_create(links)
+    return len(links)
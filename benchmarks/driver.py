@@ -0,0 +1,158 @@
+"""Requests every inventory route repeatedly and aggregates latency and query counts."""
+
+import json
+import math
+import random
+import time
+
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from inventory.models import Retailer, Soda
+from inventory.views import NEARBY_DEFAULT_RADIUS_KM
+
+# retailers per benchmarked bulk upsert
+BULK_BATCH_SIZE = 100
+
+
+@dataclass(frozen=True)
+class Route:
+    """A benchmarked request. build returns (url, JSON body or None) for one request."""
+
+    name: str
+    method: str
+    build: Callable[[random.Random], tuple[str, dict | list | None]]
+
+
+@dataclass
+class RouteResult:
+    route: Route
+    latencies: list[float] = field(default_factory=list)
+    query_counts: list[int] = field(default_factory=list)
+    errors: int = 0
+
+    def percentile_ms(self, percent: float) -> float:
+        """Nearest-rank percentile of the latencies, in milliseconds."""
+
+        ordered = sorted(self.latencies)
+        rank = max(1, math.ceil(percent / 100 * len(ordered)))
+        return ordered[rank - 1] * 1000
+
+    @property
+    def mean_queries(self) -> float:
+        return sum(self.query_counts) / len(self.query_counts)
+
+    @property
+    def throughput(self) -> float:
+        """Requests per second when requests are made back to back."""
+
+        return len(self.latencies) / sum(self.latencies)
+
+
+def build_routes() -> list[Route]:
+    """
+    One Route per endpoint in inventory/urls.py (and the main retailer list filters), using existing rows.
+    The event stream is left out: it holds its connection open and is only served over ASGI.
+    """
+
+    retailer_ids = list(Retailer.objects.values_list('id', flat=True))
+    soda_ids = list(Soda.objects.values_list('id', flat=True))
+    abbreviations = list(Soda.objects.order_by('id').values_list('abbreviation', flat=True))
+    postcodes = list(Retailer.objects.values_list('postcode', flat=True).distinct())
+    coordinates = [(float(lat), float(lng)) for lat, lng in Retailer.objects.values_list('latitude', 'longitude')[:1000]]
+    created = iter(range(10 ** 9))
+
+    def popular_sodas(rng: random.Random) -> str:
+        return ",".join(rng.sample(abbreviations[:4], k=min(2, len(abbreviations))))
+
+    def viewport(rng: random.Random) -> str:
+        latitude, longitude = rng.choice(coordinates)
+        return f"{longitude - 0.02:.4f},{latitude - 0.02:.4f},{longitude + 0.02:.4f},{latitude + 0.02:.4f}"
+
+    def new_retailer_data(rng: random.Random) -> dict:
+        number = next(created)
+        return {
+            "name": f"Benchmark New Retailer {number}",
+            "street_address": f"{number} New Benchmark Street",
+            "city": "San Francisco",
+            "postcode": 94107,
+            "sodas": [f"http://testserver/api/sodas/{soda_id}/" for soda_id in rng.sample(soda_ids, k=min(2, len(soda_ids)))],
+        }
+
+    def new_retailer(rng: random.Random) -> tuple[str, dict]:
+        return '/api/retailers/', new_retailer_data(rng)
+
+    def new_retailers(rng: random.Random) -> tuple[str, list]:
+        return '/api/retailers/bulk/', [new_retailer_data(rng) for _ in range(BULK_BATCH_SIZE)]
+
+    return [
+        Route('retailer-list', 'GET', lambda rng: ('/api/retailers/', None)),
+        Route('retailer-list ?postcode', 'GET', lambda rng: (f'/api/retailers/?postcode={rng.choice(postcodes)}', None)),
+        Route('retailer-list ?sodas', 'GET', lambda rng: (f'/api/retailers/?sodas={popular_sodas(rng)}', None)),
+        Route('retailer-list ?sodas&match=any', 'GET',
+              lambda rng: (f'/api/retailers/?sodas={popular_sodas(rng)}&match=any', None)),
+        Route('retailer-list ?format=columnar', 'GET', lambda rng: ('/api/retailers/?format=columnar', None)),
+        Route('retailer-list ?bbox', 'GET', lambda rng: (f'/api/retailers/?bbox={viewport(rng)}', None)),
+        Route('retailer-nearby', 'GET', lambda rng: (
+            '/api/retailers/nearby/?lat={}&lng={}&radius_km={}'.format(
+                *rng.choice(coordinates), NEARBY_DEFAULT_RADIUS_KM), None)),
+        Route('retailer-changes', 'GET', lambda rng: ('/api/retailers/changes/', None)),
+        Route('retailer-detail', 'GET', lambda rng: (f'/api/retailers/{rng.choice(retailer_ids)}/', None)),
+        Route('retailer-create', 'POST', new_retailer),
+        Route(f'retailer-bulk ({BULK_BATCH_SIZE} new)', 'POST', new_retailers),
+        Route('retailer-export', 'GET', lambda rng: ('/api/retailers/export/', None)),
+        Route('retailer-export ?format=csv', 'GET', lambda rng: ('/api/retailers/export/?format=csv', None)),
+        Route('sodas_by_retailer', 'GET', lambda rng: (f'/api/retailers/{rng.choice(retailer_ids)}/sodas/', None)),
+        Route('availability ?postcode', 'GET', lambda rng: (f'/api/availability/?postcode={rng.choice(postcodes)}', None)),
+        Route('soda-list', 'GET', lambda rng: ('/api/sodas/', None)),
+        Route('soda-detail', 'GET', lambda rng: (f'/api/sodas/{rng.choice(soda_ids)}/', None)),
+        Route('retailers_by_sodas', 'GET', lambda rng: (f'/api/sodas/{rng.choice(soda_ids)}/retailers/', None)),
+    ]
+
+
+def run_routes(routes: list[Route], requests_per_route: int, seed: int = 0, warm_cache: bool = False) -> list[RouteResult]:
+    """
+    Make requests_per_route requests to each route. The response cache is only used if warm_cache
+    is set (it is valid here, in a single process); otherwise the database and serializers are measured.
+    """
+
+    rng = random.Random(seed)
+    client = Client()
+    results = []
+    with override_settings(INVENTORY_RESPONSE_CACHE_ENABLED=warm_cache):
+        for route in routes:
+            result = RouteResult(route)
+            for _ in range(requests_per_route):
+                url, body = route.build(rng)
+
+                with CaptureQueriesContext(connection) as context:
+                    started_at = time.perf_counter()
+                    if route.method == 'POST':
+                        response = client.post(url, data=json.dumps(body), content_type='application/json')
+                    else:
+                        response = client.get(url)
+                    if response.streaming:
+                        # a streamed body (the export) is only produced as it is read
+                        b''.join(response.streaming_content)
+                    result.latencies.append(time.perf_counter() - started_at)
+
+                result.query_counts.append(len(context.captured_queries))
+                if response.status_code >= 400:
+                    result.errors += 1
+            results.append(result)
+    return results
+
+
+def format_report(results: list[RouteResult]) -> str:
+    header = f"{'route':<34} {'n':>5} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'queries':>8} {'req/s':>8} {'errors':>6}"
+    lines = [header, "-" * len(header)]
+    for result in results:
+        lines.append(
+            f"{result.route.name:<34} {len(result.latencies):>5} "
+            f"{result.percentile_ms(50):>8.2f} {result.percentile_ms(95):>8.2f} {result.percentile_ms(99):>8.2f} "
+            f"{result.mean_queries:>8.1f} {result.throughput:>8.1f} {result.errors:>6}"
+        )
+    return "\n".join(lines)
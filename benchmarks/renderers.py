@@ -0,0 +1,64 @@
+"""Times JSON rendering of the full serialized inventory with rest_framework's renderer and the API's default one."""
+
+import statistics
+import time
+
+from dataclasses import dataclass
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from inventory.models import Retailer, Soda
+from inventory.renderers import FastJSONRenderer
+from inventory.serializers import RetailerSerializer
+
+
+@dataclass
+class RendererResult:
+    name: str
+    timings: list[float]
+    size: int
+    # whether the output is byte-identical to rest_framework's JSONRenderer
+    identical: bool
+
+    @property
+    def median_ms(self) -> float:
+        return statistics.median(self.timings) * 1000
+
+
+def serialized_inventory() -> list[dict]:
+    """Every retailer as the API serializes it: Decimal coordinates, datetimes and soda hyperlinks."""
+
+    request = Request(APIRequestFactory().get('/api/retailers/'))
+    retailers = Retailer.objects.prefetch_related('sodas').order_by('id')
+    return RetailerSerializer(retailers, many=True, context={'request': request}).data
+
+
+def compare_renderers(data: object, repeat: int = 5) -> list[RendererResult]:
+    renderers: list[tuple[str, BaseRenderer]] = [
+        ('rest_framework JSONRenderer', JSONRenderer()),
+        ('FastJSONRenderer', FastJSONRenderer()),
+    ]
+    reference = renderers[0][1].render(data, 'application/json')
+
+    results = []
+    for name, renderer in renderers:
+        timings = []
+        for _ in range(repeat):
+            started_at = time.perf_counter()
+            rendered = renderer.render(data, 'application/json')
+            timings.append(time.perf_counter() - started_at)
+        results.append(RendererResult(name, timings, len(rendered), rendered == reference))
+    return results
+
+
+def format_renderer_report(results: list[RendererResult]) -> str:
+    header = f"{'renderer':<34} {'median ms':>10} {'MB':>8} {'speedup':>8} {'identical':>9}"
+    lines = [header, "-" * len(header)]
+    baseline = results[0].median_ms
+    for result in results:
+        lines.append(
+            f"{result.name:<34} {result.median_ms:>10.2f} {result.size / 1e6:>8.2f} "
+            f"{baseline / result.median_ms:>7.2f}x {str(result.identical):>9}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,20 @@
+"""
+ASGI config for config project.
+
+It exposes the ASGI callable as a module-level variable named ``application``. The web process serves it
+with gunicorn's uvicorn worker (see Procfile), so long-lived connections such as /api/retailers/events/
+do not hold a worker.
+
+For more information on this file, see
+https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
+"""
+
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+# each ASGI request runs in its own thread, so persistent connections would pile up rather than be reused
+os.environ.setdefault("DATABASE_CONN_MAX_AGE", "0")
+
+application = get_asgi_application()
@@ -30,6 +30,9 @@ DEBUG = os.environ.get('DEBUG', 'True').lower() in ['true', '1', 'yes']
 
 GOOGLEMAPS_KEY = os.environ.get('GOOGLEMAPS_KEY', '')
 
+# Max keep-alive connections to Google Maps held open per process (shared by all geocoding threads)
+GEOCODING_HTTP_POOL_SIZE = int(os.environ.get('GEOCODING_HTTP_POOL_SIZE', '10'))
+
 SECRET_KEY = os.environ.get('SECRET_KEY', 'django-insecure-dev-key-only-for-local-development-do-not-use-in-production')
 
 if os.environ.get('DATABASE_URL') and not os.environ.get('SECRET_KEY'):
@@ -60,6 +63,7 @@ INSTALLED_APPS = [
 DEFAULT_AUTO_FIELD = 'django.db.models.AutoField'
 
 MIDDLEWARE = [
+    'inventory.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -107,8 +111,47 @@ DATABASES = {
 
 # If DATABASE_URL environment variable is detected, its value will overwrite default configuration above.
 # NB: Heroku (production environment) automatically sets DATABASE_URL.
+# DATABASE_CONN_MAX_AGE=0 closes connections after each request; config/asgi.py sets it (see there).
 if os.environ.get('DATABASE_URL'):
-    DATABASES['default'].update(dj_database_url.config(conn_max_age=500))  # type: ignore[arg-type]
+    conn_max_age = int(os.environ.get('DATABASE_CONN_MAX_AGE', '500'))
+    DATABASES['default'].update(dj_database_url.config(conn_max_age=conn_max_age))  # type: ignore[arg-type]
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# Read endpoints cache their responses here (see inventory/caching.py). Invalidation relies on a generation
+# counter stored in this cache, so responses are only cached in a backend shared by every process: set REDIS_URL.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    }
+}
+
+if os.environ.get('REDIS_URL'):
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ['REDIS_URL'],
+    }
+
+# With the per-process local-memory cache a write would only invalidate its own process's responses
+INVENTORY_RESPONSE_CACHE_ENABLED = bool(os.environ.get('REDIS_URL'))
+
+# Upper bound on how long a cached API response is served (writes invalidate it sooner)
+INVENTORY_RESPONSE_CACHE_TIMEOUT = int(os.environ.get('INVENTORY_RESPONSE_CACHE_TIMEOUT', '300'))
+
+# The retailer change feed only reports rows this old, so transactions in flight can commit first (see inventory.changes)
+INVENTORY_CHANGES_SETTLE_SECONDS = float(os.environ.get('INVENTORY_CHANGES_SETTLE_SECONDS', '2'))
+
+REST_FRAMEWORK = {
+    # the browsable API is a development tool; production serves JSON only
+    'DEFAULT_RENDERER_CLASSES': ['inventory.renderers.FastJSONRenderer'] + (
+        ['rest_framework.renderers.BrowsableAPIRenderer'] if DEBUG else []
+    ),
+}
+
+# Addresses allowed to scrape /metrics (Prometheus text format); comma-separated
+METRICS_ALLOWED_IPS = os.environ.get('METRICS_ALLOWED_IPS', '127.0.0.1,::1').split(',')
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -2,11 +2,13 @@ from django.contrib import admin
 from django.urls import path, include
 
 from inventory import urls as inventory_urls
+from inventory.metrics import metrics_view
 
 from . import views
 
 urlpatterns = [
     path('api/', include(inventory_urls)),
     path('admin/', admin.site.urls),
+    path('metrics', metrics_view, name='metrics'),
     path('', views.index, name='index'), # landing page
 ]
\ No newline at end of file
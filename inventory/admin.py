@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import Retailer, Soda
+from .models import GeocodingJob, Retailer, Soda
 
 admin.site.register(Retailer)
-admin.site.register(Soda)
\ No newline at end of file
+admin.site.register(Soda)
+admin.site.register(GeocodingJob)
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class InventoryConfig(AppConfig):
     name: str = 'inventory'
+
+    def ready(self) -> None:
+        from . import signals  # noqa: F401 (registers signal receivers)
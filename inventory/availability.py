@@ -0,0 +1,117 @@
+"""
+Retailer counts per soda at the postcode, city and country levels (AvailabilityRollup).
+
+Rollups are maintained incrementally. RetailerAvailability records what each retailer is currently
+counted with (its location and soda_mask). After any write, sync_availability compares that with
+the retailer's row and applies only the difference to the rollups, as relative
+`retailer_count = retailer_count + delta` updates. Saves, deletions, membership changes and bulk
+writes all go through it (see inventory.signals), so no write path needs a retailer's previous values.
+"""
+
+from collections import Counter, defaultdict
+from collections.abc import Iterable
+from django.db import transaction
+from django.db.models import F
+
+from .models import AvailabilityRollup, Retailer, RetailerAvailability, Soda
+from .soda_mask import bits_in_mask
+
+# columns of a retailer that its contribution to the rollups depends on
+COUNTED_FIELDS = ('postcode', 'city', 'country', 'soda_mask')
+
+Level = AvailabilityRollup.Level
+# (level, key, soda bit index)
+Contribution = tuple[str, str, int]
+
+
+def contributions(postcode: int | None, city: str, country: str, soda_mask: int) -> set[Contribution]:
+    """The rollup entries a retailer adds one to. A blank postcode, city or country is not counted."""
+
+    keys = [(Level.POSTCODE, '' if postcode is None else str(postcode)), (Level.CITY, city), (Level.COUNTRY, country)]
+    bits = bits_in_mask(soda_mask)
+    return {(level, key, bit) for level, key in keys if key for bit in bits}
+
+
+def sync_availability(retailer_ids: Iterable[int]) -> None:
+    """Bring the rollups up to date with the current rows (or absence) of the given retailers."""
+
+    retailer_ids = set(retailer_ids)
+    if not retailer_ids:
+        return
+
+    with transaction.atomic():
+        # locking the counted rows keeps concurrent syncs of a retailer from applying its change twice
+        counted = {values[0]: values[1:] for values in (RetailerAvailability.objects
+                                                        .select_for_update()
+                                                        .filter(retailer_id__in=retailer_ids)
+                                                        .values_list('retailer_id', *COUNTED_FIELDS))}
+        current = {values[0]: values[1:] for values in (Retailer.objects
+                                                        .filter(id__in=retailer_ids)
+                                                        .values_list('id', *COUNTED_FIELDS))}
+
+        deltas: Counter[Contribution] = Counter()
+        changed = []
+        for retailer_id in retailer_ids:
+            before, after = counted.get(retailer_id), current.get(retailer_id)
+            if before == after:
+                continue
+            changed.append(retailer_id)
+            before_set = contributions(*before) if before else set()
+            after_set = contributions(*after) if after else set()
+            deltas.update(after_set - before_set)
+            deltas.subtract(before_set - after_set)
+
+        if not changed:
+            return
+
+        _apply_deltas(deltas)
+
+        RetailerAvailability.objects.filter(retailer_id__in=[id_ for id_ in changed if id_ not in current]).delete()
+        RetailerAvailability.objects.bulk_create(
+            [RetailerAvailability(retailer_id, *current[retailer_id]) for retailer_id in changed if retailer_id in current],
+            update_conflicts=True,
+            unique_fields=['retailer_id'],
+            update_fields=list(COUNTED_FIELDS),
+        )
+
+
+def retailer_ids_counted_with_bit(bit_index: int) -> list[int]:
+    """Retailers counted as stocking the soda with this bit."""
+
+    bit = 1 << bit_index
+    return list(RetailerAvailability.objects
+                .alias(soda_bit=F('soda_mask').bitand(bit))
+                .filter(soda_bit=bit)
+                .values_list('retailer_id', flat=True))
+
+
+def forget_soda_bit(bit_index: int) -> None:
+    """For a deleted soda, whose rollups are deleted with it: stop counting retailers with its bit."""
+
+    bit = 1 << bit_index
+    (RetailerAvailability.objects
+     .alias(soda_bit=F('soda_mask').bitand(bit))
+     .filter(soda_bit=bit)
+     .update(soda_mask=F('soda_mask').bitand(~bit)))
+
+
+def _apply_deltas(deltas: Counter[Contribution]) -> None:
+    soda_id_by_bit = dict(Soda.objects.exclude(bit_index__isnull=True).values_list('bit_index', 'id'))
+
+    # one UPDATE per (level, soda, delta) however many keys it covers
+    keys_by_update: defaultdict[tuple[str, int, int], list[str]] = defaultdict(list)
+    new_rollups = []
+    for (level, key, bit), delta in deltas.items():
+        soda_id = soda_id_by_bit.get(bit)
+        if delta == 0 or soda_id is None:
+            continue
+        keys_by_update[(level, soda_id, delta)].append(key)
+        if delta > 0:
+            new_rollups.append(AvailabilityRollup(level=level, key=key, soda_id=soda_id))
+
+    # rows missing for an increment are created at 0 first, so every change is a relative update
+    AvailabilityRollup.objects.bulk_create(new_rollups, ignore_conflicts=True)
+    for (level, soda_id, delta), keys in keys_by_update.items():
+        (AvailabilityRollup.objects
+         .filter(level=level, soda_id=soda_id, key__in=keys)
+         .update(retailer_count=F('retailer_count') + delta))
@@ -0,0 +1,147 @@
+"""
+Response cache for read endpoints.
+
+Cache keys embed a global generation number. Every write to a Retailer, a Soda or their
+relation bumps the generation when its transaction commits (see inventory.signals), which
+invalidates all cached responses in O(1) without tracking which keys depend on which rows;
+stale entries simply age out.
+
+The generation must live in a cache shared by all processes (see CACHES in settings). With the
+default local-memory cache each process would only see its own writes, so nothing is cached unless
+INVENTORY_RESPONSE_CACHE_ENABLED is set (it is whenever REDIS_URL is).
+"""
+
+import functools
+import hashlib
+import time
+
+from collections.abc import Callable
+from typing import TypeVar
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+GENERATION_KEY = 'inventory:generation'
+RESPONSE_KEY_PREFIX = 'inventory:response'
+VALUE_KEY_PREFIX = 'inventory:value'
+
+# a worker rebuilding a hot key holds its lock at most this long
+REBUILD_LOCK_TIMEOUT = 30  # seconds
+# other workers wait this long for the rebuilt value before building it themselves
+REBUILD_WAIT_TIMEOUT = 5  # seconds
+REBUILD_POLL_INTERVAL = 0.05  # seconds
+
+T = TypeVar('T')
+
+
+def get_generation() -> int:
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        # start from the clock (not 0) so a cache restart never reuses generations of older entries
+        cache.add(GENERATION_KEY, time.time_ns(), timeout=None)
+        generation = cache.get(GENERATION_KEY)
+    return generation
+
+
+def bump_generation() -> None:
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        # key was evicted; a fresh clock-based generation is newer than any previous one
+        cache.add(GENERATION_KEY, time.time_ns(), timeout=None)
+
+
+def cached_response(request: Request, build_response: Callable[[], Response]) -> Response:
+    """
+    Return the cached response data for this request, or build, cache and return it.
+
+    Only one worker rebuilds a missing key at a time; the others wait briefly for its result
+    instead of all querying the database at once.
+    """
+
+    if not settings.INVENTORY_RESPONSE_CACHE_ENABLED:
+        return build_response()
+
+    key = _response_key(request)
+    cached = cache.get(key)
+    if cached is not None:
+        return _to_response(cached)
+
+    lock_key = f"{key}:lock"
+    if cache.add(lock_key, 1, timeout=REBUILD_LOCK_TIMEOUT):
+        try:
+            return _build_and_store(key, build_response)
+        finally:
+            cache.delete(lock_key)
+
+    deadline = time.monotonic() + REBUILD_WAIT_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(REBUILD_POLL_INTERVAL)
+        cached = cache.get(key)
+        if cached is not None:
+            return _to_response(cached)
+
+    # the rebuilding worker is slow or died; serve this request without waiting any longer
+    return build_response()
+
+
+def cached_request_value(request: Request, namespace: str, compute: Callable[[], T]) -> T:
+    """
+    Return a value derived from the database for this request (e.g. response validators), cached
+    until the next write like responses are. None is returned as is and not cached.
+    """
+
+    if not settings.INVENTORY_RESPONSE_CACHE_ENABLED:
+        return compute()
+
+    key = _request_key(request, f"{VALUE_KEY_PREFIX}:{namespace}")
+    value = cache.get(key)
+    if value is None:
+        value = compute()
+        if value is not None:
+            cache.set(key, value, timeout=settings.INVENTORY_RESPONSE_CACHE_TIMEOUT)
+    return value
+
+
+def cache_read_response(view_func: Callable[..., Response]) -> Callable[..., Response]:
+    """Decorator for function-based read views; apply below @api_view."""
+
+    @functools.wraps(view_func)
+    def wrapper(request: Request, *args, **kwargs) -> Response:
+        return cached_response(request, lambda: view_func(request, *args, **kwargs))
+
+    return wrapper
+
+
+class CachedReadMixin:
+    """ViewSet mixin that serves list and retrieve through the response cache."""
+
+    def list(self, request: Request, *args, **kwargs) -> Response:
+        return cached_response(request, lambda: super(CachedReadMixin, self).list(request, *args, **kwargs))
+
+    def retrieve(self, request: Request, *args, **kwargs) -> Response:
+        return cached_response(request, lambda: super(CachedReadMixin, self).retrieve(request, *args, **kwargs))
+
+
+def _response_key(request: Request) -> str:
+    return _request_key(request, RESPONSE_KEY_PREFIX)
+
+
+def _request_key(request: Request, prefix: str) -> str:
+    # host and scheme are part of the key because hyperlinks in the response are absolute
+    url = request.build_absolute_uri()
+    digest = hashlib.sha256(url.encode()).hexdigest()
+    return f"{prefix}:{get_generation()}:{digest}"
+
+
+def _build_and_store(key: str, build_response: Callable[[], Response]) -> Response:
+    response = build_response()
+    if response.status_code == 200:
+        cache.set(key, (response.status_code, response.data), timeout=settings.INVENTORY_RESPONSE_CACHE_TIMEOUT)
+    return response
+
+
+def _to_response(cached: tuple[int, object]) -> Response:
+    status_code, data = cached
+    return Response(data, status=status_code)
@@ -0,0 +1,159 @@
+"""
+Incremental change feed for clients that keep a local replica of the retailers.
+
+GET /api/retailers/changes/?since=<cursor> returns the retailers created or updated, and the ids of
+retailers deleted (recorded as RetailerTombstone rows), since the cursor. Both are read as keyset
+scans on (timestamp, id) indexes, and the opaque cursor records the position reached in each.
+
+A row is only reported once it is INVENTORY_CHANGES_SETTLE_SECONDS old. A transaction that commits
+late can write a timestamp older than rows a client has already read past, and the window gives it
+time to commit before the feed moves beyond that timestamp. Two rules keep every write inside it:
+
+- Every change is stamped by the same clock, the application's timezone.now() (as auto_now fields
+  are), never the database's now(), which is the transaction's start time on PostgreSQL.
+- Writes that run longer than the window, such as bulk imports, restamp their rows with
+  stamp_changes as the last statement before they commit.
+"""
+
+import base64
+import binascii
+import json
+
+from collections.abc import Iterable
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from django.conf import settings
+from django.db.models import Q, QuerySet
+from django.utils import timezone
+
+from .models import Retailer, RetailerTombstone
+
+
+@dataclass(frozen=True)
+class Position:
+    """The (timestamp, id) of the last row read from one stream."""
+
+    timestamp: datetime
+    id: int
+
+
+@dataclass(frozen=True)
+class ChangeCursor:
+    # None: from the beginning of the stream
+    retailers: Position | None = None
+    tombstones: Position | None = None
+
+    def encode(self) -> str:
+        positions = [[position.timestamp.isoformat(), position.id] if position else None
+                     for position in (self.retailers, self.tombstones)]
+        return base64.urlsafe_b64encode(json.dumps(positions, separators=(',', ':')).encode()).decode()
+
+    @classmethod
+    def decode(cls, raw_cursor: str) -> 'ChangeCursor':
+        """Raises ValueError if raw_cursor was not made by encode."""
+
+        try:
+            positions = json.loads(base64.urlsafe_b64decode(raw_cursor.encode()))
+            retailers, tombstones = (
+                Position(datetime.fromisoformat(position[0]), int(position[1])) if position is not None else None
+                for position in positions
+            )
+        except (binascii.Error, UnicodeError, json.JSONDecodeError, TypeError, IndexError, ValueError):
+            raise ValueError(f"Invalid change feed cursor: {raw_cursor!r}")
+        return cls(retailers=retailers, tombstones=tombstones)
+
+
+@dataclass
+class ChangePage:
+    # `.values()` rows of retailers created or updated
+    rows: list[dict]
+    deleted_ids: list[int]
+    cursor: ChangeCursor
+    # True if more changes are available now; request the next page at once
+    has_more: bool
+
+
+def initial_cursor() -> ChangeCursor:
+    """
+    Cursor for a client without a replica: every retailer is a change, but deletions from before
+    the first page are not, since the client never saw those retailers.
+    """
+
+    latest_tombstone = (RetailerTombstone.objects
+                        .order_by('-timestamp_deleted', '-id')
+                        .values_list('timestamp_deleted', 'id')
+                        .first())
+    return ChangeCursor(tombstones=Position(*latest_tombstone) if latest_tombstone else None)
+
+
+def latest_cursor() -> ChangeCursor:
+    """Cursor past every settled change: reading from it returns only changes made from now on."""
+
+    settled_before = _settled_before()
+    latest_retailer = (Retailer.objects
+                       .filter(timestamp_last_updated__lte=settled_before)
+                       .order_by('-timestamp_last_updated', '-id')
+                       .values_list('timestamp_last_updated', 'id')
+                       .first())
+    latest_tombstone = (RetailerTombstone.objects
+                        .filter(timestamp_deleted__lte=settled_before)
+                        .order_by('-timestamp_deleted', '-id')
+                        .values_list('timestamp_deleted', 'id')
+                        .first())
+    return ChangeCursor(
+        retailers=Position(*latest_retailer) if latest_retailer else None,
+        tombstones=Position(*latest_tombstone) if latest_tombstone else None,
+    )
+
+
+def read_changes(cursor: ChangeCursor, limit: int, columns: list[str]) -> ChangePage:
+    """
+    Read up to limit changed retailers (as `.values(*columns)` rows) and up to limit deletions after cursor.
+    """
+
+    settled_before = _settled_before()
+
+    retailers = _after(Retailer.objects.all(), 'timestamp_last_updated', cursor.retailers)
+    rows = list(retailers
+                .filter(timestamp_last_updated__lte=settled_before)
+                .order_by('timestamp_last_updated', 'id')
+                .values(*dict.fromkeys([*columns, 'id', 'timestamp_last_updated']))[:limit + 1])
+
+    tombstones = _after(RetailerTombstone.objects.all(), 'timestamp_deleted', cursor.tombstones)
+    deletions = list(tombstones
+                     .filter(timestamp_deleted__lte=settled_before)
+                     .order_by('timestamp_deleted', 'id')
+                     .values_list('timestamp_deleted', 'id', 'retailer_id')[:limit + 1])
+
+    has_more = len(rows) > limit or len(deletions) > limit
+    rows, deletions = rows[:limit], deletions[:limit]
+
+    next_cursor = ChangeCursor(
+        retailers=Position(rows[-1]['timestamp_last_updated'], rows[-1]['id']) if rows else cursor.retailers,
+        tombstones=Position(*deletions[-1][:2]) if deletions else cursor.tombstones,
+    )
+    return ChangePage(rows=rows, deleted_ids=[retailer_id for _, _, retailer_id in deletions],
+                      cursor=next_cursor, has_more=has_more)
+
+
+def stamp_changes(retailer_ids: Iterable[int]) -> None:
+    """
+    Mark retailers written earlier in the current transaction as changed now. Called last before the
+    commit, it keeps a long transaction from committing rows stamped when it started, which a client
+    may already have read past.
+    """
+
+    Retailer.objects.filter(id__in=list(retailer_ids)).update(timestamp_last_updated=timezone.now())
+
+
+def _settled_before() -> datetime:
+    return timezone.now() - timedelta(seconds=settings.INVENTORY_CHANGES_SETTLE_SECONDS)
+
+
+def _after(queryset: QuerySet, timestamp_field: str, position: Position | None) -> QuerySet:
+    if position is None:
+        return queryset
+    return queryset.filter(
+        Q(**{f'{timestamp_field}__gt': position.timestamp})
+        | Q(**{timestamp_field: position.timestamp, 'id__gt': position.id})
+    )
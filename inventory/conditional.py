@@ -0,0 +1,155 @@
+"""
+Conditional GET for read endpoints.
+
+Validators (ETag, and Last-Modified for single rows) are computed with one cheap query and
+cached until the next write, like responses. A client that already holds the current representation gets a 304
+before the main query or serialization run, so polling clients re-download only what changed.
+"""
+
+import hashlib
+
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass
+from datetime import datetime
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Count, Max, QuerySet
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+from .caching import cached_request_value
+
+
+@dataclass(frozen=True)
+class Validators:
+    etag: str
+    last_modified: datetime | None = None
+
+
+def timestamp_validators(request: Request, queryset: QuerySet, timestamp_field: str = 'timestamp_last_updated') -> Validators:
+    """
+    Validators for the rows of a (filtered) queryset from their newest timestamp and their count.
+    The count catches deletions, which leave no newer timestamp behind. There is no Last-Modified:
+    deleting a row, or moving one out of the filter, changes the list without moving the newest
+    timestamp, so If-Modified-Since alone would be answered with a stale 304.
+    """
+
+    aggregates = queryset.order_by().aggregate(last_modified=Max(timestamp_field), count=Count('pk'))
+    last_modified = aggregates['last_modified']
+    version = f"{last_modified.isoformat() if last_modified else ''}:{aggregates['count']}"
+    return Validators(etag=_etag(request, version))
+
+
+def row_validators(request: Request, last_modified: datetime) -> Validators:
+    """Validators for a single row from its timestamp."""
+
+    return Validators(etag=_etag(request, last_modified.isoformat()), last_modified=last_modified)
+
+
+def content_validators(request: Request, rows: Iterable[tuple]) -> Validators:
+    """Validators for rows without a timestamp: the ETag hashes their values."""
+
+    return Validators(etag=_etag(request, repr(list(rows))))
+
+
+def combined_validators(request: Request, *parts: Validators) -> Validators:
+    """
+    Validators for a representation built from several sources. There is no Last-Modified, since a
+    source validated by content can change without moving it.
+    """
+
+    return Validators(etag=_etag(request, "|".join(part.etag for part in parts)))
+
+
+def conditional_response(
+    request: Request,
+    validators: Validators | None,
+    build_response: Callable[[], Response],
+) -> Response:
+    """
+    Answer If-None-Match / If-Modified-Since with 304 when the validators match, otherwise build
+    the response and attach the validators to it. Without validators (e.g. a missing object) the
+    response is built as usual.
+    """
+
+    if validators is None:
+        return build_response()
+
+    last_modified = int(validators.last_modified.timestamp()) if validators.last_modified else None
+    not_modified = get_conditional_response(request, etag=validators.etag, last_modified=last_modified)
+    if not_modified is not None:
+        _set_validator_headers(not_modified, validators)
+        return not_modified
+
+    response = build_response()
+    if response.status_code == 200:
+        _set_validator_headers(response, validators)
+    return response
+
+
+class ConditionalGetMixin:
+    """
+    ViewSet mixin that answers list and retrieve conditionally.
+    Place it before CachedReadMixin so a 304 skips the response cache too.
+
+    By default the validators come from the rows' `timestamp_field`; override get_list_validators
+    and get_detail_validators for models without one.
+    """
+
+    timestamp_field = 'timestamp_last_updated'
+
+    def get_list_validators(self, request: Request) -> Validators | None:
+        return timestamp_validators(request, self.filter_queryset(self.get_queryset()), self.timestamp_field)
+
+    def get_detail_validators(self, request: Request) -> Validators | None:
+        """None for a missing object, so retrieve answers with its usual 404."""
+
+        last_modified = self.get_lookup_queryset().values_list(self.timestamp_field, flat=True).first()
+        return row_validators(request, last_modified) if last_modified else None
+
+    def get_lookup_queryset(self) -> QuerySet:
+        """The (filtered) queryset narrowed to the object retrieve would return; empty if the lookup is malformed."""
+
+        queryset = self.filter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            return queryset.filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        except (TypeError, ValueError, DjangoValidationError):
+            return queryset.none()
+
+    def list(self, request: Request, *args, **kwargs) -> Response:
+        return conditional_response(
+            request,
+            self._cached_validators(request, 'list', self.get_list_validators),
+            lambda: super(ConditionalGetMixin, self).list(request, *args, **kwargs),
+        )
+
+    def retrieve(self, request: Request, *args, **kwargs) -> Response:
+        return conditional_response(
+            request,
+            self._cached_validators(request, 'detail', self.get_detail_validators),
+            lambda: super(ConditionalGetMixin, self).retrieve(request, *args, **kwargs),
+        )
+
+    def _cached_validators(
+        self,
+        request: Request,
+        kind: str,
+        get_validators: Callable[[Request], Validators | None],
+    ) -> Validators | None:
+        # validators are cached like responses, so a poll answered from the cache runs no query at all
+        namespace = f"validators:{kind}:{request.accepted_media_type}"
+        return cached_request_value(request, namespace, lambda: get_validators(request))
+
+
+def _etag(request: Request, version: str) -> str:
+    # the URL (filters, page cursor) and media type (JSON vs browsable API) identify the representation
+    identity = f"{request.get_full_path()}|{request.accepted_media_type}|{version}"
+    return f'"{hashlib.sha256(identity.encode()).hexdigest()[:32]}"'
+
+
+def _set_validator_headers(response, validators: Validators) -> None:
+    response['ETag'] = validators.etag
+    if validators.last_modified is not None:
+        response['Last-Modified'] = http_date(validators.last_modified.timestamp())
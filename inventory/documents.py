@@ -0,0 +1,142 @@
+"""
+Materialized read model of the retailer API representation (RetailerDocument).
+
+Each retailer's JSON object is stored as rendered, with its soda ids. Only the soda hyperlinks,
+which depend on the request's host and format, are filled in on read. Plain JSON list and detail
+reads join the stored documents into the response body (see DocumentReadMixin). They do not load
+model rows, run the serializer or encode JSON per request.
+
+Documents are refreshed after every write to a retailer or its sodas (see inventory.signals).
+A document also records the retailer's timestamp_last_updated it was rendered from. A read that
+finds it missing or older than the row rebuilds it, so a write that bypasses the signals is not
+served stale.
+"""
+
+import json
+
+from collections import defaultdict
+from collections.abc import Callable, Iterable
+from typing import Any
+from django.http import Http404
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+from .metrics import serializer_timer
+from .models import Retailer, RetailerDocument
+from .renderers import FastJSONRenderer, RenderedJSON
+from .serializers import URL_TEMPLATE_PK, RetailerSerializer
+
+# every field of RetailerSerializer but `sodas`, in the order they are rendered
+DOCUMENT_FIELDS = tuple(name for name in RetailerSerializer.Meta.fields if name != 'sodas')
+# query params that change the shape of a retailer, which documents only store in full
+SHAPING_PARAMS = ('fields', 'expand')
+
+
+def refresh_documents(retailer_ids: Iterable[int]) -> dict[int, RetailerDocument]:
+    """Render and store the documents of the given retailers. Ids of deleted retailers are skipped."""
+
+    retailer_ids = set(retailer_ids)
+    if not retailer_ids:
+        return {}
+
+    fields = RetailerSerializer().fields
+    representations = [fields[name].to_representation for name in DOCUMENT_FIELDS]
+    renderer = FastJSONRenderer()
+
+    soda_ids: defaultdict[int, list[int]] = defaultdict(list)
+    for retailer_id, soda_id in (Retailer.sodas.through.objects
+                                 .filter(retailer_id__in=retailer_ids)
+                                 .order_by('retailer_id', 'soda_id')
+                                 .values_list('retailer_id', 'soda_id')):
+        soda_ids[retailer_id].append(soda_id)
+
+    documents = {}
+    for values in Retailer.objects.filter(id__in=retailer_ids).values_list(*DOCUMENT_FIELDS):
+        # like Serializer.to_representation, None is rendered as is without calling the field
+        representation = {name: None if value is None else represent(value)
+                          for name, represent, value in zip(DOCUMENT_FIELDS, representations, values)}
+        raw = dict(zip(DOCUMENT_FIELDS, values))
+        documents[raw['id']] = RetailerDocument(
+            retailer_id=raw['id'],
+            head=renderer.render(representation).decode()[:-1],
+            soda_ids=soda_ids.get(raw['id'], []),
+            source_timestamp=raw['timestamp_last_updated'],
+        )
+
+    RetailerDocument.objects.bulk_create(
+        documents.values(),
+        update_conflicts=True,
+        unique_fields=['retailer'],
+        update_fields=['head', 'soda_ids', 'source_timestamp'],
+    )
+    return documents
+
+
+def read_documents(rows: list[dict[str, Any]], soda_link: Callable[[int], str]) -> list[str]:
+    """
+    The JSON object of each retailer row (with 'id' and 'timestamp_last_updated'), in order.
+    soda_link renders a soda id as a JSON string.
+    """
+
+    documents = {document.retailer_id: document
+                 for document in RetailerDocument.objects.filter(retailer_id__in=[row['id'] for row in rows])}
+    stale = [row['id'] for row in rows
+             if row['id'] not in documents or documents[row['id']].source_timestamp != row['timestamp_last_updated']]
+    documents.update(refresh_documents(stale))
+
+    rendered = []
+    for row in rows:
+        document = documents[row['id']]
+        sodas = ','.join(soda_link(soda_id) for soda_id in document.soda_ids)
+        rendered.append(f'{document.head},"sodas":[{sodas}]}}')
+    return rendered
+
+
+class DocumentReadMixin:
+    """
+    ViewSet mixin that answers compact JSON list and retrieve from RetailerDocuments. Other formats,
+    indented output and ?fields= / ?expand= fall through to the next class. Place it after
+    ConditionalGetMixin (whose lookup it uses) and ColumnarListMixin.
+    """
+
+    def list(self, request: Request, *args, **kwargs) -> Response:
+        if not self._serves_documents(request):
+            return super().list(request, *args, **kwargs)
+
+        queryset = (self.filter_queryset(self.get_queryset())
+                    .prefetch_related(None)
+                    .values('id', 'timestamp_last_updated'))
+        page = self.paginate_queryset(queryset)
+        with serializer_timer():
+            documents = ','.join(read_documents(list(queryset) if page is None else page, self._soda_link()))
+            if page is None:
+                return Response(RenderedJSON(f'[{documents}]'))
+
+            encode = FastJSONRenderer().render
+            next_link = encode(self.paginator.get_next_link()).decode() or 'null'
+            previous_link = encode(self.paginator.get_previous_link()).decode() or 'null'
+            return Response(RenderedJSON(f'{{"next":{next_link},"previous":{previous_link},"results":[{documents}]}}'))
+
+    def retrieve(self, request: Request, *args, **kwargs) -> Response:
+        if not self._serves_documents(request):
+            return super().retrieve(request, *args, **kwargs)
+
+        row = self.get_lookup_queryset().prefetch_related(None).values('id', 'timestamp_last_updated').first()
+        if row is None:
+            raise Http404
+        with serializer_timer():
+            return Response(RenderedJSON(read_documents([row], self._soda_link())[0]))
+
+    def _serves_documents(self, request: Request) -> bool:
+        renderer = request.accepted_renderer
+        return (type(renderer) is FastJSONRenderer
+                and renderer.get_indent(request.accepted_media_type, {}) is None
+                and not any(param in request.query_params for param in SHAPING_PARAMS))
+
+    def _soda_link(self) -> Callable[[int], str]:
+        serializer = self.get_serializer()
+        url = serializer._hyperlink_template(serializer.fields['sodas'].child_relation)(URL_TEMPLATE_PK)
+        prefix, _, suffix = url.rpartition(str(URL_TEMPLATE_PK))
+        # the link is a JSON string: the quotes and any escaping go around the id once
+        json_prefix, json_suffix = json.dumps(prefix, ensure_ascii=False)[:-1], json.dumps(suffix, ensure_ascii=False)[1:]
+        return lambda soda_id: f'{json_prefix}{soda_id}{json_suffix}'
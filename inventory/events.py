@@ -0,0 +1,226 @@
+"""
+Server-sent events stream of retailer changes: GET /api/retailers/events/ (ASGI only, see config/asgi.py).
+
+Clients open one long-lived connection instead of polling the list. Each event loop (one per ASGI
+worker process) runs a single ChangeBroadcaster while clients are connected: it polls the change
+feed (inventory.changes) every POLL_INTERVAL seconds, which is one indexed query however many clients
+listen, encodes each batch once and fans it out to the subscribers' queues.
+
+    id: <change feed cursor>
+    event: changes
+    data: {"changed": [<retailer as in /api/retailers/export/>, ...], "deleted": [<retailer id>, ...]}
+
+The event id is a change feed cursor: a reconnecting EventSource sends it back as Last-Event-ID and
+first receives what it missed. Streams are closed after MAX_STREAM_SECONDS (clients reconnect on
+their own), which bounds the lifetime of connections whose client left without the server noticing.
+"""
+
+import asyncio
+import json
+import logging
+import time
+import weakref
+
+from collections.abc import AsyncIterator
+from dataclasses import dataclass, field
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.db import close_old_connections
+from django.http import HttpRequest, HttpResponse, HttpResponseNotAllowed, JsonResponse, StreamingHttpResponse
+
+from .changes import ChangeCursor, ChangePage, latest_cursor, read_changes
+from .export import EXPORT_COLUMNS, export_row_encoder
+
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL = 1.0  # seconds
+# changes read per poll; a larger backlog is read in several batches without waiting
+BATCH_LIMIT = 500
+# batches a subscriber may fall behind before it is disconnected (it then catches up on reconnect)
+SUBSCRIBER_QUEUE_SIZE = 100
+KEEPALIVE_SECONDS = 15.0
+MAX_STREAM_SECONDS = 300.0
+# reconnection delay suggested to clients
+RETRY_MILLISECONDS = 3000
+
+
+@dataclass
+class ChangeBatch:
+    """One poll's changes, encoded once for every subscriber."""
+
+    cursor: str
+    # (postcode, retailer JSON object) pairs; subscribers may filter on postcode
+    changed: list[tuple[int | None, str]]
+    deleted: list[int]
+    _unfiltered_data: str | None = field(default=None, repr=False)
+
+    def data(self, postcode: int | None = None) -> str | None:
+        """The event data for a subscriber, or None if nothing in the batch concerns it."""
+
+        if postcode is None:
+            if self._unfiltered_data is None:
+                self._unfiltered_data = self._encode([row for _, row in self.changed])
+            return self._unfiltered_data
+
+        # deletions carry no postcode, so every subscriber receives them
+        changed = [row for row_postcode, row in self.changed if row_postcode == postcode]
+        return self._encode(changed) if changed or self.deleted else None
+
+    def _encode(self, changed: list[str]) -> str:
+        return f'{{"changed":[{",".join(changed)}],"deleted":{json.dumps(self.deleted)}}}'
+
+
+def encode_batch(page: ChangePage) -> ChangeBatch:
+    changed = []
+    # the encoder reads the soda table, which most (empty) polls can skip
+    encode = export_row_encoder() if page.rows else None
+    for row in page.rows:
+        retailer = encode(tuple(row[column] for column in EXPORT_COLUMNS))
+        changed.append((retailer['postcode'], json.dumps(retailer, separators=(',', ':'))))
+    return ChangeBatch(cursor=page.cursor.encode(), changed=changed, deleted=page.deleted_ids)
+
+
+def read_batch(cursor: ChangeCursor) -> tuple[ChangeBatch, ChangePage]:
+    # Polls run outside the request cycle, whose start and end normally recycle connections. Without
+    # this, a connection past CONN_MAX_AGE or broken by a database restart would fail every later poll.
+    close_old_connections()
+    try:
+        page = read_changes(cursor, BATCH_LIMIT, list(EXPORT_COLUMNS))
+        return encode_batch(page), page
+    finally:
+        close_old_connections()
+
+
+class ChangeBroadcaster:
+    """Polls the change feed while anyone is subscribed and puts each non-empty batch on every subscriber's queue."""
+
+    def __init__(self, poll_interval: float | None = None) -> None:
+        """
+        Initialize the broadcaster.
+        Args:
+            poll_interval: Seconds between polls of the change feed. Defaults to POLL_INTERVAL.
+        """
+        self.poll_interval = poll_interval if poll_interval is not None else POLL_INTERVAL
+        self._subscribers: set[asyncio.Queue[ChangeBatch | None]] = set()
+        self._task: asyncio.Task | None = None
+
+    def subscribe(self) -> asyncio.Queue[ChangeBatch | None]:
+        """Queue of batches for a new subscriber. None on the queue means the subscriber fell behind and was dropped."""
+
+        queue: asyncio.Queue[ChangeBatch | None] = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers.add(queue)
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue[ChangeBatch | None]) -> None:
+        self._subscribers.discard(queue)
+
+    async def _run(self) -> None:
+        try:
+            cursor = await sync_to_async(latest_cursor)()
+            while self._subscribers:
+                try:
+                    batch, page = await sync_to_async(read_batch)(cursor)
+                except Exception:
+                    # a database hiccup should not end every client's stream
+                    logger.exception("Polling the retailer change feed failed.")
+                    await asyncio.sleep(self.poll_interval)
+                    continue
+
+                cursor = page.cursor
+                if page.rows or page.deleted_ids:
+                    self._publish(batch)
+                if not page.has_more:
+                    await asyncio.sleep(self.poll_interval)
+        finally:
+            # the next subscriber starts from the changes made from then on
+            self._task = None
+
+    def _publish(self, batch: ChangeBatch) -> None:
+        for queue in list(self._subscribers):
+            try:
+                queue.put_nowait(batch)
+            except asyncio.QueueFull:
+                self._subscribers.discard(queue)
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(None)
+
+
+_broadcasters: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, ChangeBroadcaster] = weakref.WeakKeyDictionary()
+
+
+def get_broadcaster() -> ChangeBroadcaster:
+    """The broadcaster of the running event loop; its queues and task cannot be shared across loops."""
+
+    loop = asyncio.get_running_loop()
+    if loop not in _broadcasters:
+        _broadcasters[loop] = ChangeBroadcaster()
+    return _broadcasters[loop]
+
+
+async def retailer_events(request: HttpRequest) -> HttpResponse:
+    """
+    Endpoint that streams retailer changes as server-sent events, optionally only those in one postcode
+    (?postcode=). Resumes after the Last-Event-ID header (or ?since=) cursor when given.
+    """
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
+    if not isinstance(request, ASGIRequest):
+        # under WSGI the stream would hold a worker and Django would buffer it to completion
+        return JsonResponse({'detail': "Event streams are only served by the ASGI application (config.asgi)."},
+                            status=501)
+
+    raw_cursor = request.headers.get('Last-Event-ID') or request.GET.get('since')
+    try:
+        cursor = ChangeCursor.decode(raw_cursor) if raw_cursor else None
+    except ValueError:
+        return JsonResponse({'since': ["Invalid cursor."]}, status=400)
+
+    raw_postcode = request.GET.get('postcode')
+    try:
+        postcode = int(raw_postcode) if raw_postcode is not None else None
+    except ValueError:
+        return JsonResponse({'postcode': ["A valid integer is required."]}, status=400)
+
+    response = StreamingHttpResponse(_event_stream(cursor, postcode), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # nginx would otherwise buffer the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+async def _event_stream(cursor: ChangeCursor | None, postcode: int | None) -> AsyncIterator[str]:
+    broadcaster = get_broadcaster()
+    # subscribe before catching up so nothing falls between the two; replayed changes are idempotent
+    queue = broadcaster.subscribe()
+    deadline = time.monotonic() + MAX_STREAM_SECONDS
+    try:
+        yield f"retry: {RETRY_MILLISECONDS}\n\n"
+
+        while cursor is not None:
+            batch, page = await sync_to_async(read_batch)(cursor)
+            if page.rows or page.deleted_ids:
+                yield _format_event(batch, postcode)
+            cursor = page.cursor if page.has_more else None
+
+        while (remaining := deadline - time.monotonic()) > 0:
+            try:
+                batch = await asyncio.wait_for(queue.get(), timeout=min(KEEPALIVE_SECONDS, remaining))
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            if batch is None:
+                return
+            yield _format_event(batch, postcode)
+    finally:
+        broadcaster.unsubscribe(queue)
+
+
+def _format_event(batch: ChangeBatch, postcode: int | None) -> str:
+    data = batch.data(postcode)
+    if data is None:
+        # still advance the client's Last-Event-ID, so a reconnect does not replay the batch
+        return f"id: {batch.cursor}\n\n"
+    return f"id: {batch.cursor}\nevent: changes\ndata: {data}\n\n"
@@ -18,3 +18,22 @@ class NonNumericPostcodeError(SerializerError):
     def __init__(self, message: str | None = None) -> None:
         self.message = message or "Non-numerical postcodes are not yet tolerated by the Retailer model."
         super().__init__(self.message)
+
+
+class ModelError(Exception):
+    """Base exception for model-related errors."""
+
+    pass
+
+
+class SodaCapacityError(ModelError):
+    """
+    Raised when a new soda cannot be given a bit in Retailer.soda_mask.
+
+    Soda availability is stored as a 64-bit signed integer on each retailer, so at most
+    MAX_SODAS sodas can exist at the same time.
+    """
+
+    def __init__(self, message: str | None = None) -> None:
+        self.message = message or "No free soda bit is left in the retailer soda mask."
+        super().__init__(self.message)
@@ -0,0 +1,108 @@
+"""
+Streaming export of the full retailer inventory as NDJSON or CSV.
+
+Rows are read through a server-side cursor in chunks and written out as they arrive, so memory
+use does not grow with the table. Each retailer's sodas are decoded from Retailer.soda_mask
+instead of joining the retailer-soda table.
+"""
+
+import csv
+import json
+
+from collections.abc import Callable, Iterator
+from typing import Any
+
+from .models import Retailer, Soda
+from .serializers import RetailerSerializer
+from .soda_mask import bits_in_mask
+
+EXPORT_FIELDS = ('id', 'name', 'street_address', 'city', 'postcode', 'country', 'latitude', 'longitude',
+                 'geocoding_status', 'timestamp_last_updated', 'timestamp_created')
+# columns read per retailer: the exported fields, then the mask its sodas are decoded from
+EXPORT_COLUMNS = (*EXPORT_FIELDS, 'soda_mask')
+# rows fetched per round trip from the server-side cursor, and written per chunk of the response
+CHUNK_SIZE = 2000
+
+
+def export_ndjson() -> Iterator[str]:
+    """One JSON object per line, with `sodas` as a list of abbreviations."""
+
+    for chunk in _iter_row_chunks():
+        yield "".join(json.dumps(row, separators=(',', ':')) + "\n" for row in chunk)
+
+
+def export_csv() -> Iterator[str]:
+    """CSV with a header row; `sodas` is a comma-separated list of abbreviations."""
+
+    writer = csv.writer(_LineBuffer())
+    yield writer.writerow([*EXPORT_FIELDS, 'sodas'])
+    for chunk in _iter_row_chunks():
+        yield "".join(
+            writer.writerow([*(_csv_value(row[field]) for field in EXPORT_FIELDS), ",".join(row['sodas'])])
+            for row in chunk
+        )
+
+
+EXPORT_FORMATS: dict[str, tuple[Callable[[], Iterator[str]], str]] = {
+    'ndjson': (export_ndjson, 'application/x-ndjson'),
+    'csv': (export_csv, 'text/csv'),
+}
+
+
+def export_row_encoder() -> Callable[[tuple], dict[str, Any]]:
+    """
+    Function that turns a `values_list(*EXPORT_COLUMNS)` row into an exported retailer. Values render
+    like the API's (decimal strings, ISO 8601 timestamps). Reads the soda table once, when called.
+    """
+
+    fields = RetailerSerializer().fields
+    renderers = [(name, fields[name].to_representation) for name in EXPORT_FIELDS]
+    abbreviations_for_mask = _soda_abbreviation_decoder()
+
+    def encode(values: tuple) -> dict[str, Any]:
+        row = {name: None if value is None else render(value) for (name, render), value in zip(renderers, values)}
+        row['sodas'] = abbreviations_for_mask(values[-1])
+        return row
+
+    return encode
+
+
+def _iter_row_chunks() -> Iterator[list[dict[str, Any]]]:
+    encode = export_row_encoder()
+    rows = (Retailer.objects
+            .order_by('id')
+            .values_list(*EXPORT_COLUMNS)
+            .iterator(chunk_size=CHUNK_SIZE))
+
+    chunk = []
+    for values in rows:
+        chunk.append(encode(values))
+        if len(chunk) == CHUNK_SIZE:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _soda_abbreviation_decoder() -> Callable[[int], list[str]]:
+    abbreviation_by_bit = dict(Soda.objects.exclude(bit_index__isnull=True).values_list('bit_index', 'abbreviation'))
+    # retailers share a handful of distinct masks; decode each once
+    decoded: dict[int, list[str]] = {}
+
+    def abbreviations_for_mask(mask: int) -> list[str]:
+        if mask not in decoded:
+            decoded[mask] = sorted(abbreviation_by_bit[bit] for bit in bits_in_mask(mask) if bit in abbreviation_by_bit)
+        return decoded[mask]
+
+    return abbreviations_for_mask
+
+
+def _csv_value(value: Any) -> Any:
+    return "" if value is None else value
+
+
+class _LineBuffer:
+    """File-like object whose write() returns the line instead of storing it, so csv.writer output can be streamed."""
+
+    def write(self, value: str) -> str:
+        return value
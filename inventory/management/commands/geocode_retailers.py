@@ -0,0 +1,158 @@
+import time
+
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from django.core.management.base import BaseCommand, CommandParser
+from django.db.models import Q, QuerySet
+from django.utils import timezone
+
+from inventory.exceptions import NonNumericPostcodeError
+from inventory.models import GeocodingStatus, Retailer
+from inventory.services.exceptions import GeocodingError, GeocodingNoResultsError
+from inventory.services.geocoding import GeocodingResult, GeocodingService
+from inventory.services.geocoding_cache import CachedGeocodingService
+from inventory.services.geocoding_queue import apply_geocoding_result
+from inventory.services.rate_limit import TokenBucket
+from inventory.signals import retailers_bulk_changed
+from inventory.spatial import encode_geohash
+
+UPDATE_FIELDS = ['latitude', 'longitude', 'postcode', 'geohash', 'geocoding_status', 'timestamp_last_updated']
+
+
+class Command(BaseCommand):
+    help = (
+        "Geocode retailers that are missing coordinates using a bounded thread pool, "
+        "without exceeding the provider's requests-per-second limit."
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument('--workers', type=int, default=8, help="Concurrent geocoding requests.")
+        parser.add_argument('--qps', type=float, default=40.0,
+                            help="Max geocoding API requests per second (Google's default quota is 50).")
+        parser.add_argument('--batch-size', type=int, default=200,
+                            help="Retailers read and written back (bulk_update) per batch.")
+        parser.add_argument('--limit', type=int, default=None, help="Stop after this many retailers.")
+        parser.add_argument('--retry-failed', action='store_true',
+                            help="Also retry retailers whose geocoding previously failed.")
+
+    def handle(self, *args, **options) -> None:
+        self.api_service = GeocodingService()
+        self.cached_service = CachedGeocodingService()
+        self.rate_limiter = TokenBucket(rate=options['qps'])
+        self.outcomes: Counter[str] = Counter()
+        self.started_at = time.monotonic()
+
+        queryset = self._retailers_missing_coordinates(options['retry_failed'])
+        total = queryset.count() if options['limit'] is None else min(queryset.count(), options['limit'])
+        self.stdout.write(f"Geocoding {total} retailer(s) with {options['workers']} worker(s) at <= {options['qps']} qps.")
+
+        processed = 0
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            for batch in self._iter_batches(queryset, options['batch_size'], total):
+                updated = self._geocode_batch(executor, batch)
+                # stamped when written, not when geocoded: a batch takes longer than the change feed's settle window
+                written_at = timezone.now()
+                for retailer in updated:
+                    retailer.timestamp_last_updated = written_at
+                Retailer.objects.bulk_update(updated, UPDATE_FIELDS)
+                retailers_bulk_changed.send(sender=Retailer, retailer_ids=[retailer.id for retailer in updated])
+                processed += len(batch)
+                self._report_progress(processed, total)
+
+        self.stdout.write(self.style.SUCCESS(f"Done. {self._summary(processed)}"))
+
+    def _retailers_missing_coordinates(self, retry_failed: bool) -> QuerySet[Retailer]:
+        # retailers with a pending job are left to the background worker (process_geocoding_jobs)
+        excluded_statuses = [GeocodingStatus.PENDING]
+        if not retry_failed:
+            excluded_statuses.append(GeocodingStatus.FAILED)
+
+        return (Retailer.objects
+                .filter(Q(latitude__isnull=True) | Q(longitude__isnull=True))
+                .exclude(geocoding_status__in=excluded_statuses)
+                .order_by('id'))
+
+    def _iter_batches(self, queryset: QuerySet[Retailer], batch_size: int, total: int):
+        """Keyset-paginate by id so each batch is a cheap indexed read, regardless of how far along we are."""
+
+        last_id = 0
+        remaining = total
+        while remaining > 0:
+            batch = list(queryset.filter(id__gt=last_id)[:min(batch_size, remaining)])
+            if not batch:
+                return
+            yield batch
+            last_id = batch[-1].id
+            remaining -= len(batch)
+
+    def _geocode_batch(self, executor: ThreadPoolExecutor, batch: list[Retailer]) -> list[Retailer]:
+        """Geocode a batch: cache hits are resolved here, misses run concurrently in the pool. Returns retailers to save."""
+
+        updated = []
+        futures = {}
+        for retailer in batch:
+            address = (retailer.street_address, retailer.city, str(retailer.postcode) if retailer.postcode else None)
+            address_key = self.cached_service.cache_key(*address)
+
+            cached = self.cached_service.cache.get(address_key)
+            if cached is None:
+                futures[executor.submit(self._geocode_rate_limited, *address)] = (retailer, address_key)
+            elif cached.result is None:
+                self._record_failure(retailer, GeocodingNoResultsError(), updated)
+            else:
+                self.outcomes['cache_hit'] += 1
+                self._record_success(retailer, cached.result, updated)
+
+        # database work (cache writes, model updates) stays on this thread
+        for future in as_completed(futures):
+            retailer, address_key = futures[future]
+            try:
+                result = future.result()
+            except GeocodingNoResultsError as e:
+                self.cached_service.cache.set_negative(address_key)
+                self._record_failure(retailer, e, updated)
+            except GeocodingError as e:
+                # transient errors leave the retailer untouched so the next run retries it
+                self.outcomes[type(e).__name__] += 1
+            else:
+                self.outcomes['api_hit'] += 1
+                self.cached_service.cache.set(address_key, result)
+                self._record_success(retailer, result, updated)
+
+        return updated
+
+    def _geocode_rate_limited(self, street_address: str, city: str, postcode: str | None) -> GeocodingResult:
+        self.rate_limiter.acquire()
+        return self.api_service.geocode_address(street_address=street_address, city=city, postcode=postcode)
+
+    def _record_success(self, retailer: Retailer, result: GeocodingResult, updated: list[Retailer]) -> None:
+        try:
+            apply_geocoding_result(retailer, result)
+        except NonNumericPostcodeError as e:
+            self._record_failure(retailer, e, updated)
+            return
+
+        # bulk_update skips save() and its signals, so derived fields are set here
+        retailer.geohash = encode_geohash(retailer.latitude, retailer.longitude)
+        retailer.geocoding_status = GeocodingStatus.SUCCEEDED
+        updated.append(retailer)
+        self.outcomes['succeeded'] += 1
+
+    def _record_failure(self, retailer: Retailer, error: Exception, updated: list[Retailer]) -> None:
+        retailer.geocoding_status = GeocodingStatus.FAILED
+        updated.append(retailer)
+        self.outcomes[type(error).__name__] += 1
+
+    def _report_progress(self, processed: int, total: int) -> None:
+        self.stdout.write(f"[{processed}/{total}] {self._summary(processed)}")
+
+    def _summary(self, processed: int) -> str:
+        elapsed = max(time.monotonic() - self.started_at, 1e-9)
+        errors = {name: count for name, count in self.outcomes.items()
+                  if name not in ('succeeded', 'cache_hit', 'api_hit')}
+        return (
+            f"{processed / elapsed:.1f} retailers/s, "
+            f"succeeded={self.outcomes['succeeded']} "
+            f"(cache={self.outcomes['cache_hit']}, api={self.outcomes['api_hit']}), "
+            f"errors={sum(errors.values())} {errors if errors else ''}"
+        ).rstrip()
@@ -0,0 +1,139 @@
+import csv
+import json
+import time
+
+from collections.abc import Iterator
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+from django.db import connection
+from rest_framework.exceptions import ValidationError
+from typing import Any
+
+from inventory.models import Retailer, Soda
+from inventory.serializers import RetailerBulkSerializer
+from inventory.services.bulk_import import BulkUpsertResult, copy_upsert_retailers, upsert_retailers
+
+IMPORT_FIELDS = ('name', 'street_address', 'city', 'postcode', 'country', 'latitude', 'longitude')
+# errors printed in full; the rest are only counted
+MAX_REPORTED_ERRORS = 20
+
+
+class Command(BaseCommand):
+    help = (
+        "Create or update retailers (keyed by street_address) from a CSV or NDJSON file in the format "
+        "written by /api/retailers/export/, with `sodas` as soda abbreviations. Uses COPY on PostgreSQL."
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument('path', help="CSV or NDJSON file to import.")
+        parser.add_argument('--format', choices=['csv', 'ndjson'], default=None,
+                            help="File format. Defaults to the file extension (.csv, otherwise NDJSON).")
+        parser.add_argument('--batch-size', type=int, default=5000, help="Retailers written per transaction.")
+
+    def handle(self, *args, **options) -> None:
+        file_format = options['format'] or ('csv' if options['path'].lower().endswith('.csv') else 'ndjson')
+        # COPY is PostgreSQL-only; elsewhere batches go through bulk_create
+        upsert = copy_upsert_retailers if connection.vendor == 'postgresql' else upsert_retailers
+
+        self.field_serializer = RetailerBulkSerializer()
+        self.soda_id_by_abbreviation = dict(Soda.objects.values_list('abbreviation', 'id'))
+        self.errors: list[str] = []
+        totals = {'created': 0, 'updated': 0, 'geocoding_queued': 0}
+        started_at = time.monotonic()
+
+        try:
+            with open(options['path'], newline='', encoding='utf-8') as file:
+                for batch in self._iter_batches(self._iter_records(file, file_format), options['batch_size']):
+                    result: BulkUpsertResult = upsert(batch)
+                    totals['created'] += result.created
+                    totals['updated'] += result.updated
+                    totals['geocoding_queued'] += result.geocoding_queued
+                    self.stdout.write(f"Imported {totals['created'] + totals['updated']} retailer(s)...")
+        except OSError as e:
+            raise CommandError(f"Cannot read {options['path']}: {e}")
+
+        for error in self.errors[:MAX_REPORTED_ERRORS]:
+            self.stderr.write(error)
+        self.stdout.write(self.style.SUCCESS(
+            f"Done in {time.monotonic() - started_at:.1f}s on {connection.vendor}: "
+            f"created={totals['created']} updated={totals['updated']} "
+            f"geocoding_queued={totals['geocoding_queued']} skipped={len(self.errors)}"
+        ))
+
+    def _iter_records(self, file, file_format: str) -> Iterator[tuple[int, dict[str, Any]]]:
+        """Yield (line number, raw record) pairs without reading the whole file."""
+
+        if file_format == 'csv':
+            reader = csv.DictReader(file)
+            for record in reader:
+                record['sodas'] = [abbrev for abbrev in (record.get('sodas') or '').split(',') if abbrev.strip()]
+                yield reader.line_num, record
+            return
+
+        for line_number, line in enumerate(file, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield line_number, json.loads(line)
+            except ValueError as e:
+                self.errors.append(f"line {line_number}: invalid JSON ({e})")
+
+    def _iter_batches(self, records: Iterator[tuple[int, dict[str, Any]]], batch_size: int) -> Iterator[list[dict[str, Any]]]:
+        batch: list[tuple[int, dict[str, Any]]] = []
+        for line_number, record in records:
+            item = self._parse_record(line_number, record)
+            if item is not None:
+                batch.append((line_number, item))
+            if len(batch) >= batch_size:
+                yield self._check_batch(batch)
+                batch = []
+        if batch:
+            yield self._check_batch(batch)
+
+    def _parse_record(self, line_number: int, record: dict[str, Any]) -> dict[str, Any] | None:
+        """Validate one record with RetailerBulkSerializer's fields. Returns None (and records an error) if invalid."""
+
+        item: dict[str, Any] = {}
+        field_errors: dict[str, Any] = {}
+        for name in IMPORT_FIELDS:
+            value = record.get(name)
+            if value == '' and name not in ('name', 'street_address', 'city', 'country'):
+                value = None  # CSV has no null
+            if value is None and not self.field_serializer.fields[name].required:
+                item[name] = None
+                continue
+            try:
+                item[name] = self.field_serializer.fields[name].run_validation(value)
+            except ValidationError as e:
+                field_errors[name] = e.detail
+
+        abbreviations = [str(abbrev).strip().upper() for abbrev in record.get('sodas') or ()]
+        unknown = [abbrev for abbrev in abbreviations if abbrev not in self.soda_id_by_abbreviation]
+        if unknown:
+            field_errors['sodas'] = [f"Unknown soda abbreviation(s): {', '.join(unknown)}."]
+        item['sodas'] = [self.soda_id_by_abbreviation[abbrev] for abbrev in abbreviations if abbrev not in unknown]
+
+        if field_errors:
+            self.errors.append(f"line {line_number}: {field_errors}")
+            return None
+        if item.get('country') is None:
+            item['country'] = ''
+        return item
+
+    def _check_batch(self, batch: list[tuple[int, dict[str, Any]]]) -> list[dict[str, Any]]:
+        """Drop items that would violate a unique constraint: repeated keys in the batch, or a name used at another address."""
+
+        address_by_name = dict(Retailer.objects
+                               .filter(name__in=[item['name'] for _, item in batch])
+                               .values_list('name', 'street_address'))
+        seen_addresses: set[str] = set()
+        valid = []
+        for line_number, item in batch:
+            if item['street_address'] in seen_addresses:
+                self.errors.append(f"line {line_number}: street_address repeats an earlier line of the same batch")
+            elif address_by_name.setdefault(item['name'], item['street_address']) != item['street_address']:
+                self.errors.append(f"line {line_number}: name is already used by the retailer at another street_address")
+            else:
+                seen_addresses.add(item['street_address'])
+                valid.append(item)
+        return valid
+
@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandParser
+from django.db import DatabaseError, close_old_connections
+
+from inventory.services.geocoding_queue import GeocodingWorker
+
+
+class Command(BaseCommand):
+    help = "Geocode retailers queued by the API. Runs until interrupted unless --once is given."
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument('--once', action='store_true', help="Process due jobs, then exit.")
+        parser.add_argument('--batch-size', type=int, default=GeocodingWorker.DEFAULT_BATCH_SIZE,
+                            help="Jobs claimed per batch.")
+        parser.add_argument('--poll-interval', type=float, default=2.0,
+                            help="Seconds to sleep when no jobs are due.")
+
+    def handle(self, *args, **options) -> None:
+        worker = GeocodingWorker(batch_size=options['batch_size'])
+
+        try:
+            while True:
+                # The worker runs outside the request cycle, whose start and end normally recycle connections.
+                # Without this, a connection past CONN_MAX_AGE or broken by a database restart would fail every batch.
+                close_old_connections()
+                try:
+                    processed = worker.run_once()
+                except DatabaseError as error:
+                    # claimed jobs are claimed again once their lease expires; the next iteration reconnects
+                    self.stderr.write(f"Geocoding batch failed: {error}")
+                    processed = 0
+
+                if processed:
+                    self.stdout.write(f"Processed {processed} geocoding job(s).")
+                    continue
+                if options['once']:
+                    return
+                time.sleep(options['poll_interval'])
+        except KeyboardInterrupt:
+            self.stdout.write("Stopping geocoding worker.")
@@ -0,0 +1,182 @@
+"""
+Per-view request metrics, exposed in the Prometheus text format at /metrics.
+
+MetricsMiddleware records, for every request that resolves to a view: latency, number and
+duration of database queries, time spent in serializers (see serializer_timer) and response
+size. Metrics are kept in memory per process; with several web processes, scrape each one.
+"""
+
+import threading
+import time
+
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from django.conf import settings
+from django.db import connection
+from django.http import Http404, HttpRequest, HttpResponse
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class Histogram:
+    """Thread-safe Prometheus histogram with one series per label set."""
+
+    def __init__(self, name: str, help_text: str, buckets: tuple[float, ...], label_names: tuple[str, ...]) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self.label_names = label_names
+        # labels -> (count per bucket, sum, count)
+        self._series: dict[tuple[str, ...], tuple[list[int], float, int]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        with self._lock:
+            bucket_counts, total, count = self._series.get(labels) or ([0] * len(self.buckets), 0.0, 0)
+            for index, upper_bound in enumerate(self.buckets):
+                if value <= upper_bound:
+                    bucket_counts[index] += 1
+            self._series[labels] = (bucket_counts, total + value, count + 1)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+    def expose(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.help_text}"
+        yield f"# TYPE {self.name} histogram"
+
+        with self._lock:
+            series = sorted((labels, (list(counts), total, count)) for labels, (counts, total, count) in self._series.items())
+
+        for labels, (bucket_counts, total, count) in series:
+            label_pairs = list(zip(self.label_names, labels))
+            for upper_bound, bucket_count in zip(self.buckets, bucket_counts):
+                yield f"{self.name}_bucket{_format_labels(label_pairs + [('le', _format_number(upper_bound))])} {bucket_count}"
+            yield f"{self.name}_bucket{_format_labels(label_pairs + [('le', '+Inf')])} {count}"
+            yield f"{self.name}_sum{_format_labels(label_pairs)} {_format_number(total)}"
+            yield f"{self.name}_count{_format_labels(label_pairs)} {count}"
+
+
+REQUEST_LABELS = ('view', 'method', 'status')
+
+request_duration = Histogram(
+    'http_request_duration_seconds', "Time from request to rendered response.", LATENCY_BUCKETS, REQUEST_LABELS)
+db_queries = Histogram(
+    'http_request_db_queries', "Database queries run per request.", QUERY_COUNT_BUCKETS, REQUEST_LABELS)
+db_duration = Histogram(
+    'http_request_db_duration_seconds', "Time spent in database queries per request.", LATENCY_BUCKETS, REQUEST_LABELS)
+serializer_duration = Histogram(
+    'http_request_serializer_duration_seconds', "Time spent in serializers per request.", LATENCY_BUCKETS, REQUEST_LABELS)
+response_size = Histogram(
+    'http_response_size_bytes', "Size of the response body.", SIZE_BUCKETS, REQUEST_LABELS)
+
+HISTOGRAMS = (request_duration, db_queries, db_duration, serializer_duration, response_size)
+
+
+@dataclass
+class RequestStats:
+    query_count: int = 0
+    query_seconds: float = 0.0
+    serializer_seconds: float = 0.0
+
+    def record_query(self, execute: Callable, sql: str, params, many: bool, context: dict):
+        """connection.execute_wrapper hook that counts and times every query."""
+
+        started_at = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.query_count += 1
+            self.query_seconds += time.perf_counter() - started_at
+
+
+_current_stats: ContextVar[RequestStats | None] = ContextVar('inventory_request_stats', default=None)
+
+
+_in_serializer_timer: ContextVar[bool] = ContextVar('inventory_in_serializer_timer', default=False)
+
+
+@contextmanager
+def serializer_timer() -> Iterator[None]:
+    """Attribute the time spent in the block to serialization of the current request. Nested blocks count once."""
+
+    if _in_serializer_timer.get():
+        yield
+        return
+
+    token = _in_serializer_timer.set(True)
+    started_at = time.perf_counter()
+    try:
+        yield
+    finally:
+        _in_serializer_timer.reset(token)
+        stats = _current_stats.get()
+        if stats is not None:
+            stats.serializer_seconds += time.perf_counter() - started_at
+
+
+class MetricsMiddleware:
+    """Records metrics for each request resolved to a view. List it first so the timing covers other middleware."""
+
+    def __init__(self, get_response: Callable[[HttpRequest], HttpResponse]) -> None:
+        self.get_response = get_response
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        stats = RequestStats()
+        token = _current_stats.set(stats)
+        started_at = time.perf_counter()
+        try:
+            with connection.execute_wrapper(stats.record_query):
+                response = self.get_response(request)
+        finally:
+            _current_stats.reset(token)
+        elapsed = time.perf_counter() - started_at
+
+        resolver_match = request.resolver_match
+        if resolver_match is None or resolver_match.func is metrics_view:
+            # unresolved paths would add a series per URL probed
+            return response
+
+        labels = (resolver_match.view_name, request.method, str(response.status_code))
+        request_duration.observe(elapsed, *labels)
+        db_queries.observe(stats.query_count, *labels)
+        db_duration.observe(stats.query_seconds, *labels)
+        serializer_duration.observe(stats.serializer_seconds, *labels)
+        if not response.streaming:
+            response_size.observe(len(response.content), *labels)
+        return response
+
+
+def metrics_view(request: HttpRequest) -> HttpResponse:
+    """Prometheus scrape endpoint, only served to addresses in settings.METRICS_ALLOWED_IPS."""
+
+    if request.META.get('REMOTE_ADDR') not in settings.METRICS_ALLOWED_IPS:
+        raise Http404
+
+    lines = [line for histogram in HISTOGRAMS for line in histogram.expose()]
+    return HttpResponse("\n".join(lines) + "\n", content_type=PROMETHEUS_CONTENT_TYPE)
+
+
+def reset_metrics() -> None:
+    for histogram in HISTOGRAMS:
+        histogram.clear()
+
+
+def _format_labels(label_pairs: list[tuple[str, str]]) -> str:
+    escaped = (f'{name}="{_escape_label_value(value)}"' for name, value in label_pairs)
+    return "{" + ",".join(escaped) + "}"
+
+
+def _escape_label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.18 on 2026-10-17 00:07
+
+from django.db import migrations, models
+
+from inventory.spatial import encode_geohash
+
+
+def populate_geohash(apps, schema_editor):
+    Retailer = apps.get_model('inventory', 'Retailer')
+    retailers = Retailer.objects.filter(latitude__isnull=False, longitude__isnull=False)
+    for retailer in retailers.iterator(chunk_size=2000):
+        retailer.geohash = encode_geohash(retailer.latitude, retailer.longitude)
+        retailer.save(update_fields=['geohash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0002_alter_retailer_latitude_alter_retailer_longitude'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='retailer',
+            name='geohash',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=12),
+        ),
+        migrations.RunPython(populate_geohash, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.18 on 2026-10-17 00:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0003_retailer_geohash'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='retailer',
+            index=models.Index(fields=['latitude', 'longitude'], name='retailer_lat_lng_idx'),
+        ),
+    ]
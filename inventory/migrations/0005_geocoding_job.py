@@ -0,0 +1,42 @@
+# Generated by Django 4.2.18 on 2026-10-17 00:09
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def mark_geocoded_retailers(apps, schema_editor):
+    Retailer = apps.get_model('inventory', 'Retailer')
+    Retailer.objects.filter(latitude__isnull=False, longitude__isnull=False).update(geocoding_status='succeeded')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0004_retailer_lat_lng_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='retailer',
+            name='geocoding_status',
+            field=models.CharField(choices=[('not_requested', 'Not Requested'), ('pending', 'Pending'), ('succeeded', 'Succeeded'), ('failed', 'Failed')], default='not_requested', max_length=20),
+        ),
+        migrations.CreateModel(
+            name='GeocodingJob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('succeeded', 'Succeeded'), ('failed', 'Failed')], default='queued', max_length=20)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_error', models.TextField(blank=True)),
+                ('timestamp_last_updated', models.DateTimeField(auto_now=True)),
+                ('timestamp_created', models.DateTimeField(auto_now_add=True)),
+                ('retailer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='geocoding_jobs', to='inventory.retailer')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='geocodingjob_due_idx')],
+            },
+        ),
+        migrations.RunPython(mark_geocoded_retailers, migrations.RunPython.noop),
+    ]
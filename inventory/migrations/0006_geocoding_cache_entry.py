@@ -0,0 +1,26 @@
+# Generated by Django 4.2.18 on 2026-10-17 00:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0005_geocoding_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GeocodingCacheEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('address_key', models.CharField(max_length=500, unique=True)),
+                ('latitude', models.DecimalField(blank=True, decimal_places=7, max_digits=10, null=True)),
+                ('longitude', models.DecimalField(blank=True, decimal_places=7, max_digits=10, null=True)),
+                ('postcode', models.CharField(blank=True, max_length=20, null=True)),
+                ('is_negative', models.BooleanField(default=False)),
+                ('expires_at', models.DateTimeField(db_index=True)),
+                ('timestamp_last_updated', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 4.2.18 on 2026-10-17 00:14
+
+from django.db import migrations, models
+
+
+def populate_soda_masks(apps, schema_editor):
+    Soda = apps.get_model('inventory', 'Soda')
+    Retailer = apps.get_model('inventory', 'Retailer')
+
+    bit_by_soda_id = {}
+    for bit_index, soda in enumerate(Soda.objects.order_by('id')):
+        soda.bit_index = bit_index
+        soda.save(update_fields=['bit_index'])
+        bit_by_soda_id[soda.id] = bit_index
+
+    masks = {}
+    for retailer_id, soda_id in Retailer.sodas.through.objects.values_list('retailer_id', 'soda_id'):
+        masks[retailer_id] = masks.get(retailer_id, 0) | (1 << bit_by_soda_id[soda_id])
+    for retailer_id, mask in masks.items():
+        Retailer.objects.filter(id=retailer_id).update(soda_mask=mask)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0006_geocoding_cache_entry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='retailer',
+            name='soda_mask',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='soda',
+            name='bit_index',
+            field=models.PositiveSmallIntegerField(blank=True, editable=False, null=True, unique=True),
+        ),
+        migrations.RunPython(populate_soda_masks, migrations.RunPython.noop),
+    ]
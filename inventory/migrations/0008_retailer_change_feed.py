@@ -0,0 +1,30 @@
+# Generated by Django 4.2.18 on 2026-10-17 00:34
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0007_soda_mask'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RetailerTombstone',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('retailer_id', models.IntegerField()),
+                ('timestamp_deleted', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='retailer',
+            index=models.Index(fields=['timestamp_last_updated', 'id'], name='retailer_changes_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='retailertombstone',
+            index=models.Index(fields=['timestamp_deleted', 'id'], name='tombstone_changes_idx'),
+        ),
+    ]
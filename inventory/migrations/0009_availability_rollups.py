@@ -0,0 +1,67 @@
+# Generated by Django 4.2.18 on 2026-10-17 00:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def populate_availability(apps, schema_editor):
+    Soda = apps.get_model('inventory', 'Soda')
+    Retailer = apps.get_model('inventory', 'Retailer')
+    RetailerAvailability = apps.get_model('inventory', 'RetailerAvailability')
+    AvailabilityRollup = apps.get_model('inventory', 'AvailabilityRollup')
+
+    soda_id_by_bit = dict(Soda.objects.exclude(bit_index__isnull=True).values_list('bit_index', 'id'))
+    counts = {}
+    snapshots = []
+    for retailer_id, postcode, city, country, soda_mask in (Retailer.objects
+                                                            .values_list('id', 'postcode', 'city', 'country', 'soda_mask')
+                                                            .iterator(chunk_size=2000)):
+        snapshots.append(RetailerAvailability(retailer_id, postcode, city, country, soda_mask))
+        keys = [('postcode', '' if postcode is None else str(postcode)), ('city', city), ('country', country)]
+        for bit_index, soda_id in soda_id_by_bit.items():
+            if soda_mask & (1 << bit_index):
+                for level, key in keys:
+                    if key:
+                        counts[(level, key, soda_id)] = counts.get((level, key, soda_id), 0) + 1
+
+    RetailerAvailability.objects.bulk_create(snapshots, batch_size=2000)
+    AvailabilityRollup.objects.bulk_create(
+        [AvailabilityRollup(level=level, key=key, soda_id=soda_id, retailer_count=count)
+         for (level, key, soda_id), count in counts.items()],
+        batch_size=2000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0008_retailer_change_feed'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RetailerAvailability',
+            fields=[
+                ('retailer_id', models.IntegerField(primary_key=True, serialize=False)),
+                ('postcode', models.IntegerField(null=True)),
+                ('city', models.CharField(max_length=100)),
+                ('country', models.CharField(max_length=100)),
+                ('soda_mask', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='AvailabilityRollup',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('level', models.CharField(choices=[('postcode', 'Postcode'), ('city', 'City'), ('country', 'Country')], max_length=10)),
+                ('key', models.CharField(max_length=100)),
+                ('retailer_count', models.IntegerField(default=0)),
+                ('soda', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='availability_rollups', to='inventory.soda')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='availabilityrollup',
+            constraint=models.UniqueConstraint(fields=('level', 'key', 'soda'), name='availability_rollup_unique'),
+        ),
+        migrations.RunPython(populate_availability, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.18 on 2026-10-17 00:44
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0009_availability_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RetailerDocument',
+            fields=[
+                ('retailer', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='document', serialize=False, to='inventory.retailer')),
+                ('head', models.TextField()),
+                ('soda_ids', models.JSONField(default=list)),
+                ('source_timestamp', models.DateTimeField()),
+            ],
+        ),
+    ]
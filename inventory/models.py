@@ -1,4 +1,6 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.utils import timezone
+from typing import Any
 
 
 class Soda(models.Model):
@@ -7,10 +9,38 @@ class Soda(models.Model):
     abbreviation = models.CharField(max_length=2, blank=False, unique=True)
     low_calorie = models.BooleanField(default=False)
 
+    # position of this soda's bit in Retailer.soda_mask; assigned on first save (see inventory.signals)
+    bit_index = models.PositiveSmallIntegerField(unique=True, null=True, blank=True, editable=False)
+
+    # a concurrent create can take the same free bit first; a new soda then retries with the next one
+    BIT_INDEX_ATTEMPTS = 3
+
     # declares a field to display on the Django admin or anytime you want string representation of the entire object; must be unique
     def __str__(self) -> str:
         return self.name
 
+    def save(self, *args: Any, **kwargs: Any) -> None:
+        if self.pk is not None or self.bit_index is not None:
+            return super().save(*args, **kwargs)
+
+        for attempt in range(1, self.BIT_INDEX_ATTEMPTS + 1):
+            try:
+                with transaction.atomic():
+                    return super().save(*args, **kwargs)
+            except IntegrityError:
+                # other unique fields (name, abbreviation) fail the same way on every attempt
+                bit_taken = Soda.objects.filter(bit_index=self.bit_index).exists()
+                self.bit_index = None
+                if not bit_taken or attempt == self.BIT_INDEX_ATTEMPTS:
+                    raise
+
+
+class GeocodingStatus(models.TextChoices):
+    NOT_REQUESTED = 'not_requested'
+    PENDING = 'pending'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+
 
 class Retailer(models.Model):
 
@@ -22,11 +52,154 @@ class Retailer(models.Model):
     latitude = models.DecimalField(max_digits=10, decimal_places=7, blank=True, null=True)
     longitude = models.DecimalField(max_digits=10, decimal_places=7, blank=True, null=True)
 
+    # derived from latitude/longitude (see inventory.signals); indexed for prefix lookups of nearby retailers
+    geohash = models.CharField(max_length=12, blank=True, default="", db_index=True, editable=False)
+
+    # latitude/longitude are filled in asynchronously by the geocoding worker (see GeocodingJob)
+    geocoding_status = models.CharField(
+        max_length=20, choices=GeocodingStatus.choices, default=GeocodingStatus.NOT_REQUESTED
+    )
+
     timestamp_last_updated = models.DateTimeField(auto_now=True, auto_now_add=False)
     timestamp_created = models.DateTimeField(auto_now=False, auto_now_add=True)
 
     sodas = models.ManyToManyField(Soda, blank=True)
 
+    # denormalized copy of `sodas`: bit Soda.bit_index is set for each soda stocked (see inventory.soda_mask)
+    soda_mask = models.BigIntegerField(default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            # supports viewport (bounding box) queries from the map client
+            models.Index(fields=['latitude', 'longitude'], name='retailer_lat_lng_idx'),
+            # keyset scans of the change feed (see inventory.changes)
+            models.Index(fields=['timestamp_last_updated', 'id'], name='retailer_changes_idx'),
+        ]
+
+    def save(self, *args: Any, **kwargs: Any) -> None:
+        # soda_mask is only written by inventory.soda_mask; saving an instance loaded before a
+        # membership change must not write its stale mask back
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [field.name for field in self._meta.concrete_fields
+                                       if not field.primary_key and field.name != 'soda_mask']
+        super().save(*args, **kwargs)
+
     # declares a field to display on the Django admin or anytime you want string representation of the entire object; must be unique
     def __str__(self) -> str:
         return self.name
+
+
+class RetailerTombstone(models.Model):
+    """Record of a deleted retailer, so the change feed can report deletions (see inventory.changes)."""
+
+    retailer_id = models.IntegerField()
+    timestamp_deleted = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['timestamp_deleted', 'id'], name='tombstone_changes_idx'),
+        ]
+
+    def __str__(self) -> str:
+        return f"RetailerTombstone({self.retailer_id})"
+
+
+class RetailerDocument(models.Model):
+    """A retailer as the API renders it, stored so reads need not serialize it (see inventory.documents)."""
+
+    retailer = models.OneToOneField(Retailer, on_delete=models.CASCADE, primary_key=True, related_name='document')
+    # the rendered JSON object up to its `sodas`, whose hyperlinks depend on the request and are added on read
+    head = models.TextField()
+    soda_ids = models.JSONField(default=list)
+    # Retailer.timestamp_last_updated when the document was rendered
+    source_timestamp = models.DateTimeField()
+
+    def __str__(self) -> str:
+        return f"RetailerDocument({self.retailer_id})"
+
+
+class AvailabilityRollup(models.Model):
+    """Number of retailers stocking a soda in one postcode, city or country (see inventory.availability)."""
+
+    class Level(models.TextChoices):
+        POSTCODE = 'postcode'
+        CITY = 'city'
+        COUNTRY = 'country'
+
+    level = models.CharField(max_length=10, choices=Level.choices)
+    # the postcode, city or country, as text
+    key = models.CharField(max_length=100)
+    soda = models.ForeignKey(Soda, on_delete=models.CASCADE, related_name='availability_rollups')
+    retailer_count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['level', 'key', 'soda'], name='availability_rollup_unique'),
+        ]
+
+    def __str__(self) -> str:
+        return f"AvailabilityRollup({self.level}={self.key}, {self.soda_id}: {self.retailer_count})"
+
+
+class RetailerAvailability(models.Model):
+    """
+    The location and sodas a retailer is currently counted with in AvailabilityRollup, so a write
+    can be applied as the difference from what was counted (see inventory.availability).
+    """
+
+    # not a foreign key: the row must outlive the retailer until its deletion has been counted
+    retailer_id = models.IntegerField(primary_key=True)
+    postcode = models.IntegerField(null=True)
+    city = models.CharField(max_length=100)
+    country = models.CharField(max_length=100)
+    soda_mask = models.BigIntegerField(default=0)
+
+    def __str__(self) -> str:
+        return f"RetailerAvailability({self.retailer_id})"
+
+
+class GeocodingJob(models.Model):
+    """Queued request to geocode a retailer; processed by `./manage.py process_geocoding_jobs`."""
+
+    class Status(models.TextChoices):
+        QUEUED = 'queued'
+        RUNNING = 'running'
+        SUCCEEDED = 'succeeded'
+        FAILED = 'failed'
+
+    retailer = models.ForeignKey(Retailer, on_delete=models.CASCADE, related_name='geocoding_jobs')
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+
+    # earliest time the job may be claimed: backoff delay for queued jobs, lease expiry for running jobs
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+
+    timestamp_last_updated = models.DateTimeField(auto_now=True, auto_now_add=False)
+    timestamp_created = models.DateTimeField(auto_now=False, auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='geocodingjob_due_idx'),
+        ]
+
+    def __str__(self) -> str:
+        return f"GeocodingJob({self.retailer_id}, {self.status})"
+
+
+class GeocodingCacheEntry(models.Model):
+    """Persisted geocoding result (or known miss) for a normalized address string."""
+
+    address_key = models.CharField(max_length=500, unique=True)
+    latitude = models.DecimalField(max_digits=10, decimal_places=7, blank=True, null=True)
+    longitude = models.DecimalField(max_digits=10, decimal_places=7, blank=True, null=True)
+    postcode = models.CharField(max_length=20, blank=True, null=True)
+
+    # True when the geocoding API found no results for this address
+    is_negative = models.BooleanField(default=False)
+    expires_at = models.DateTimeField(db_index=True)
+
+    timestamp_last_updated = models.DateTimeField(auto_now=True, auto_now_add=False)
+
+    def __str__(self) -> str:
+        return self.address_key
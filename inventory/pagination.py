@@ -0,0 +1,13 @@
+from rest_framework.pagination import CursorPagination
+
+
+class IdCursorPagination(CursorPagination):
+    """
+    Keyset pagination on the primary key. The opaque `cursor` query param encodes the last id seen,
+    so every page is an indexed `WHERE id > ... ORDER BY id LIMIT n` read, however deep it is.
+    """
+
+    ordering = 'id'
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
@@ -0,0 +1,85 @@
+"""
+Default JSON renderer for the API.
+
+Output matches rest_framework's JSONRenderer. Compact responses (no `indent` requested) are encoded
+with orjson. orjson cannot escape non-ASCII characters, so with UNICODE_JSON off they are encoded by
+one preconfigured stdlib encoder instead of a new json.JSONEncoder per response. Decimals and
+datetimes are dispatched by exact type rather than through the encoder's isinstance chain. Indented
+output (the browsable API, `; indent=N`) is left to rest_framework. Bodies already rendered
+elsewhere are passed as RenderedJSON.
+"""
+
+import datetime
+import json
+import orjson
+
+from decimal import Decimal
+from typing import Any
+from rest_framework.utils.encoders import JSONEncoder
+from rest_framework.renderers import JSONRenderer
+
+
+def _encode_datetime(value: datetime.datetime) -> str:
+    representation = value.isoformat()
+    if representation.endswith('+00:00'):
+        representation = representation[:-6] + 'Z'
+    return representation
+
+
+_ENCODERS_BY_TYPE = {
+    Decimal: float,
+    datetime.datetime: _encode_datetime,
+    datetime.date: datetime.date.isoformat,
+}
+_fallback_default = JSONEncoder().default
+
+
+def _default(value: Any) -> Any:
+    encode = _ENCODERS_BY_TYPE.get(type(value))
+    if encode is not None:
+        return encode(value)
+    return _fallback_default(value)
+
+
+# orjson passes datetimes to _default so they are formatted as rest_framework formats them
+_ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+
+class RenderedJSON(str):
+    """Compact JSON text, e.g. joined from stored documents (see inventory.documents), that is written out as is."""
+
+
+class FastJSONRenderer(JSONRenderer):
+
+    def __init__(self) -> None:
+        self.encoder = json.JSONEncoder(
+            ensure_ascii=self.ensure_ascii,
+            allow_nan=not self.strict,
+            separators=(',', ':') if self.compact else (', ', ': '),
+            default=_default,
+        )
+
+    def render(self, data: Any, accepted_media_type: str | None = None, renderer_context: dict | None = None) -> bytes:
+        if data is None:
+            return b''
+
+        indented = self.get_indent(accepted_media_type, renderer_context or {}) is not None or not self.compact
+        if isinstance(data, RenderedJSON):
+            if not indented:
+                return data.encode()
+            data = json.loads(data)
+
+        if indented:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        if not self.ensure_ascii:
+            rendered = orjson.dumps(data, default=_default, option=_ORJSON_OPTIONS)
+            # like rest_framework, escape the two characters that are valid JSON but not JavaScript
+            if b'\xe2\x80\xa8' in rendered or b'\xe2\x80\xa9' in rendered:
+                rendered = rendered.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+            return rendered
+
+        rendered_text = self.encoder.encode(data)
+        if '\u2028' in rendered_text or '\u2029' in rendered_text:
+            rendered_text = rendered_text.replace('\u2028', '\\u2028').replace('\u2029', '\\u2029')
+        return rendered_text.encode()
@@ -1,77 +1,275 @@
-import logging
-
+from collections.abc import Callable, Iterable
 from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.relations import HyperlinkedIdentityField, HyperlinkedRelatedField, ManyRelatedField
 from typing import Any
-from .exceptions import NonNumericPostcodeError
-from .models import Retailer, Soda
-from .services.geocoding import GeocodingService, GeocodingResult
-from .services.exceptions import GeocodingError
+from .exceptions import SodaCapacityError
+from .metrics import serializer_timer
+from .models import AvailabilityRollup, GeocodingStatus, Retailer, Soda
+from .services.geocoding_queue import enqueue_geocoding
+
+# stands in for the primary key when a hyperlink is reversed once to make a template
+URL_TEMPLATE_PK = 987654321
+
+
+class TimedListSerializer(serializers.ListSerializer):
+    @property
+    def data(self) -> Any:
+        with serializer_timer():
+            return super().data
+
+
+class TimedSerializerMixin:
+    """Reports the time spent producing serializer.data to the request metrics (see inventory.metrics)."""
+
+    @property
+    def data(self) -> Any:
+        with serializer_timer():
+            return super().data
+
+
+class FastReadMixin:
+    """
+    Read-only fast path for list endpoints.
+
+    Renders rows from `queryset.values(*serializer.values_fields())` instead of model instances:
+    scalar fields reuse the serializer's own field to_representation, to-many relations are read
+    as (owner id, related id) pairs from the join table in one query, and hyperlinks are filled
+    into a URL template reversed once per request. The output is identical to `serializer.data`,
+    without per-object field binding, attribute lookups and reverse() calls.
+
+    Only hyperlinks looked up by pk are supported.
+    """
+
+    def values_fields(self) -> list[str]:
+        """Columns to select with .values() for represent_rows."""
+
+        columns = ['pk']
+        for field in self.fields.values():
+            if not isinstance(field, (HyperlinkedIdentityField, ManyRelatedField, serializers.ListSerializer)):
+                columns.append(field.source)
+        return columns
+
+    def represent_rows(self, rows: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        with serializer_timer():
+            renderers = [(name, self._row_renderer(field, rows)) for name, field in self.fields.items()]
+            return [{name: render(row) for name, render in renderers} for row in rows]
+
+    def _row_renderer(self, field: serializers.Field, rows: list[dict[str, Any]]) -> Callable[[dict[str, Any]], Any]:
+        if isinstance(field, HyperlinkedIdentityField):
+            link = self._hyperlink_template(field)
+            return lambda row: link(row['pk'])
+
+        if isinstance(field, serializers.ListSerializer):
+            # an embedded to-many relation (see SparseFieldsMixin): the related rows are rendered once each
+            child = field.child
+            assert isinstance(child, FastReadMixin), "FastReadMixin only embeds serializers that use it too."
+            related_ids = self._related_ids(field.source, [row['pk'] for row in rows])
+            related_rows = list(child.Meta.model.objects
+                                .filter(pk__in={pk for pks in related_ids.values() for pk in pks})
+                                .values(*child.values_fields()))
+            by_pk = {related_row['pk']: data for related_row, data in zip(related_rows, child.represent_rows(related_rows))}
+            return lambda row: [by_pk[related_id] for related_id in related_ids.get(row['pk'], ())]
+
+        if isinstance(field, ManyRelatedField):
+            link = self._hyperlink_template(field.child_relation)
+            related_ids = self._related_ids(field.source, [row['pk'] for row in rows])
+            return lambda row: [link(related_id) for related_id in related_ids.get(row['pk'], ())]
+
+        to_representation, source = field.to_representation, field.source
+        # like Serializer.to_representation, None is rendered as is without calling the field
+        return lambda row: None if row[source] is None else to_representation(row[source])
+
+    def _hyperlink_template(self, field: HyperlinkedRelatedField) -> Callable[[int], str]:
+        assert field.lookup_field == 'pk', "FastReadMixin only renders hyperlinks looked up by pk."
+
+        format = self.context.get('format')
+        if format and field.format and field.format != format:
+            format = field.format
+
+        url = field.reverse(
+            field.view_name,
+            kwargs={field.lookup_url_kwarg: URL_TEMPLATE_PK},
+            request=self.context['request'],
+            format=format,
+        )
+        prefix, _, suffix = url.rpartition(str(URL_TEMPLATE_PK))
+        return lambda pk: f"{prefix}{pk}{suffix}"
+
+    def _related_ids(self, source: str, owner_ids: Iterable[int]) -> dict[int, list[int]]:
+        """Related ids per owner id for a many-to-many field, ordered by related id."""
+
+        relation = self.Meta.model._meta.get_field(source)
+        owner_column, related_column = relation.m2m_field_name(), relation.m2m_reverse_name()
+        pairs = (relation.remote_field.through.objects
+                 .filter(**{f"{owner_column}__in": owner_ids})
+                 .order_by(owner_column, related_column)
+                 .values_list(owner_column, related_column))
+
+        related_ids: dict[int, list[int]] = {}
+        for owner_id, related_id in pairs:
+            related_ids.setdefault(owner_id, []).append(related_id)
+        return related_ids
+
+
+class SparseFieldsMixin:
+    """
+    Lets read requests shape the response: `?fields=id,name` keeps only the named fields, and
+    `?expand=sodas` embeds the related objects instead of hyperlinks to them (see get_expandable_fields).
+    Unknown names are rejected with a 400. Write requests always use every field.
+    """
+
+    def get_expandable_fields(self) -> dict[str, serializers.Field]:
+        return {}
+
+    def get_fields(self) -> dict[str, serializers.Field]:
+        fields = super().get_fields()
+        request = self.context.get('request')
+        if request is None or request.method not in SAFE_METHODS:
+            return fields
+
+        expand = _split_param(request.query_params.get('expand'))
+        if expand:
+            expandable_fields = self.get_expandable_fields()
+            unknown = expand - expandable_fields.keys()
+            if unknown:
+                raise serializers.ValidationError(
+                    {'expand': f"Unknown relation(s): {', '.join(sorted(unknown))}. Expected: {', '.join(expandable_fields)}."}
+                )
+            for name in expand:
+                fields[name] = expandable_fields[name]
+
+        selected = _split_param(request.query_params.get('fields'))
+        if selected:
+            unknown = selected - fields.keys()
+            if unknown:
+                raise serializers.ValidationError({'fields': f"Unknown field(s): {', '.join(sorted(unknown))}."})
+            fields = {name: field for name, field in fields.items() if name in selected}
+
+        return fields
 
-logger = logging.getLogger(__name__)
 
-class RetailerSerializer(serializers.HyperlinkedModelSerializer[Retailer]):
+def _split_param(raw_value: str | None) -> set[str]:
+    return {name.strip() for name in (raw_value or '').split(',') if name.strip()}
+
+
+class RetailerSerializer(
+    TimedSerializerMixin, SparseFieldsMixin, FastReadMixin, serializers.HyperlinkedModelSerializer[Retailer]
+):
     class Meta:
         model = Retailer
+        list_serializer_class = TimedListSerializer
         fields = ('id', 'name', 'street_address', 'city', 'postcode', 'country', 'latitude', 'longitude',
-                  'timestamp_last_updated', 'timestamp_created', 'sodas')
+                  'geocoding_status', 'timestamp_last_updated', 'timestamp_created', 'sodas')
+        read_only_fields = ('geocoding_status',)
 
     def create(self, validated_data: dict[str, Any]) -> Retailer:
+        # Geocoding runs in the background worker (./manage.py process_geocoding_jobs) so that slow
+        # responses from Google Maps do not block the request; coordinates are null until the job completes.
+        validated_data["geocoding_status"] = GeocodingStatus.PENDING
         saved_retailer = super(RetailerSerializer, self).create(validated_data)
-
-        geocoding_result = self._fetch_geocoding(validated_data, saved_retailer.name)
-        if geocoding_result is not None:
-            self._apply_geocoding(saved_retailer, geocoding_result, validated_data)
-
-        saved_retailer.save()
+        enqueue_geocoding(saved_retailer)
         return saved_retailer
 
-    def _fetch_geocoding(
-        self, validated_data: dict[str, Any], retailer_name: str
-    ) -> GeocodingResult | None:
-        """Fetch geocoding data for the address. Returns None on failure."""
+    def get_expandable_fields(self) -> dict[str, serializers.Field]:
+        return {'sodas': SodaSerializer(many=True, read_only=True)}
 
-        # This dependency is not injected due to reliance on HyperlinkedModelSerializer
-        geocoding_service = GeocodingService()
 
-        try:
-            return geocoding_service.geocode_address(
-                street_address=validated_data["street_address"],
-                city=validated_data["city"],
-                postcode=validated_data.get("postcode")
-            )
-
-        except GeocodingError as e:
-            logger.warning(
-                "Geocoding failed for retailer '%s': %s. Continuing without coordinates.",
-                retailer_name,
-                str(e),
-            )
-            return None
-
-    def _apply_geocoding(
-        self,
-        retailer: Retailer,
-        geocoding_result: GeocodingResult,
-        validated_data: dict[str, Any],
-    ) -> None:
-        """Apply geocoding results to retailer object."""
-
-        retailer.latitude = geocoding_result.latitude
-        retailer.longitude = geocoding_result.longitude
-
-        if not validated_data.get("postcode") and geocoding_result.postcode is not None:
-            try:
-                numerical_postcode = int(geocoding_result.postcode)
-            except ValueError:
-                raise NonNumericPostcodeError
-            retailer.postcode = numerical_postcode
-
-
-class SodaSerializer(serializers.HyperlinkedModelSerializer[Soda]):
+class SodaSerializer(TimedSerializerMixin, FastReadMixin, serializers.HyperlinkedModelSerializer[Soda]):
     class Meta:
         model = Soda
+        list_serializer_class = TimedListSerializer
         fields = ('id', 'name', 'abbreviation', 'low_calorie', 'url')
 
     def validate_abbreviation(self, value: str) -> str:
         return value.upper()
 
+    def create(self, validated_data: dict[str, Any]) -> Soda:
+        # checked as the soda is saved, so two requests racing for the last free bit cannot both pass
+        try:
+            return super(SodaSerializer, self).create(validated_data)
+        except SodaCapacityError as error:
+            raise serializers.ValidationError(error.message)
+
+
+class AvailabilitySerializer(TimedSerializerMixin, serializers.HyperlinkedModelSerializer[AvailabilityRollup]):
+    name = serializers.CharField(source='soda.name', read_only=True)
+    abbreviation = serializers.CharField(source='soda.abbreviation', read_only=True)
+
+    class Meta:
+        model = AvailabilityRollup
+        list_serializer_class = TimedListSerializer
+        fields = ('soda', 'name', 'abbreviation', 'retailer_count')
+
+
+class SodaReferenceField(serializers.HyperlinkedRelatedField):
+    """
+    A soda hyperlink resolved to its primary key without a query, so a whole batch of
+    references can be checked for existence at once (see RetailerBulkListSerializer).
+    """
+
+    view_name = 'soda-detail'
+
+    def __init__(self, **kwargs: Any) -> None:
+        kwargs.setdefault('queryset', Soda.objects.all())
+        super().__init__(**kwargs)
+
+    def get_object(self, view_name: str, view_args: Any, view_kwargs: dict[str, Any]) -> int:
+        return int(view_kwargs[self.lookup_url_kwarg])
+
+    def use_pk_only_optimization(self) -> bool:
+        return True
+
+
+class RetailerBulkListSerializer(serializers.ListSerializer):
+    """Validates a batch of retailers with a fixed number of queries, however large the batch."""
+
+    def run_validation(self, data: Any = serializers.empty) -> list[dict[str, Any]]:
+        attrs = super().run_validation(data)
+        # raised outside ListSerializer.validate so that errors stay a list with one entry per item
+        self._validate_batch(attrs)
+        return attrs
+
+    def _validate_batch(self, attrs: list[dict[str, Any]]) -> None:
+        errors: list[dict[str, Any]] = [{} for _ in attrs]
+
+        # one retailer per street_address and per name within the batch
+        for unique_field in ('street_address', 'name'):
+            first_index: dict[str, int] = {}
+            for index, item in enumerate(attrs):
+                if item[unique_field] in first_index:
+                    errors[index][unique_field] = [f"Duplicate of item {first_index[item[unique_field]]}."]
+                first_index.setdefault(item[unique_field], index)
+
+        # street_address is the upsert key, so a name may only be reused by the retailer at the same address
+        address_by_name = dict(Retailer.objects
+                               .filter(name__in=[item['name'] for item in attrs])
+                               .values_list('name', 'street_address'))
+        for index, item in enumerate(attrs):
+            if address_by_name.get(item['name'], item['street_address']) != item['street_address']:
+                errors[index]['name'] = ["retailer with this name already exists."]
+
+        referenced_ids = {soda_id for item in attrs for soda_id in item.get('sodas', ())}
+        existing_ids = set(Soda.objects.filter(id__in=referenced_ids).values_list('id', flat=True))
+        for index, item in enumerate(attrs):
+            if set(item.get('sodas', ())) - existing_ids:
+                errors[index]['sodas'] = ["Invalid hyperlink - Object does not exist."]
+
+        if any(errors):
+            raise serializers.ValidationError(errors)
+
+
+class RetailerBulkSerializer(serializers.ModelSerializer[Retailer]):
+    """
+    One item of a bulk upsert (POST /api/retailers/bulk/). Validation runs without per-item
+    queries; uniqueness and soda references are checked for the batch by RetailerBulkListSerializer.
+    """
+
+    sodas = SodaReferenceField(many=True, required=False)
+
+    class Meta:
+        model = Retailer
+        fields = ('name', 'street_address', 'city', 'postcode', 'country', 'latitude', 'longitude', 'sodas')
+        list_serializer_class = RetailerBulkListSerializer
+        # street_address is the upsert key and names are checked per batch, not per item
+        extra_kwargs = {'name': {'validators': []}, 'street_address': {'validators': []}}
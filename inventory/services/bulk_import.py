@@ -0,0 +1,196 @@
+"""
+Bulk create-or-update of retailers, keyed by their unique street_address.
+
+A batch is written with a fixed number of queries, however large it is: one upsert of the
+retailer rows, one delete and one insert on the retailer-soda table, the soda mask updates,
+one insert of geocoding jobs for retailers without coordinates, and a final update that stamps
+the rows as changed at commit (see inventory.changes).
+
+copy_upsert_retailers does the same on PostgreSQL with COPY, which loads rows far faster than
+INSERT statements; upsert_retailers works on every backend.
+"""
+
+import csv
+import io
+
+from collections.abc import Mapping
+from dataclasses import dataclass
+from typing import Any
+from django.db import connection, transaction
+from django.utils import timezone
+
+from inventory.changes import stamp_changes
+from inventory.models import GeocodingStatus, Retailer, Soda
+from inventory.signals import retailers_bulk_changed
+from inventory.soda_mask import mask_for_bits, recompute_soda_masks
+from inventory.spatial import encode_geohash
+
+from .geocoding_queue import enqueue_geocoding_bulk
+
+UPSERT_KEY = 'street_address'
+# written on insert and overwritten on conflict; timestamp_created keeps its original value
+UPSERT_FIELDS = ['name', 'city', 'postcode', 'country', 'latitude', 'longitude', 'geohash',
+                 'geocoding_status', 'timestamp_last_updated']
+# staging table columns loaded by COPY (copy_upsert_retailers), in file order
+COPY_COLUMNS = ('name', 'street_address', 'city', 'postcode', 'country', 'latitude', 'longitude', 'geohash',
+                'geocoding_status', 'soda_mask')
+
+
+@dataclass(frozen=True)
+class BulkUpsertResult:
+    retailer_ids: list[int]  # in the order of the input items
+    created: int
+    updated: int
+    geocoding_queued: int
+
+
+def upsert_retailers(items: list[Mapping[str, Any]]) -> BulkUpsertResult:
+    """
+    Create retailers, or update the existing ones at the same street_address, from validated items
+    (see RetailerBulkSerializer). An item's `sodas` (soda ids), when present, replace the retailer's
+    sodas. Retailers without coordinates are queued for the geocoding worker.
+    """
+
+    if not items:
+        return BulkUpsertResult(retailer_ids=[], created=0, updated=0, geocoding_queued=0)
+
+    addresses = [item[UPSERT_KEY] for item in items]
+    with transaction.atomic():
+        existing_count = Retailer.objects.filter(street_address__in=addresses).count()
+
+        Retailer.objects.bulk_create(
+            [_build_retailer(item) for item in items],
+            update_conflicts=True,
+            unique_fields=[UPSERT_KEY],
+            update_fields=UPSERT_FIELDS,
+        )
+        # ids are not returned for upserted rows
+        id_by_address = dict(Retailer.objects.filter(street_address__in=addresses).values_list(UPSERT_KEY, 'id'))
+        retailer_ids = [id_by_address[address] for address in addresses]
+
+        replace_soda_memberships({
+            retailer_id: item['sodas'] for retailer_id, item in zip(retailer_ids, items) if 'sodas' in item
+        })
+
+        missing_coordinates = [retailer_id for retailer_id, item in zip(retailer_ids, items) if not _has_coordinates(item)]
+        geocoding_queued = enqueue_geocoding_bulk(missing_coordinates)
+        stamp_changes(retailer_ids)
+
+    retailers_bulk_changed.send(sender=Retailer, retailer_ids=retailer_ids)
+    return BulkUpsertResult(
+        retailer_ids=retailer_ids,
+        created=len(items) - existing_count,
+        updated=existing_count,
+        geocoding_queued=geocoding_queued,
+    )
+
+
+def copy_upsert_retailers(items: list[Mapping[str, Any]]) -> BulkUpsertResult:
+    """
+    PostgreSQL-only equivalent of upsert_retailers. Items are COPYed into a temporary staging
+    table and upserted from there with one INSERT ... ON CONFLICT; memberships are COPYed
+    straight into the retailer-soda table. Every item's sodas replace the retailer's sodas.
+    """
+
+    if not items:
+        return BulkUpsertResult(retailer_ids=[], created=0, updated=0, geocoding_queued=0)
+
+    bit_index_by_soda_id = dict(Soda.objects.values_list('id', 'bit_index'))
+    retailer_table = connection.ops.quote_name(Retailer._meta.db_table)
+    soda_table = connection.ops.quote_name(Retailer.sodas.through._meta.db_table)
+    columns = ', '.join(COPY_COLUMNS)
+    updates = ', '.join(f"{column} = EXCLUDED.{column}" for column in COPY_COLUMNS if column != UPSERT_KEY)
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"""
+            CREATE TEMPORARY TABLE retailer_import_staging (
+                name varchar(100), street_address varchar(200), city varchar(100), postcode integer,
+                country varchar(100), latitude numeric(10, 7), longitude numeric(10, 7), geohash varchar(12),
+                geocoding_status varchar(20), soda_mask bigint
+            ) ON COMMIT DROP
+        """)
+        # FORCE_NOT_NULL keeps empty country and geohash as '' (those columns are NOT NULL)
+        cursor.copy_expert(
+            f"COPY retailer_import_staging ({columns}) FROM STDIN WITH (FORMAT csv, FORCE_NOT_NULL (country, geohash))",
+            _csv_file(_copy_row(item, bit_index_by_soda_id) for item in items),
+        )
+        # timestamps come from the application clock, like every other change (see inventory.changes)
+        written_at = timezone.now()
+        cursor.execute(f"""
+            INSERT INTO {retailer_table} ({columns}, timestamp_created, timestamp_last_updated)
+            SELECT {columns}, %s, %s FROM retailer_import_staging
+            ON CONFLICT (street_address) DO UPDATE SET {updates}, timestamp_last_updated = EXCLUDED.timestamp_last_updated
+            RETURNING id, street_address, xmax = 0
+        """, [written_at, written_at])
+        # xmax is 0 only for freshly inserted rows
+        upserted = {address: (retailer_id, inserted) for retailer_id, address, inserted in cursor.fetchall()}
+        retailer_ids = [upserted[item[UPSERT_KEY]][0] for item in items]
+
+        cursor.execute(f"DELETE FROM {soda_table} WHERE retailer_id = ANY(%s)", [retailer_ids])
+        cursor.copy_expert(
+            f"COPY {soda_table} (retailer_id, soda_id) FROM STDIN WITH (FORMAT csv)",
+            _csv_file((retailer_id, soda_id)
+                      for retailer_id, item in zip(retailer_ids, items)
+                      for soda_id in dict.fromkeys(item.get('sodas', ()))),
+        )
+
+        missing_coordinates = [retailer_id for retailer_id, item in zip(retailer_ids, items) if not _has_coordinates(item)]
+        geocoding_queued = enqueue_geocoding_bulk(missing_coordinates)
+        stamp_changes(retailer_ids)
+
+    retailers_bulk_changed.send(sender=Retailer, retailer_ids=retailer_ids)
+    created = sum(inserted for _, inserted in upserted.values())
+    return BulkUpsertResult(
+        retailer_ids=retailer_ids,
+        created=created,
+        updated=len(items) - created,
+        geocoding_queued=geocoding_queued,
+    )
+
+
+def replace_soda_memberships(soda_ids_by_retailer: Mapping[int, list[int]]) -> None:
+    """Set the sodas of each retailer with one delete and one insert, then refresh their soda masks."""
+
+    if not soda_ids_by_retailer:
+        return
+
+    RetailerSoda = Retailer.sodas.through
+    # queryset delete and bulk_create send no m2m_changed; the masks are refreshed below
+    RetailerSoda.objects.filter(retailer_id__in=soda_ids_by_retailer.keys()).delete()
+    RetailerSoda.objects.bulk_create([
+        RetailerSoda(retailer_id=retailer_id, soda_id=soda_id)
+        for retailer_id, soda_ids in soda_ids_by_retailer.items()
+        for soda_id in dict.fromkeys(soda_ids)
+    ])
+    recompute_soda_masks(soda_ids_by_retailer.keys())
+
+
+def _build_retailer(item: Mapping[str, Any]) -> Retailer:
+    retailer = Retailer(**{field: value for field, value in item.items() if field != 'sodas'})
+    # bulk_create skips save() and its signals, so derived fields are set here
+    if _has_coordinates(item):
+        retailer.geohash = encode_geohash(retailer.latitude, retailer.longitude)
+        retailer.geocoding_status = GeocodingStatus.NOT_REQUESTED
+    else:
+        retailer.geohash = ""
+        retailer.geocoding_status = GeocodingStatus.PENDING
+    return retailer
+
+
+def _copy_row(item: Mapping[str, Any], bit_index_by_soda_id: Mapping[int, int]) -> tuple:
+    retailer = _build_retailer(item)
+    retailer.soda_mask = mask_for_bits(bit_index_by_soda_id.get(soda_id) for soda_id in item.get('sodas', ()))
+    return tuple(getattr(retailer, column) for column in COPY_COLUMNS)
+
+
+def _csv_file(rows) -> io.StringIO:
+    """CSV for COPY: None is written as an unquoted empty field, which COPY reads as NULL."""
+
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    buffer.seek(0)
+    return buffer
+
+
+def _has_coordinates(item: Mapping[str, Any]) -> bool:
+    return item.get('latitude') is not None and item.get('longitude') is not None
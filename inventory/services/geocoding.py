@@ -1,10 +1,14 @@
 import logging
+import random
 import requests
+import threading
+import time
 import urllib
 
 from dataclasses import dataclass
 from decimal import Decimal
 from django.conf import settings
+from requests.adapters import HTTPAdapter
 
 from inventory.types import GoogleMapsAddressComponent, GoogleMapsGeocodeResponse
 
@@ -16,6 +20,28 @@ from .exceptions import (
 
 logger = logging.getLogger(__name__)
 
+# One keep-alive connection pool per process, shared by every GeocodingService instance
+_http_session: requests.Session | None = None
+_http_session_lock = threading.Lock()
+
+
+def get_http_session() -> requests.Session:
+    """
+    Return the process-wide pooled HTTP session, creating it on first use.
+    Pool size is configured by settings.GEOCODING_HTTP_POOL_SIZE.
+    """
+    global _http_session
+
+    if _http_session is None:
+        with _http_session_lock:
+            if _http_session is None:
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=settings.GEOCODING_HTTP_POOL_SIZE)
+                session = requests.Session()
+                session.mount("https://", adapter)
+                _http_session = session
+
+    return _http_session
+
 @dataclass(frozen=True)
 class GeocodingResult:
     """Immutable result from a geocoding operation."""
@@ -29,20 +55,26 @@ class GeocodingService:
 
     GOOGLE_MAPS_GEOCODE_URL = "https://maps.googleapis.com/maps/api/geocode/json"
     DEFAULT_TIMEOUT = 10  # seconds
+    DEFAULT_MAX_RETRIES = 2
+    RETRY_BACKOFF_BASE = 0.5  # seconds
+    RETRY_BACKOFF_MAX = 4  # seconds
 
     def __init__(
         self,
         api_key: str | None = None,
         timeout: int | None = None,
+        max_retries: int | None = None,
     ) -> None:
         """
         Initialize the geocoding service.
         Args:
             api_key: Google Maps API key. Defaults to settings.GOOGLEMAPS_KEY.
             timeout: Request timeout in seconds. Defaults to DEFAULT_TIMEOUT.
+            max_retries: Retries after a 5xx response or OVER_QUERY_LIMIT status. Defaults to DEFAULT_MAX_RETRIES.
         """
         self.api_key = api_key or settings.GOOGLEMAPS_KEY
         self.timeout = timeout or self.DEFAULT_TIMEOUT
+        self.max_retries = self.DEFAULT_MAX_RETRIES if max_retries is None else max_retries
 
     def geocode_address(
             self,
@@ -79,7 +111,8 @@ class GeocodingService:
 
     def _make_api_request(self, address: str):
         """
-        Makes HTTP request to the Google Maps Geocoding API using requests library.
+        Makes HTTP request to the Google Maps Geocoding API over the shared pooled session.
+        5xx responses and OVER_QUERY_LIMIT statuses are retried with jittered exponential backoff.
 
         Args:
             address: Formatted address string
@@ -93,28 +126,50 @@ class GeocodingService:
         query_params = {"address": address, "key": self.api_key}
         query_string = urllib.parse.urlencode(query_params)
         url = f"{self.GOOGLE_MAPS_GEOCODE_URL}?{query_string}"
-
-        try:
-            response = requests.get(url, timeout=self.timeout)
-            response.raise_for_status()
-            data = response.json()
-
-        except requests.exceptions.Timeout:
-            logger.error("Geocoding request timed out for address: %s", address)
-            raise GeocodingNetworkError(f"Request timed out for address: {address}")
-
-        except requests.exceptions.RequestException as e:
-            logger.error("Network error during geocoding: %s", str(e))
-            raise GeocodingNetworkError(f"Network error: {str(e)}")
-
-        # Check API-level status
-        status = data.get("status", "UNKNOWN_ERROR")
-        if status not in ("OK", "ZERO_RESULTS"):
-            logger.error("Geocoding API error: %s", status)
-            raise GeocodingAPIError(status)
-
-        logger.info("Geocoding request successful for address: %s", address)
-        return data
+        session = get_http_session()
+
+        attempt = 0
+        while True:
+            try:
+                response = session.get(url, timeout=self.timeout)
+                response.raise_for_status()
+                data = response.json()
+
+            except requests.exceptions.Timeout:
+                logger.error("Geocoding request timed out for address: %s", address)
+                raise GeocodingNetworkError(f"Request timed out for address: {address}")
+
+            except requests.exceptions.HTTPError as e:
+                if e.response is not None and e.response.status_code >= 500 and attempt < self.max_retries:
+                    attempt += 1
+                    self._sleep_before_retry(attempt)
+                    continue
+                logger.error("Network error during geocoding: %s", str(e))
+                raise GeocodingNetworkError(f"Network error: {str(e)}")
+
+            except requests.exceptions.RequestException as e:
+                logger.error("Network error during geocoding: %s", str(e))
+                raise GeocodingNetworkError(f"Network error: {str(e)}")
+
+            # Check API-level status
+            status = data.get("status", "UNKNOWN_ERROR")
+            if status == "OVER_QUERY_LIMIT" and attempt < self.max_retries:
+                attempt += 1
+                self._sleep_before_retry(attempt)
+                continue
+
+            if status not in ("OK", "ZERO_RESULTS"):
+                logger.error("Geocoding API error: %s", status)
+                raise GeocodingAPIError(status)
+
+            logger.info("Geocoding request successful for address: %s", address)
+            return data
+
+    def _sleep_before_retry(self, attempt: int) -> None:
+        """Sleep for a random delay up to the exponential backoff ceiling ("full jitter")."""
+
+        ceiling = min(self.RETRY_BACKOFF_MAX, self.RETRY_BACKOFF_BASE * 2 ** (attempt - 1))
+        time.sleep(random.uniform(0, ceiling))
 
     def _parse_response(self, data: GoogleMapsGeocodeResponse) -> GeocodingResult:
         """
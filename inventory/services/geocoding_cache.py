@@ -0,0 +1,223 @@
+import logging
+import re
+import threading
+import time
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import timedelta
+from django.db import IntegrityError
+from django.utils import timezone
+
+from inventory.models import GeocodingCacheEntry
+
+from .exceptions import GeocodingNoResultsError
+from .geocoding import GeocodingResult, GeocodingService
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class CachedGeocode:
+    """Cached outcome of a geocoding lookup. A result of None records that the API found no results."""
+
+    result: GeocodingResult | None
+
+
+def normalize_address_key(address: str) -> str:
+    """Normalize an address string so trivially different spellings share a cache entry."""
+
+    collapsed = re.sub(r"\s+", " ", address.casefold())
+    return re.sub(r"\s*,\s*", ", ", collapsed).strip(" ,")
+
+
+class LRUCache:
+    """Thread-safe, size-bounded in-process cache with per-entry expiry."""
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[float, CachedGeocode]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> CachedGeocode | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: CachedGeocode, ttl_seconds: float) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class GeocodingCache:
+    """
+    Two-tier cache of geocoding outcomes keyed by normalized address.
+
+    Tier 1 is an in-process LRU shared by all instances in the process; tier 2 is the
+    GeocodingCacheEntry table shared by every process. Misses ("no results") are cached
+    separately with a shorter TTL so a fixed address is retried sooner.
+    """
+
+    DEFAULT_TTL_SECONDS = 30 * 24 * 60 * 60
+    DEFAULT_NEGATIVE_TTL_SECONDS = 24 * 60 * 60
+    DEFAULT_MAX_MEMORY_ENTRIES = 10_000
+
+    _shared_memory_cache = LRUCache(DEFAULT_MAX_MEMORY_ENTRIES)
+
+    def __init__(
+        self,
+        ttl_seconds: int | None = None,
+        negative_ttl_seconds: int | None = None,
+        memory_cache: LRUCache | None = None,
+    ) -> None:
+        """
+        Initialize the cache.
+        Args:
+            ttl_seconds: Lifetime of successful results. Defaults to DEFAULT_TTL_SECONDS.
+            negative_ttl_seconds: Lifetime of "no results" outcomes. Defaults to DEFAULT_NEGATIVE_TTL_SECONDS.
+            memory_cache: In-process tier. Defaults to an LRU shared across the process.
+        """
+        self.ttl_seconds = ttl_seconds or self.DEFAULT_TTL_SECONDS
+        self.negative_ttl_seconds = negative_ttl_seconds or self.DEFAULT_NEGATIVE_TTL_SECONDS
+        self.memory_cache = memory_cache if memory_cache is not None else self._shared_memory_cache
+
+    def get(self, address_key: str) -> CachedGeocode | None:
+        """Return the cached outcome for the address, or None on a miss in both tiers."""
+
+        cached = self.memory_cache.get(address_key)
+        if cached is not None:
+            return cached
+
+        entry = GeocodingCacheEntry.objects.filter(address_key=address_key, expires_at__gt=timezone.now()).first()
+        if entry is None:
+            return None
+
+        if entry.is_negative:
+            cached = CachedGeocode(result=None)
+        else:
+            cached = CachedGeocode(result=GeocodingResult(
+                latitude=entry.latitude,
+                longitude=entry.longitude,
+                postcode=entry.postcode,
+            ))
+
+        remaining_seconds = (entry.expires_at - timezone.now()).total_seconds()
+        self.memory_cache.set(address_key, cached, remaining_seconds)
+        return cached
+
+    def set(self, address_key: str, result: GeocodingResult) -> None:
+        self._store(address_key, CachedGeocode(result=result), self.ttl_seconds)
+
+    def set_negative(self, address_key: str) -> None:
+        self._store(address_key, CachedGeocode(result=None), self.negative_ttl_seconds)
+
+    def delete_expired(self, batch_size: int = 1000) -> int:
+        """
+        Delete expired GeocodingCacheEntry rows, at most batch_size of them, oldest expiry first.
+        Expired rows are never read again but stay in the table until deleted.
+
+        Returns: Number of rows deleted.
+        """
+
+        expired_ids = list(GeocodingCacheEntry.objects
+                           .filter(expires_at__lte=timezone.now())
+                           .order_by('expires_at')
+                           .values_list('id', flat=True)[:batch_size])
+        deleted, _ = GeocodingCacheEntry.objects.filter(id__in=expired_ids).delete()
+        return deleted
+
+    def _store(self, address_key: str, cached: CachedGeocode, ttl_seconds: int) -> None:
+        self.memory_cache.set(address_key, cached, ttl_seconds)
+
+        result = cached.result
+        defaults = {
+            "latitude": result.latitude if result else None,
+            "longitude": result.longitude if result else None,
+            "postcode": result.postcode if result else None,
+            "is_negative": result is None,
+            "expires_at": timezone.now() + timedelta(seconds=ttl_seconds),
+        }
+        try:
+            GeocodingCacheEntry.objects.update_or_create(address_key=address_key, defaults=defaults)
+        except IntegrityError:
+            # another process stored the same address concurrently; either copy is valid
+            logger.info("Geocoding cache entry already stored for address: %s", address_key)
+
+
+class CachedGeocodingService(GeocodingService):
+    """GeocodingService that answers repeated addresses from a GeocodingCache instead of the API."""
+
+    def __init__(
+        self,
+        api_key: str | None = None,
+        timeout: int | None = None,
+        cache: GeocodingCache | None = None,
+    ) -> None:
+        """
+        Initialize the cached geocoding service.
+        Args:
+            api_key: Google Maps API key. Defaults to settings.GOOGLEMAPS_KEY.
+            timeout: Request timeout in seconds. Defaults to DEFAULT_TIMEOUT.
+            cache: Cache of previous outcomes. Defaults to GeocodingCache().
+        """
+        super().__init__(api_key=api_key, timeout=timeout)
+        self.cache = cache or GeocodingCache()
+
+    def cache_key(self, street_address: str, city: str, postcode: str | None = None) -> str:
+        """Key under which the outcome for this address is cached."""
+
+        return normalize_address_key(self._build_address_string(street_address, city, postcode))
+
+    def geocode_address(
+            self,
+            street_address: str,
+            city: str,
+            postcode: str | None = None,
+    ) -> GeocodingResult:
+        """
+        Retrieve geocoding data from the cache, falling back to Google Maps API on a miss.
+
+         Returns:
+            GeocodingResult with latitude, longitude, and postcode.
+
+        Raises:
+            GeocodingAPIError: If the API returns an error status.
+            GeocodingNetworkError: If a network error occurs.
+            GeocodingNoResultsError: If no results are found (cached or fresh).
+        """
+
+        address_key = self.cache_key(street_address, city, postcode)
+
+        cached = self.cache.get(address_key)
+        if cached is not None:
+            if cached.result is None:
+                raise GeocodingNoResultsError
+            return cached.result
+
+        try:
+            result = super().geocode_address(street_address, city, postcode)
+        except GeocodingNoResultsError:
+            self.cache.set_negative(address_key)
+            raise
+
+        self.cache.set(address_key, result)
+        return result
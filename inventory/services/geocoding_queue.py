@@ -0,0 +1,251 @@
+import logging
+import time
+
+from datetime import timedelta
+from typing import Any
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from inventory.exceptions import NonNumericPostcodeError
+from inventory.models import GeocodingJob, GeocodingStatus, Retailer
+
+from .exceptions import GeocodingAPIError, GeocodingError, GeocodingNetworkError
+from .geocoding import GeocodingResult, GeocodingService
+from .geocoding_cache import CachedGeocodingService, GeocodingCache
+
+logger = logging.getLogger(__name__)
+
+# columns a successful job writes; geohash is derived from the coordinates on save
+GEOCODED_FIELDS = ['latitude', 'longitude', 'postcode', 'geohash', 'geocoding_status', 'timestamp_last_updated']
+
+# Google statuses that may succeed if the same request is sent again later
+RETRYABLE_API_STATUSES = frozenset({"OVER_QUERY_LIMIT", "UNKNOWN_ERROR"})
+
+
+def apply_geocoding_result(retailer: Retailer, geocoding_result: GeocodingResult) -> None:
+    """
+    Apply geocoding results to retailer object (not saved). A postcode provided by the user is never overwritten.
+
+    Raises:
+        NonNumericPostcodeError: If the postcode needs to be filled in and the geocoded one is not numeric.
+    """
+
+    if not retailer.postcode and geocoding_result.postcode is not None:
+        try:
+            numerical_postcode = int(geocoding_result.postcode)
+        except ValueError:
+            raise NonNumericPostcodeError
+        retailer.postcode = numerical_postcode
+
+    retailer.latitude = geocoding_result.latitude
+    retailer.longitude = geocoding_result.longitude
+
+
+def geocoded_address(retailer: Retailer) -> dict[str, str | None]:
+    """The address a retailer is geocoded from, as keyword arguments of GeocodingService.geocode_address."""
+
+    return {
+        'street_address': retailer.street_address,
+        'city': retailer.city,
+        'postcode': str(retailer.postcode) if retailer.postcode else None,
+    }
+
+
+def enqueue_geocoding(retailer: Retailer) -> GeocodingJob:
+    """Queue a retailer for geocoding by the background worker."""
+
+    return GeocodingJob.objects.create(retailer=retailer)
+
+
+def enqueue_geocoding_bulk(retailer_ids: list[int]) -> int:
+    """
+    Queue many retailers for geocoding with one insert, skipping those that already have an active job.
+
+    Returns: Number of jobs queued.
+    """
+
+    active_statuses = [GeocodingJob.Status.QUEUED, GeocodingJob.Status.RUNNING]
+    already_queued = set(GeocodingJob.objects
+                         .filter(retailer_id__in=retailer_ids, status__in=active_statuses)
+                         .values_list('retailer_id', flat=True))
+    jobs = [GeocodingJob(retailer_id=retailer_id) for retailer_id in dict.fromkeys(retailer_ids)
+            if retailer_id not in already_queued]
+    return len(GeocodingJob.objects.bulk_create(jobs))
+
+
+class GeocodingWorker:
+    """Claims due GeocodingJobs, geocodes their retailers, and retries transient failures with backoff."""
+
+    DEFAULT_BATCH_SIZE = 20
+    DEFAULT_MAX_ATTEMPTS = 5
+    BACKOFF_BASE_SECONDS = 30
+    BACKOFF_MAX_SECONDS = 60 * 60
+
+    # a claimed job becomes claimable again if its worker dies before finishing it
+    LEASE_SECONDS = 5 * 60
+
+    # how often run_once deletes expired rows from the shared geocoding cache table
+    CACHE_PURGE_INTERVAL_SECONDS = 60 * 60
+    CACHE_PURGE_BATCH_SIZE = 1000
+
+    def __init__(
+        self,
+        geocoding_service: GeocodingService | None = None,
+        batch_size: int | None = None,
+        max_attempts: int | None = None,
+    ) -> None:
+        """
+        Initialize the worker.
+        Args:
+            geocoding_service: Service used for lookups. Defaults to CachedGeocodingService().
+            batch_size: Jobs claimed per run_once call. Defaults to DEFAULT_BATCH_SIZE.
+            max_attempts: Attempts before a retryable job is marked failed. Defaults to DEFAULT_MAX_ATTEMPTS.
+        """
+        self.geocoding_service = geocoding_service or CachedGeocodingService()
+        self.batch_size = batch_size or self.DEFAULT_BATCH_SIZE
+        self.max_attempts = max_attempts or self.DEFAULT_MAX_ATTEMPTS
+        self._next_cache_purge = 0.0
+
+    def run_once(self) -> int:
+        """
+        Process one batch of due jobs.
+
+        Returns: Number of jobs processed.
+        """
+
+        self._purge_geocoding_cache()
+
+        jobs = self._claim_jobs()
+        for job in jobs:
+            try:
+                self._process_job(job)
+            except Exception:
+                # the job stays running and is claimed again once its lease expires
+                logger.exception("Geocoding job %d for retailer %d failed unexpectedly.", job.id, job.retailer_id)
+        return len(jobs)
+
+    def _purge_geocoding_cache(self) -> None:
+        """Delete expired geocoding cache entries, in batches, at most once per CACHE_PURGE_INTERVAL_SECONDS."""
+
+        now = time.monotonic()
+        if now < self._next_cache_purge:
+            return
+        self._next_cache_purge = now + self.CACHE_PURGE_INTERVAL_SECONDS
+
+        cache, deleted = GeocodingCache(), 0
+        while True:
+            batch_deleted = cache.delete_expired(batch_size=self.CACHE_PURGE_BATCH_SIZE)
+            deleted += batch_deleted
+            if batch_deleted < self.CACHE_PURGE_BATCH_SIZE:
+                break
+        if deleted:
+            logger.info("Deleted %d expired geocoding cache entries.", deleted)
+
+    def _claim_jobs(self) -> list[GeocodingJob]:
+        """Lock a batch of due jobs, mark them running, and return them. Concurrent workers skip locked rows."""
+
+        now = timezone.now()
+        with transaction.atomic():
+            job_ids = list(
+                GeocodingJob.objects.select_for_update(skip_locked=True)
+                .filter(
+                    status__in=[GeocodingJob.Status.QUEUED, GeocodingJob.Status.RUNNING],
+                    next_attempt_at__lte=now,
+                )
+                .order_by('next_attempt_at')
+                .values_list('id', flat=True)[:self.batch_size]
+            )
+            GeocodingJob.objects.filter(id__in=job_ids).update(
+                status=GeocodingJob.Status.RUNNING,
+                attempts=F('attempts') + 1,
+                next_attempt_at=now + timedelta(seconds=self.LEASE_SECONDS),
+            )
+
+        return list(GeocodingJob.objects.filter(id__in=job_ids).select_related('retailer').order_by('id'))
+
+    def _process_job(self, job: GeocodingJob) -> None:
+        address = geocoded_address(job.retailer)
+
+        try:
+            geocoding_result = self.geocoding_service.geocode_address(**address)
+        except GeocodingError as e:
+            if self._is_retryable(e) and job.attempts < self.max_attempts:
+                self._schedule_retry(job, e)
+            else:
+                self._mark_failed(job, str(e))
+            return
+
+        # the retailer may have been edited or deleted while the geocoder was waited on
+        with transaction.atomic():
+            retailer = self._lock_retailer(job)
+            if retailer is None:
+                return
+            if geocoded_address(retailer) != address:
+                # the result is for an outdated address: geocode the current one instead, without counting an attempt
+                self._update_job(job, status=GeocodingJob.Status.QUEUED, attempts=F('attempts') - 1,
+                                 next_attempt_at=timezone.now())
+                logger.info("Address of retailer '%s' changed while it was geocoded; geocoding it again.",
+                            retailer.name)
+                return
+
+            try:
+                apply_geocoding_result(retailer, geocoding_result)
+            except NonNumericPostcodeError as e:
+                self._mark_failed(job, e.message)
+                return
+
+            retailer.geocoding_status = GeocodingStatus.SUCCEEDED
+            # only the geocoded columns, so fields edited meanwhile are not overwritten
+            retailer.save(update_fields=GEOCODED_FIELDS)
+            self._update_job(job, status=GeocodingJob.Status.SUCCEEDED)
+
+        logger.info("Geocoded retailer '%s' after %d attempt(s).", retailer.name, job.attempts)
+
+    def _is_retryable(self, error: GeocodingError) -> bool:
+        if isinstance(error, GeocodingNetworkError):
+            return True
+        return isinstance(error, GeocodingAPIError) and error.status in RETRYABLE_API_STATUSES
+
+    def _schedule_retry(self, job: GeocodingJob, error: GeocodingError) -> None:
+        delay = min(self.BACKOFF_BASE_SECONDS * 2 ** (job.attempts - 1), self.BACKOFF_MAX_SECONDS)
+        self._update_job(
+            job,
+            status=GeocodingJob.Status.QUEUED,
+            next_attempt_at=timezone.now() + timedelta(seconds=delay),
+            last_error=str(error),
+        )
+
+        logger.warning(
+            "Geocoding attempt %d failed for retailer '%s': %s. Retrying in %d seconds.",
+            job.attempts, job.retailer.name, str(error), delay,
+        )
+
+    def _mark_failed(self, job: GeocodingJob, error_message: str) -> None:
+        with transaction.atomic():
+            retailer = self._lock_retailer(job)
+            if retailer is None:
+                return
+            retailer.geocoding_status = GeocodingStatus.FAILED
+            retailer.save(update_fields=['geocoding_status', 'timestamp_last_updated'])
+            self._update_job(job, status=GeocodingJob.Status.FAILED, last_error=error_message)
+
+        logger.warning(
+            "Geocoding failed for retailer '%s': %s. Continuing without coordinates.",
+            retailer.name, error_message,
+        )
+
+    def _lock_retailer(self, job: GeocodingJob) -> Retailer | None:
+        """
+        The job's retailer as currently stored, locked until the transaction ends. None if it was
+        deleted, which also deleted the job (by cascade), so there is nothing left to record.
+        """
+
+        retailer = Retailer.objects.select_for_update().filter(pk=job.retailer_id).first()
+        if retailer is None:
+            logger.info("Retailer %d was deleted while it was geocoded; dropping its job.", job.retailer_id)
+        return retailer
+
+    def _update_job(self, job: GeocodingJob, **fields: Any) -> None:
+        # an update rather than job.save(), which would fail if the job was deleted with its retailer
+        GeocodingJob.objects.filter(pk=job.pk).update(timestamp_last_updated=timezone.now(), **fields)
@@ -0,0 +1,53 @@
+import threading
+import time
+
+from collections.abc import Callable
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket. Tokens refill continuously at `rate` per second up to `capacity`;
+    acquire() blocks until a token is available, so callers never exceed the rate on average.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: float | None = None,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        """
+        Initialize the bucket (full).
+        Args:
+            rate: Tokens added per second, i.e. the sustained requests per second.
+            capacity: Largest burst allowed. Defaults to one second's worth of tokens (at least 1).
+            clock: Monotonic time source; injectable for tests.
+            sleep: Sleep function; injectable for tests.
+        """
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = self.capacity
+        self._updated_at = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Take one token, waiting for the bucket to refill if it is empty."""
+
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+                self._updated_at = now
+
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait_seconds = (1 - self._tokens) / self.rate
+
+            self._sleep(wait_seconds)
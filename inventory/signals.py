@@ -0,0 +1,168 @@
+"""Signal receivers that keep derived Retailer columns, read models and read caches in sync with their source fields."""
+
+from typing import Any
+
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import Signal, receiver
+
+from .availability import forget_soda_bit, retailer_ids_counted_with_bit, sync_availability
+from .caching import bump_generation
+from .documents import refresh_documents
+from .models import Retailer, RetailerTombstone, Soda
+from .soda_mask import clear_soda_bit, next_free_bit_index, recompute_soda_masks, set_soda_bit
+from .spatial import encode_geohash
+
+# Sent with `retailer_ids` after retailers are written in bulk (bulk_create/bulk_update/update),
+# which bypasses save() and the model signals below.
+retailers_bulk_changed = Signal()
+
+
+@receiver(pre_save, sender=Retailer)
+def set_retailer_geohash(sender: type[Retailer], instance: Retailer, **kwargs: Any) -> None:
+    """Derive the geohash from coordinates. Runs for fixtures too, since loaddata bypasses save()."""
+
+    if instance.latitude is None or instance.longitude is None:
+        instance.geohash = ""
+    else:
+        instance.geohash = encode_geohash(instance.latitude, instance.longitude)
+
+
+@receiver(pre_save, sender=Soda)
+def assign_soda_bit_index(sender: type[Soda], instance: Soda, **kwargs: Any) -> None:
+    if instance.bit_index is None:
+        instance.bit_index = next_free_bit_index()
+
+
+@receiver(post_save, sender=Soda)
+def sync_fixture_soda_bit(sender: type[Soda], instance: Soda, raw: bool, **kwargs: Any) -> None:
+    """loaddata may link retailers to a soda before the soda row exists; set its bit once it does."""
+
+    if raw:
+        retailers = Retailer.objects.filter(sodas=instance)
+        set_soda_bit(retailers, instance.bit_index)
+        sync_availability(retailers.values_list('id', flat=True))
+        refresh_documents(retailers.values_list('id', flat=True))
+
+
+@receiver(m2m_changed, sender=Retailer.sodas.through)
+def sync_retailer_soda_mask(
+    sender: Any, instance: Retailer | Soda, action: str, reverse: bool, pk_set: set[int] | None, **kwargs: Any
+) -> None:
+    """Mirror every change to Retailer.sodas (from either side of the relation) into Retailer.soda_mask."""
+
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if not reverse:
+        recompute_soda_masks([instance.pk])
+        return
+
+    # soda.retailer_set changed: flip this soda's bit on the affected retailers
+    if action == 'post_add':
+        set_soda_bit(Retailer.objects.filter(id__in=pk_set), instance.bit_index)
+    elif action == 'post_remove':
+        clear_soda_bit(Retailer.objects.filter(id__in=pk_set), instance.bit_index)
+    else:
+        clear_soda_bit(Retailer.objects.all(), instance.bit_index)
+
+
+@receiver(pre_delete, sender=Soda)
+def clear_deleted_soda_bit(sender: type[Soda], instance: Soda, **kwargs: Any) -> None:
+    """Memberships are removed by cascade (no m2m_changed signal), so release the soda's bit here."""
+
+    if instance.bit_index is not None:
+        clear_soda_bit(Retailer.objects.all(), instance.bit_index)
+        # the soda's rollups are deleted by cascade
+        forget_soda_bit(instance.bit_index)
+
+
+@receiver(post_delete, sender=Retailer)
+def record_retailer_tombstone(sender: type[Retailer], instance: Retailer, **kwargs: Any) -> None:
+    """Deleted rows cannot be read back, so the change feed reports deletions from these (see inventory.changes)."""
+
+    RetailerTombstone.objects.create(retailer_id=instance.pk)
+
+
+@receiver(post_save, sender=Retailer)
+@receiver(post_delete, sender=Retailer)
+def sync_retailer_availability(sender: type[Retailer], instance: Retailer, **kwargs: Any) -> None:
+    sync_availability([instance.pk])
+
+
+@receiver(m2m_changed, sender=Retailer.sodas.through)
+def sync_membership_availability(
+    sender: Any, instance: Retailer | Soda, action: str, reverse: bool, pk_set: set[int] | None, **kwargs: Any
+) -> None:
+    """Registered after sync_retailer_soda_mask, so the masks it reads are already updated."""
+
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if not reverse:
+        sync_availability([instance.pk])
+    elif action == 'post_clear':
+        sync_availability(retailer_ids_counted_with_bit(instance.bit_index))
+    else:
+        sync_availability(pk_set or ())
+
+
+@receiver(retailers_bulk_changed)
+def sync_bulk_availability(sender: Any, retailer_ids: list[int], **kwargs: Any) -> None:
+    sync_availability(retailer_ids)
+
+
+@receiver(post_save, sender=Retailer)
+def refresh_retailer_document(sender: type[Retailer], instance: Retailer, **kwargs: Any) -> None:
+    # a deleted retailer's document is deleted by cascade
+    refresh_documents([instance.pk])
+
+
+@receiver(m2m_changed, sender=Retailer.sodas.through)
+def refresh_membership_documents(
+    sender: Any, instance: Retailer | Soda, action: str, reverse: bool, pk_set: set[int] | None, **kwargs: Any
+) -> None:
+    """Registered after sync_retailer_soda_mask, so documents record the timestamps its updates set."""
+
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            refresh_documents([instance.pk])
+    elif action == 'pre_clear':
+        # the cleared memberships cannot be read back afterwards
+        instance._document_retailer_ids = list(instance.retailer_set.values_list('id', flat=True))
+    elif action == 'post_clear':
+        refresh_documents(getattr(instance, '_document_retailer_ids', ()))
+    elif action in ('post_add', 'post_remove'):
+        refresh_documents(pk_set or ())
+
+
+@receiver(pre_delete, sender=Soda)
+def collect_deleted_soda_retailers(sender: type[Soda], instance: Soda, **kwargs: Any) -> None:
+    # memberships are deleted by cascade, without m2m_changed
+    instance._document_retailer_ids = list(instance.retailer_set.values_list('id', flat=True))
+
+
+@receiver(post_delete, sender=Soda)
+def refresh_deleted_soda_documents(sender: type[Soda], instance: Soda, **kwargs: Any) -> None:
+    refresh_documents(getattr(instance, '_document_retailer_ids', ()))
+
+
+@receiver(retailers_bulk_changed)
+def refresh_bulk_documents(sender: Any, retailer_ids: list[int], **kwargs: Any) -> None:
+    refresh_documents(retailer_ids)
+
+
+@receiver(post_save, sender=Retailer)
+@receiver(post_save, sender=Soda)
+@receiver(post_delete, sender=Retailer)
+@receiver(post_delete, sender=Soda)
+@receiver(m2m_changed, sender=Retailer.sodas.through)
+@receiver(retailers_bulk_changed)
+def invalidate_read_caches(sender: Any, **kwargs: Any) -> None:
+    """
+    Bumps the generation once the write is committed. Bumped earlier, a concurrent read could still
+    see the old rows and cache them under the new generation, where no later bump would replace them.
+    """
+
+    if kwargs.get('action', 'post_').startswith('post_'):
+        transaction.on_commit(bump_generation)
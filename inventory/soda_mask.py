@@ -0,0 +1,82 @@
+"""
+Helpers for Retailer.soda_mask, a denormalized bitset of the sodas each retailer stocks.
+
+Every Soda owns one bit (Soda.bit_index), so "stocks CH and CZ" becomes the single predicate
+`soda_mask & mask == mask` on the retailer table instead of joins on the retailer-soda table.
+
+Writing the mask also bumps timestamp_last_updated, since a membership change is a change to the retailer.
+It is stamped with timezone.now(), the clock of every other change (see inventory.changes).
+"""
+
+from collections.abc import Iterable
+
+from django.db.models import F, QuerySet
+from django.utils import timezone
+
+from .exceptions import SodaCapacityError
+from .models import Retailer, Soda
+
+# bit 63 is the sign bit of the BigIntegerField column, so it is never assigned
+MAX_SODAS = 63
+
+
+def mask_for_bits(bit_indexes: Iterable[int | None]) -> int:
+    mask = 0
+    for bit_index in bit_indexes:
+        if bit_index is not None:
+            mask |= 1 << bit_index
+    return mask
+
+
+def bits_in_mask(mask: int) -> list[int]:
+    return [bit_index for bit_index in range(MAX_SODAS) if mask & (1 << bit_index)]
+
+
+def next_free_bit_index() -> int:
+    """Lowest bit not owned by any soda. Raises SodaCapacityError if all MAX_SODAS bits are taken."""
+
+    taken = set(Soda.objects.exclude(bit_index__isnull=True).values_list('bit_index', flat=True))
+    for bit_index in range(MAX_SODAS):
+        if bit_index not in taken:
+            return bit_index
+    raise SodaCapacityError
+
+
+def recompute_soda_masks(retailer_ids: Iterable[int]) -> None:
+    """Rebuild soda_mask from the retailer-soda join table for the given retailers."""
+
+    retailer_ids = list(retailer_ids)
+    masks = dict.fromkeys(retailer_ids, 0)
+    memberships = (Retailer.sodas.through.objects
+                   .filter(retailer_id__in=retailer_ids)
+                   .values_list('retailer_id', 'soda__bit_index'))
+    for retailer_id, bit_index in memberships:
+        masks[retailer_id] |= mask_for_bits([bit_index])
+
+    retailer_ids_by_mask: dict[int, list[int]] = {}
+    for retailer_id, mask in masks.items():
+        retailer_ids_by_mask.setdefault(mask, []).append(retailer_id)
+
+    for mask, ids in retailer_ids_by_mask.items():
+        Retailer.objects.filter(id__in=ids).update(soda_mask=mask, timestamp_last_updated=timezone.now())
+
+
+def set_soda_bit(retailers: QuerySet[Retailer], bit_index: int) -> None:
+    retailers.update(soda_mask=F('soda_mask').bitor(1 << bit_index), timestamp_last_updated=timezone.now())
+
+
+def clear_soda_bit(retailers: QuerySet[Retailer], bit_index: int) -> None:
+    bit = 1 << bit_index
+    (retailers
+     .alias(soda_bit=F('soda_mask').bitand(bit))
+     .filter(soda_bit=bit)
+     .update(soda_mask=F('soda_mask').bitand(~bit), timestamp_last_updated=timezone.now()))
+
+
+def filter_by_soda_mask(queryset: QuerySet[Retailer], mask: int, match_all: bool) -> QuerySet[Retailer]:
+    """Retailers whose soda_mask contains every bit of mask (match_all) or at least one of them."""
+
+    matched = queryset.alias(matched_sodas=F('soda_mask').bitand(mask))
+    if match_all:
+        return matched.filter(matched_sodas=mask)
+    return matched.filter(matched_sodas__gt=0)
@@ -0,0 +1,145 @@
+"""Geohash grid index and distance helpers for retailer location lookups."""
+
+import math
+
+from dataclasses import dataclass
+from decimal import Decimal
+
+GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+GEOHASH_PRECISION = 9  # ~5m x 5m cells; precision stored on Retailer.geohash
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LATITUDE = 111.32
+
+
+@dataclass(frozen=True)
+class BoundingBox:
+    """Axis-aligned rectangle in degrees. min_lng > max_lng means the box crosses the antimeridian."""
+
+    min_lat: float
+    min_lng: float
+    max_lat: float
+    max_lng: float
+
+    @property
+    def crosses_antimeridian(self) -> bool:
+        return self.min_lng > self.max_lng
+
+
+def encode_geohash(latitude: float | Decimal, longitude: float | Decimal, precision: int = GEOHASH_PRECISION) -> str:
+    """Encode a coordinate as a base32 geohash of the given length."""
+
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    lat, lng = float(latitude), float(longitude)
+
+    geohash = []
+    bits = 0
+    bit_count = 0
+    even_bit = True  # geohash interleaves bits starting with longitude
+
+    while len(geohash) < precision:
+        value_range, value = (lng_range, lng) if even_bit else (lat_range, lat)
+        midpoint = (value_range[0] + value_range[1]) / 2
+        if value >= midpoint:
+            bits = (bits << 1) | 1
+            value_range[0] = midpoint
+        else:
+            bits = bits << 1
+            value_range[1] = midpoint
+        even_bit = not even_bit
+
+        bit_count += 1
+        if bit_count == 5:
+            geohash.append(GEOHASH_ALPHABET[bits])
+            bits = 0
+            bit_count = 0
+
+    return "".join(geohash)
+
+
+def geohash_cell_size(precision: int) -> tuple[float, float]:
+    """Return (height, width) in degrees of a geohash cell at the given precision."""
+
+    total_bits = 5 * precision
+    lng_bits = (total_bits + 1) // 2
+    lat_bits = total_bits // 2
+    return 180.0 / (2 ** lat_bits), 360.0 / (2 ** lng_bits)
+
+
+def bounding_box_for_radius(latitude: float, longitude: float, radius_km: float) -> BoundingBox:
+    """Smallest bounding box containing every point within radius_km of the center."""
+
+    delta_lat = radius_km / KM_PER_DEGREE_LATITUDE
+    cos_lat = math.cos(math.radians(latitude))
+    delta_lng = 360.0 if cos_lat < 1e-9 else radius_km / (KM_PER_DEGREE_LATITUDE * cos_lat)
+
+    min_lat = max(latitude - delta_lat, -90.0)
+    max_lat = min(latitude + delta_lat, 90.0)
+    if delta_lng >= 180.0:
+        return BoundingBox(min_lat=min_lat, min_lng=-180.0, max_lat=max_lat, max_lng=180.0)
+
+    min_lng = longitude - delta_lng
+    max_lng = longitude + delta_lng
+    if min_lng < -180.0:
+        min_lng += 360.0
+    if max_lng > 180.0:
+        max_lng -= 360.0
+    return BoundingBox(min_lat=min_lat, min_lng=min_lng, max_lat=max_lat, max_lng=max_lng)
+
+
+def geohash_cells_covering(bbox: BoundingBox, max_cells_per_axis: int = 2) -> list[str]:
+    """
+    Geohash prefixes whose cells together cover the bounding box.
+
+    Picks the finest precision at which the box spans at most max_cells_per_axis cells
+    on each axis, so a lookup reads only a handful of index ranges.
+
+    Returns: List of geohash prefixes. Empty if the box is too large (or wraps the
+    antimeridian) for a prefix search to narrow anything down.
+    """
+
+    if bbox.crosses_antimeridian:
+        return []
+
+    height = bbox.max_lat - bbox.min_lat
+    width = bbox.max_lng - bbox.min_lng
+
+    precision = 0
+    for candidate in range(GEOHASH_PRECISION, 0, -1):
+        cell_height, cell_width = geohash_cell_size(candidate)
+        if height <= cell_height * (max_cells_per_axis - 1) and width <= cell_width * (max_cells_per_axis - 1):
+            precision = candidate
+            break
+
+    if precision == 0:
+        return []
+
+    cell_height, cell_width = geohash_cell_size(precision)
+    lat_rows = range(
+        int((bbox.min_lat + 90.0) // cell_height),
+        min(int((bbox.max_lat + 90.0) // cell_height), int(180.0 / cell_height) - 1) + 1,
+    )
+    lng_columns = range(
+        int((bbox.min_lng + 180.0) // cell_width),
+        min(int((bbox.max_lng + 180.0) // cell_width), int(360.0 / cell_width) - 1) + 1,
+    )
+
+    cells = set()
+    for row in lat_rows:
+        for column in lng_columns:
+            center_lat = -90.0 + (row + 0.5) * cell_height
+            center_lng = -180.0 + (column + 0.5) * cell_width
+            cells.add(encode_geohash(center_lat, center_lng, precision))
+
+    return sorted(cells)
+
+
+def haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Great-circle distance between two coordinates in kilometers."""
+
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    delta_phi = math.radians(lat2 - lat1)
+    delta_lambda = math.radians(lng2 - lng1)
+
+    a = math.sin(delta_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(delta_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
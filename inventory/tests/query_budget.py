@@ -0,0 +1,44 @@
+"""Query-count budgets for read endpoints, so a regression from O(1) to O(n) queries fails its tests."""
+
+from collections.abc import Callable
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from webtest import TestResponse
+
+
+class QueryBudgetMixin:
+    """Mixin for WebTest test cases. Requests are made with a cold response cache, so they reach the database."""
+
+    def get_with_query_budget(self, url: str, max_queries: int) -> TestResponse:
+        """GET url and fail if it runs more than max_queries queries."""
+
+        response, _ = self._get_counting_queries(url, max_queries)
+        return response
+
+    def assertConstantQueries(self, url: str, add_rows: Callable[[], None], max_queries: int) -> None:
+        """
+        GET url within max_queries, add rows to its result with add_rows, and GET it again:
+        the second request must run the same number of queries.
+        """
+
+        _, queries_before = self._get_counting_queries(url, max_queries)
+        add_rows()
+        _, queries_after = self._get_counting_queries(url, max_queries)
+
+        self.assertEqual(
+            len(queries_after), len(queries_before),
+            f"GET {url} runs more queries as it returns more rows:\n" + "\n".join(queries_after),
+        )
+
+    def _get_counting_queries(self, url: str, max_queries: int) -> tuple[TestResponse, list[str]]:
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            response = self.app.get(url)
+
+        queries = [query["sql"] for query in context.captured_queries]
+        self.assertLessEqual(
+            len(queries), max_queries,
+            f"GET {url} ran {len(queries)} queries (budget {max_queries}):\n" + "\n".join(queries),
+        )
+        return response, queries
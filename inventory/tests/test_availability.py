@@ -0,0 +1,125 @@
+from collections import Counter
+from django.test import TestCase
+from django_webtest import WebTest
+
+from inventory.models import AvailabilityRollup, Retailer, Soda
+from inventory.services.bulk_import import upsert_retailers
+
+
+def rollup_counts() -> Counter:
+    return Counter({(level, key, soda_id): count for level, key, soda_id, count in
+                    AvailabilityRollup.objects.values_list('level', 'key', 'soda_id', 'retailer_count') if count})
+
+
+def recounted() -> Counter:
+    """The rollups recomputed from scratch from the retailer-soda table."""
+
+    counts: Counter = Counter()
+    for postcode, city, country, soda_id in Retailer.objects.values_list('postcode', 'city', 'country', 'sodas'):
+        if soda_id is None:
+            continue
+        for level, key in (('postcode', '' if postcode is None else str(postcode)), ('city', city), ('country', country)):
+            if key:
+                counts[(level, key, soda_id)] += 1
+    return counts
+
+
+class AvailabilityRollupTestCase(TestCase):
+    """Retailer counts per soda and area stay equal to a full recount across every kind of write"""
+
+    def setUp(self) -> None:
+        self.cherry = Soda.objects.create(name="CherryCokeZero", abbreviation="CZ", low_calorie=True)
+        self.classic = Soda.objects.create(name="Coke Classic", abbreviation="CC", low_calorie=False)
+        self.shell = Retailer.objects.create(
+            name="Shell", street_address="598 Bryant Street", city="San Francisco", postcode=94107, country="US")
+        self.corner = Retailer.objects.create(
+            name="Corner", street_address="1 Market Street", city="San Francisco", postcode=94105, country="US")
+
+    def test_membership_changes_update_rollups(self) -> None:
+        self.shell.sodas.add(self.cherry, self.classic)
+        self.cherry.retailer_set.add(self.corner)
+
+        counts = rollup_counts()
+        self.assertEqual(counts[('city', 'San Francisco', self.cherry.id)], 2)
+        self.assertEqual(counts[('postcode', '94107', self.classic.id)], 1)
+        self.assertEqual(counts[('country', 'US', self.cherry.id)], 2)
+        self.assertEqual(counts, recounted())
+
+        self.shell.sodas.remove(self.cherry)
+        self.classic.retailer_set.clear()
+        self.assertEqual(rollup_counts(), recounted())
+        self.assertEqual(rollup_counts()[('city', 'San Francisco', self.cherry.id)], 1)
+
+    def test_moving_and_deleting_retailers_update_rollups(self) -> None:
+        self.shell.sodas.add(self.cherry)
+        self.corner.sodas.add(self.cherry)
+
+        self.shell.city = "Oakland"
+        self.shell.postcode = None
+        self.shell.save()
+        self.assertEqual(rollup_counts(), recounted())
+        self.assertEqual(rollup_counts()[('city', 'Oakland', self.cherry.id)], 1)
+
+        self.corner.delete()
+        self.assertEqual(rollup_counts(), recounted())
+
+        self.cherry.delete()
+        self.assertEqual(rollup_counts(), Counter())
+
+    def test_bulk_upsert_updates_rollups(self) -> None:
+        upsert_retailers([
+            {"name": "Shell", "street_address": "598 Bryant Street", "city": "Berkeley", "postcode": 94704,
+             "country": "US", "sodas": [self.classic.id]},
+            {"name": "New", "street_address": "2 New Street", "city": "Berkeley", "postcode": 94704,
+             "country": "US", "sodas": [self.classic.id, self.cherry.id]},
+        ])
+
+        self.assertEqual(rollup_counts()[('postcode', '94704', self.classic.id)], 2)
+        self.assertEqual(rollup_counts(), recounted())
+
+
+class AvailabilityWebTestCase(WebTest):
+    def setUp(self) -> None:
+        self.cherry = Soda.objects.create(name="CherryCokeZero", abbreviation="CZ", low_calorie=True)
+        self.classic = Soda.objects.create(name="Coke Classic", abbreviation="CC", low_calorie=False)
+        shell = Retailer.objects.create(name="Shell", street_address="598 Bryant Street", city="San Francisco", postcode=94107)
+        corner = Retailer.objects.create(name="Corner", street_address="1 Market Street", city="San Francisco", postcode=94105)
+        shell.sodas.add(self.cherry, self.classic)
+        corner.sodas.add(self.cherry)
+
+    def test_view_availability_by_city_returns_counts_per_soda(self) -> None:
+        """HTTP get request to availability returns the number of retailers stocking each soda in the area"""
+
+        get_response = self.app.get('/api/availability/?city=San Francisco')
+        self.assertEqual(get_response.json["level"], "city")
+        self.assertEqual(
+            [(soda["abbreviation"], soda["retailer_count"]) for soda in get_response.json["sodas"]],
+            [("CZ", 2), ("CC", 1)],
+        )
+        self.assertEqual(get_response.json["sodas"][0]["soda"], f"http://testserver/api/sodas/{self.cherry.id}/")
+
+        postcode_response = self.app.get('/api/availability/?postcode=94105')
+        self.assertEqual([soda["abbreviation"] for soda in postcode_response.json["sodas"]], ["CZ"])
+
+    def test_view_availability_by_postcode_matches_the_stored_integer(self) -> None:
+        """HTTP get request to availability finds a postcode however its digits are padded, and rejects non-numbers"""
+
+        padded_response = self.app.get('/api/availability/?postcode=%2094105')
+        self.assertEqual(padded_response.json["key"], "94105")
+        self.assertEqual([soda["abbreviation"] for soda in padded_response.json["sodas"]], ["CZ"])
+
+        Retailer.objects.create(name="Gas", street_address="1 Main Street", city="Portsmouth", postcode=801).sodas.add(self.classic)
+        zero_padded_response = self.app.get('/api/availability/?postcode=00801')
+        self.assertEqual(zero_padded_response.json["key"], "801")
+        self.assertEqual([soda["abbreviation"] for soda in zero_padded_response.json["sodas"]], ["CC"])
+
+        invalid_response = self.app.get('/api/availability/?postcode=SW1A', expect_errors=True)
+        self.assertEqual(invalid_response.status, "400 Bad Request")
+        self.assertIn("postcode", invalid_response.json)
+
+    def test_view_availability_without_exactly_one_area_returns_400(self) -> None:
+        """HTTP get request to availability with no area, or several, returns 400"""
+
+        self.assertEqual(self.app.get('/api/availability/', expect_errors=True).status, "400 Bad Request")
+        self.assertEqual(self.app.get('/api/availability/?city=Oakland&postcode=94607', expect_errors=True).status,
+                         "400 Bad Request")
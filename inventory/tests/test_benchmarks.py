@@ -0,0 +1,72 @@
+import random
+
+from django.test import TestCase
+from django.urls import URLPattern, URLResolver, resolve
+from urllib.parse import urlsplit
+
+from benchmarks.dataset import generate_dataset
+from benchmarks.driver import build_routes, run_routes
+from inventory import urls
+from inventory.models import GeocodingStatus, Retailer, Soda
+from inventory.soda_mask import mask_for_bits
+
+
+class BenchmarkDatasetTestCase(TestCase):
+    """The benchmark generator produces consistent, reproducible data that every route can be run against"""
+
+    def test_generated_retailers_have_derived_fields(self) -> None:
+        dataset = generate_dataset(retailer_count=50, soda_count=5, seed=7)
+
+        self.assertEqual(Retailer.objects.count(), 50)
+        self.assertEqual(Retailer.sodas.through.objects.count(), dataset.link_count)
+        for retailer in Retailer.objects.prefetch_related('sodas'):
+            self.assertEqual(retailer.soda_mask, mask_for_bits(soda.bit_index for soda in retailer.sodas.all()))
+            self.assertTrue(retailer.geohash)
+            self.assertEqual(retailer.geocoding_status, GeocodingStatus.SUCCEEDED)
+
+    def test_same_seed_generates_same_rows(self) -> None:
+        generate_dataset(retailer_count=20, soda_count=4, seed=3)
+        first_rows = list(Retailer.objects.order_by('id').values_list('name', 'postcode', 'latitude', 'soda_mask'))
+
+        Retailer.objects.all().delete()
+        Soda.objects.all().delete()
+        generate_dataset(retailer_count=20, soda_count=4, seed=3)
+        second_rows = list(Retailer.objects.order_by('id').values_list('name', 'postcode', 'latitude', 'soda_mask'))
+
+        self.assertEqual(first_rows, second_rows)
+
+    def test_every_route_runs_without_errors(self) -> None:
+        generate_dataset(retailer_count=30, soda_count=4, seed=1)
+
+        results = run_routes(build_routes(), requests_per_route=2)
+
+        for result in results:
+            self.assertEqual(result.errors, 0, result.route.name)
+            self.assertEqual(len(result.latencies), 2)
+
+    def test_routes_cover_every_endpoint(self) -> None:
+        """Every endpoint of inventory/urls.py is benchmarked, except the browsable API root and the event stream"""
+
+        generate_dataset(retailer_count=5, soda_count=2, seed=1)
+        rng = random.Random(0)
+
+        benchmarked = set()
+        for route in build_routes():
+            match = resolve(urlsplit(route.build(rng)[0]).path)
+            benchmarked.add(match.url_name or match.func.__name__)
+
+        endpoints = _endpoint_names(urls.urlpatterns) - {'api-root', 'retailer_events'}
+        self.assertEqual(endpoints - benchmarked, set())
+
+
+def _endpoint_names(patterns: list[URLPattern | URLResolver]) -> set[str]:
+    """Names of the views (or of the router routes, e.g. retailer-bulk) in a urlconf, without the login views."""
+
+    names = set()
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            if pattern.namespace != 'rest_framework':
+                names |= _endpoint_names(pattern.url_patterns)
+        else:
+            names.add(pattern.name or pattern.callback.__name__)
+    return names
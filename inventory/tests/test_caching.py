@@ -0,0 +1,115 @@
+from django.core.cache import cache
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django_webtest import TransactionWebTest
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory
+from unittest.mock import Mock, patch
+
+from inventory.caching import _response_key, cached_response, get_generation
+from inventory.models import Retailer, Soda
+
+
+@override_settings(INVENTORY_RESPONSE_CACHE_ENABLED=True)
+class ResponseCacheWebTestCase(TransactionWebTest):
+    """Read endpoints are served from the response cache until a write bumps the generation"""
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.soda = Soda.objects.create(name="CherryCokeZero", abbreviation="CH")
+        self.retailer = Retailer.objects.create(name="Shell", street_address="598 Bryant Street", city="San Francisco")
+        self.retailer.sodas.add(self.soda)
+
+    def test_repeated_read_is_served_without_queries(self) -> None:
+        for url in ['/api/retailers/', f'/api/retailers/{self.retailer.id}/', '/api/sodas/',
+                    f'/api/retailers/{self.retailer.id}/sodas/', f'/api/sodas/{self.soda.id}/retailers/']:
+            first_response = self.app.get(url)
+            with self.assertNumQueries(0):
+                second_response = self.app.get(url)
+            self.assertEqual(first_response.body, second_response.body)
+
+    def test_query_params_are_part_of_the_key(self) -> None:
+        self.app.get('/api/retailers/')
+
+        get_response = self.app.get('/api/retailers/?sodas=XX')
+
+        self.assertEqual(get_response.json["results"], [])
+
+    def test_writes_invalidate_cached_reads(self) -> None:
+        self.app.get('/api/retailers/')
+        generation = get_generation()
+
+        Retailer.objects.create(name="Bush Market", street_address="820 Bush Street", city="San Francisco")
+
+        self.assertGreater(get_generation(), generation)
+        self.assertEqual(len(self.app.get('/api/retailers/').json["results"]), 2)
+
+    def test_writes_in_a_transaction_invalidate_cached_reads_once_committed(self) -> None:
+        """Reads made before the commit still see the old rows, so they must not be cached under the new generation"""
+
+        generation = get_generation()
+
+        with transaction.atomic():
+            Retailer.objects.create(name="Bush Market", street_address="820 Bush Street", city="San Francisco")
+            self.retailer.sodas.clear()
+            self.assertEqual(get_generation(), generation)
+
+        self.assertGreater(get_generation(), generation)
+
+        rolled_back_generation = get_generation()
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            Retailer.objects.create(name="Never Committed", street_address="1 Nowhere", city="San Francisco")
+            raise RuntimeError
+        self.assertEqual(get_generation(), rolled_back_generation)
+
+    def test_membership_changes_invalidate_cached_reads(self) -> None:
+        self.app.get(f'/api/retailers/{self.retailer.id}/sodas/')
+
+        self.retailer.sodas.clear()
+
+        self.assertEqual(self.app.get(f'/api/retailers/{self.retailer.id}/sodas/').json, [])
+
+    @override_settings(INVENTORY_RESPONSE_CACHE_ENABLED=False)
+    def test_reads_and_validators_are_not_cached_without_a_shared_cache(self) -> None:
+        """A write made by another process would not bump this process's generation, so every read is rebuilt"""
+
+        url = f'/api/sodas/{self.soda.id}/'
+        first_response = self.app.get(url)
+
+        # a queryset update sends no signal, so no generation is bumped, as with a write in another process
+        Soda.objects.filter(id=self.soda.id).update(name="Cherry Coke Zero Sugar")
+
+        poll_response = self.app.get(url, headers={"If-None-Match": first_response.headers["ETag"]})
+        self.assertEqual(poll_response.status, "200 OK")
+        self.assertEqual(poll_response.json["name"], "Cherry Coke Zero Sugar")
+
+
+@override_settings(INVENTORY_RESPONSE_CACHE_ENABLED=True)
+class StampedeProtectionTestCase(TestCase):
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.request = Request(APIRequestFactory().get('/api/retailers/'))
+
+    def test_waiting_worker_uses_value_rebuilt_by_lock_holder(self) -> None:
+        key = _response_key(self.request)
+        cache.add(f"{key}:lock", 1)
+        build_response = Mock(return_value=Response(["fresh"]))
+
+        def lock_holder_finishes(seconds: float) -> None:
+            cache.set(key, (200, ["rebuilt"]))
+
+        with patch("inventory.caching.time.sleep", side_effect=lock_holder_finishes):
+            response = cached_response(self.request, build_response)
+
+        self.assertEqual(response.data, ["rebuilt"])
+        build_response.assert_not_called()
+
+    def test_lock_is_released_after_rebuild(self) -> None:
+        key = _response_key(self.request)
+
+        cached_response(self.request, lambda: Response(["fresh"]))
+
+        self.assertIsNone(cache.get(f"{key}:lock"))
+        self.assertEqual(cache.get(key), (200, ["fresh"]))
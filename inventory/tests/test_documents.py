@@ -0,0 +1,93 @@
+from django.test import TestCase
+from django.utils import timezone
+from django_webtest import TransactionWebTest
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from inventory.models import Retailer, RetailerDocument, Soda
+from inventory.serializers import RetailerSerializer
+from inventory.services.bulk_import import upsert_retailers
+
+
+class RetailerDocumentTestCase(TestCase):
+    """Stored retailer documents follow every kind of write to retailers and their sodas"""
+
+    def setUp(self) -> None:
+        self.cherry = Soda.objects.create(name="CherryCokeZero", abbreviation="CZ", low_calorie=True)
+        self.classic = Soda.objects.create(name="Coke Classic", abbreviation="CC", low_calorie=False)
+        self.shell = Retailer.objects.create(
+            name="Shell", street_address="598 Bryant Street", city="San Francisco", postcode=94107, country="US")
+
+    def soda_ids(self) -> list[int]:
+        return RetailerDocument.objects.get(retailer=self.shell).soda_ids
+
+    def test_saves_and_membership_changes_refresh_the_document(self) -> None:
+        self.assertIn('"name":"Shell"', RetailerDocument.objects.get(retailer=self.shell).head)
+
+        self.shell.name = "Shell Station"
+        self.shell.save()
+        self.assertIn('"name":"Shell Station"', RetailerDocument.objects.get(retailer=self.shell).head)
+
+        self.shell.sodas.add(self.classic, self.cherry)
+        self.assertEqual(self.soda_ids(), sorted([self.cherry.id, self.classic.id]))
+
+        self.cherry.retailer_set.remove(self.shell)
+        self.assertEqual(self.soda_ids(), [self.classic.id])
+
+        self.classic.retailer_set.clear()
+        self.assertEqual(self.soda_ids(), [])
+
+    def test_deletes_and_bulk_upserts_refresh_documents(self) -> None:
+        self.shell.sodas.add(self.cherry)
+        self.cherry.delete()
+        self.assertEqual(self.soda_ids(), [])
+
+        upsert_retailers([{"name": "Shell", "street_address": "598 Bryant Street", "city": "Berkeley",
+                           "postcode": 94704, "country": "US", "sodas": [self.classic.id]}])
+        self.assertIn('"city":"Berkeley"', RetailerDocument.objects.get(retailer=self.shell).head)
+        self.assertEqual(self.soda_ids(), [self.classic.id])
+
+        self.shell.delete()
+        self.assertFalse(RetailerDocument.objects.exists())
+
+
+class RetailerDocumentWebTestCase(TransactionWebTest):
+
+    def setUp(self) -> None:
+        self.classic = Soda.objects.create(name="Coke Classic", abbreviation="CC", low_calorie=False)
+        self.shell = Retailer.objects.create(
+            name="Shell", street_address="598 Bryant Street", city="San Francisco", postcode=94107, country="US",
+            latitude="37.7749000", longitude="-122.4194000")
+        self.shell.sodas.add(self.classic)
+
+    def test_view_retailer_by_id_matches_regular_serializer_output(self) -> None:
+        """HTTP get request for a retailer renders exactly the bytes of RetailerSerializer, in both URL formats"""
+
+        # adding the soda updated the row's timestamp
+        self.shell.refresh_from_db()
+        for url in (f'/api/retailers/{self.shell.id}/', f'/api/retailers/{self.shell.id}.json'):
+            request = Request(APIRequestFactory().get(url))
+            serializer = RetailerSerializer(self.shell, context={
+                'request': request, 'format': 'json' if url.endswith('.json') else None
+            })
+            self.assertEqual(self.app.get(url).body, JSONRenderer().render(serializer.data))
+
+    def test_view_retailers_rebuilds_stale_and_missing_documents(self) -> None:
+        """HTTP get request serves current rows after writes that bypassed the document refresh"""
+
+        RetailerDocument.objects.all().delete()
+        self.assertEqual(self.app.get('/api/retailers/').json['results'][0]['name'], "Shell")
+
+        Retailer.objects.filter(id=self.shell.id).update(city="Oakland", timestamp_last_updated=timezone.now())
+        self.assertEqual(self.app.get(f'/api/retailers/{self.shell.id}/').json['city'], "Oakland")
+        self.assertIn('"city":"Oakland"', RetailerDocument.objects.get(retailer=self.shell).head)
+
+    def test_view_retailers_indented_output_matches_compact_output(self) -> None:
+        """HTTP get request with an indent in the Accept header renders the same retailers, indented"""
+
+        compact = self.app.get(f'/api/retailers/{self.shell.id}/')
+        indented = self.app.get(f'/api/retailers/{self.shell.id}/', headers={'Accept': 'application/json; indent=2'})
+
+        self.assertIn(b'\n  "name": "Shell"', indented.body)
+        self.assertEqual(indented.json, compact.json)
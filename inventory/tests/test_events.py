@@ -0,0 +1,103 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.db import OperationalError
+from django.test import AsyncClient, TransactionTestCase, override_settings
+from typing import Any
+from unittest.mock import patch
+
+from inventory.changes import ChangeCursor, ChangePage, read_changes
+from inventory.events import ChangeBatch, ChangeBroadcaster
+from inventory.models import Retailer
+
+
+@override_settings(INVENTORY_CHANGES_SETTLE_SECONDS=0)
+class RetailerEventsTestCase(TransactionTestCase):
+    """Retailer changes are pushed to every connected client as server-sent events"""
+
+    async def test_broadcaster_fans_out_new_changes_to_every_subscriber(self) -> None:
+        await sync_to_async(Retailer.objects.create)(name="old", street_address="1 Old Street", city="Oakland")
+        broadcaster = ChangeBroadcaster(poll_interval=0.01)
+        first_queue, second_queue = broadcaster.subscribe(), broadcaster.subscribe()
+        # let the broadcaster take its starting position: changes before it are not broadcast
+        await asyncio.sleep(0.1)
+
+        await sync_to_async(Retailer.objects.create)(name="new", street_address="2 New Street", city="Oakland", postcode=94607)
+        batch = await asyncio.wait_for(first_queue.get(), timeout=5)
+
+        self.assertIs(await asyncio.wait_for(second_queue.get(), timeout=5), batch)
+        self.assertIn('"name":"new"', batch.data())
+        self.assertNotIn('"name":"old"', batch.data())
+
+        broadcaster.unsubscribe(first_queue)
+        broadcaster.unsubscribe(second_queue)
+        await asyncio.sleep(0.05)
+
+    async def test_broadcaster_recovers_after_its_connection_becomes_unusable(self) -> None:
+        """A connection broken under a long-running broadcaster (e.g. by a database restart) is replaced"""
+
+        connection_state = {'broken': False, 'errors_occurred': False}
+
+        def read_changes_on_connection(*args: Any) -> ChangePage:
+            if connection_state['broken']:
+                connection_state['errors_occurred'] = True
+                raise OperationalError("server closed the connection unexpectedly")
+            return read_changes(*args)
+
+        def close_unusable_connection() -> None:
+            # like Django, only a connection that raised is checked, and replaced if it no longer answers
+            if connection_state['errors_occurred']:
+                connection_state.update(broken=False, errors_occurred=False)
+
+        broadcaster = ChangeBroadcaster(poll_interval=0.01)
+        with patch('inventory.events.read_changes', side_effect=read_changes_on_connection), \
+                patch('inventory.events.close_old_connections', side_effect=close_unusable_connection), \
+                self.assertLogs('inventory.events', level='ERROR'):
+            queue = broadcaster.subscribe()
+            await asyncio.sleep(0.1)
+
+            connection_state['broken'] = True
+            await sync_to_async(Retailer.objects.create)(name="after", street_address="4 After Street", city="Oakland")
+            batch = await asyncio.wait_for(queue.get(), timeout=5)
+
+            broadcaster.unsubscribe(queue)
+            await asyncio.sleep(0.05)
+
+        self.assertIn('"name":"after"', batch.data())
+
+    def test_batch_data_is_filtered_by_postcode(self) -> None:
+        batch = ChangeBatch(cursor="c", changed=[(94607, '{"id":1}'), (10003, '{"id":2}')], deleted=[])
+
+        self.assertEqual(batch.data(), '{"changed":[{"id":1},{"id":2}],"deleted":[]}')
+        self.assertEqual(batch.data(10003), '{"changed":[{"id":2}],"deleted":[]}')
+        self.assertIsNone(batch.data(94108))
+
+        # deletions carry no postcode and concern every subscriber
+        batch_with_deletion = ChangeBatch(cursor="c", changed=[], deleted=[3])
+        self.assertEqual(batch_with_deletion.data(94108), '{"changed":[],"deleted":[3]}')
+
+    async def test_event_stream_resumes_from_last_event_id(self) -> None:
+        """HTTP get request with Last-Event-ID first streams the changes made since that cursor"""
+
+        await sync_to_async(Retailer.objects.create)(name="missed", street_address="3 Missed Street", city="Oakland")
+
+        response = await AsyncClient().get('/api/retailers/events/', headers={"Last-Event-ID": ChangeCursor().encode()})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+
+        events = aiter(response.streaming_content)
+        self.assertEqual(await anext(events), b"retry: 3000\n\n")
+        event = (await anext(events)).decode()
+        self.assertIn("event: changes\n", event)
+        self.assertIn('"name":"missed"', event)
+        await events.aclose()
+
+    def test_event_stream_is_not_served_by_wsgi(self) -> None:
+        """HTTP get request through the WSGI application returns 501 instead of holding a worker"""
+
+        response = self.client.get('/api/retailers/events/')
+        self.assertEqual(response.status_code, 501)
+
+    async def test_event_stream_with_invalid_cursor_returns_400(self) -> None:
+        response = await AsyncClient().get('/api/retailers/events/?since=not-a-cursor')
+        self.assertEqual(response.status_code, 400)
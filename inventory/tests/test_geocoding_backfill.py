@@ -0,0 +1,91 @@
+from decimal import Decimal
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+from io import StringIO
+from unittest.mock import patch
+
+from inventory.models import GeocodingStatus, Retailer
+from inventory.services.exceptions import GeocodingNetworkError, GeocodingNoResultsError
+from inventory.services.geocoding import GeocodingResult
+from inventory.services.geocoding_cache import GeocodingCache
+from inventory.services.rate_limit import TokenBucket
+
+
+class GeocodeRetailersCommandTest(TestCase):
+    """Tests the geocode_retailers backfill command. Calls to the geocoding API are mocked."""
+
+    def setUp(self) -> None:
+        GeocodingCache._shared_memory_cache.clear()
+
+        self.missing = [
+            Retailer.objects.create(name=f"retailer_{i}", street_address=f"{i} Main Street", city="Portland")
+            for i in range(5)
+        ]
+        self.geocoded = Retailer.objects.create(
+            name="geocoded", street_address="1 Geocoded Street", city="Portland",
+            latitude=Decimal("45.5"), longitude=Decimal("-122.6"), geocoding_status=GeocodingStatus.SUCCEEDED,
+        )
+
+    def _geocode(self, street_address: str, city: str, postcode: str | None = None) -> GeocodingResult:
+        if street_address.startswith("3 "):
+            raise GeocodingNoResultsError()
+        if street_address.startswith("4 "):
+            raise GeocodingNetworkError()
+        return GeocodingResult(latitude=Decimal("45.5"), longitude=Decimal("-122.6"), postcode="97201")
+
+    @patch("inventory.management.commands.geocode_retailers.GeocodingService")
+    def test_backfill_geocodes_missing_retailers_in_batches(self, mock_service_class) -> None:
+        mock_service_class.return_value.geocode_address.side_effect = self._geocode
+        stdout = StringIO()
+
+        call_command("geocode_retailers", "--workers=2", "--qps=1000", "--batch-size=2", stdout=stdout)
+
+        statuses = dict(Retailer.objects.values_list("name", "geocoding_status"))
+        self.assertEqual(statuses["retailer_0"], GeocodingStatus.SUCCEEDED)
+        self.assertEqual(statuses["retailer_3"], GeocodingStatus.FAILED)
+        self.assertEqual(statuses["retailer_4"], GeocodingStatus.NOT_REQUESTED)  # transient error; retried next run
+
+        retailer_0 = Retailer.objects.get(name="retailer_0")
+        self.assertEqual(retailer_0.postcode, 97201)
+        self.assertEqual(retailer_0.geohash, "c20ff5j2s")
+
+        # the already geocoded retailer was not looked up
+        self.assertEqual(mock_service_class.return_value.geocode_address.call_count, 5)
+
+        output = stdout.getvalue()
+        self.assertIn("[2/5]", output)
+        self.assertIn("succeeded=3", output)
+        self.assertIn("GeocodingNetworkError", output)
+
+    @patch("inventory.management.commands.geocode_retailers.GeocodingService")
+    def test_rerun_is_served_from_cache(self, mock_service_class) -> None:
+        mock_service_class.return_value.geocode_address.side_effect = self._geocode
+        call_command("geocode_retailers", "--qps=1000", stdout=StringIO())
+        Retailer.objects.exclude(name="geocoded").update(
+            latitude=None, longitude=None, postcode=None, geocoding_status=GeocodingStatus.NOT_REQUESTED
+        )
+        mock_service_class.return_value.geocode_address.reset_mock()
+
+        call_command("geocode_retailers", "--qps=1000", stdout=StringIO())
+
+        # only the address that failed transiently goes back to the API
+        self.assertEqual(mock_service_class.return_value.geocode_address.call_count, 1)
+
+
+class TokenBucketTest(SimpleTestCase):
+
+    def test_acquire_waits_once_burst_is_spent(self) -> None:
+        now = [0.0]
+        sleeps = []
+
+        def fake_sleep(seconds: float) -> None:
+            sleeps.append(seconds)
+            now[0] += seconds
+
+        bucket = TokenBucket(rate=2, capacity=2, clock=lambda: now[0], sleep=fake_sleep)
+        for _ in range(4):
+            bucket.acquire()
+
+        # two tokens available immediately, then one every 0.5s
+        self.assertEqual(len(sleeps), 2)
+        self.assertAlmostEqual(now[0], 1.0)
@@ -0,0 +1,224 @@
+from datetime import timedelta
+from decimal import Decimal
+from django.core.management import call_command
+from django.db import OperationalError
+from django.test import TestCase
+from django.utils import timezone
+from io import StringIO
+from unittest.mock import Mock, patch
+
+from inventory.models import GeocodingCacheEntry, GeocodingJob, GeocodingStatus, Retailer
+from inventory.services.exceptions import GeocodingAPIError, GeocodingNetworkError, GeocodingNoResultsError
+from inventory.services.geocoding import GeocodingResult
+from inventory.services.geocoding_queue import GeocodingWorker, enqueue_geocoding
+
+
+class GeocodingWorkerTest(TestCase):
+    """Tests the background geocoding worker. The GeocodingService is mocked."""
+
+    def setUp(self) -> None:
+        self.retailer = Retailer.objects.create(
+            name="Plaid Pantry",
+            street_address="1305 SW 11th Avenue",
+            city="Portland",
+            geocoding_status=GeocodingStatus.PENDING,
+        )
+        self.job = enqueue_geocoding(self.retailer)
+        self.service = Mock()
+        self.worker = GeocodingWorker(geocoding_service=self.service, max_attempts=2)
+
+    def test_successful_job_applies_coordinates_and_postcode(self) -> None:
+        self.service.geocode_address.return_value = GeocodingResult(
+            latitude=Decimal("45.5162468"), longitude=Decimal("-122.6857963"), postcode="97201"
+        )
+
+        self.assertEqual(self.worker.run_once(), 1)
+
+        self.retailer.refresh_from_db()
+        self.assertEqual(self.retailer.latitude, Decimal("45.5162468"))
+        self.assertEqual(self.retailer.postcode, 97201)
+        self.assertEqual(self.retailer.geocoding_status, GeocodingStatus.SUCCEEDED)
+        self.assertNotEqual(self.retailer.geohash, "")
+
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.status, GeocodingJob.Status.SUCCEEDED)
+        self.assertEqual(self.job.attempts, 1)
+
+    def test_transient_failure_is_retried_with_backoff(self) -> None:
+        self.service.geocode_address.side_effect = GeocodingNetworkError()
+
+        self.worker.run_once()
+
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.status, GeocodingJob.Status.QUEUED)
+        self.assertGreater(self.job.next_attempt_at, timezone.now() + timedelta(seconds=20))
+
+        # job is not due yet, so nothing is claimed
+        self.assertEqual(self.worker.run_once(), 0)
+
+    def test_transient_failure_marks_failed_after_max_attempts(self) -> None:
+        self.service.geocode_address.side_effect = GeocodingAPIError("OVER_QUERY_LIMIT")
+
+        self.worker.run_once()
+        GeocodingJob.objects.filter(id=self.job.id).update(next_attempt_at=timezone.now())
+        self.worker.run_once()
+
+        self.job.refresh_from_db()
+        self.retailer.refresh_from_db()
+        self.assertEqual(self.job.status, GeocodingJob.Status.FAILED)
+        self.assertEqual(self.job.attempts, 2)
+        self.assertEqual(self.retailer.geocoding_status, GeocodingStatus.FAILED)
+
+    def test_permanent_failure_is_not_retried(self) -> None:
+        self.service.geocode_address.side_effect = GeocodingNoResultsError()
+
+        self.worker.run_once()
+
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.status, GeocodingJob.Status.FAILED)
+        self.assertEqual(self.job.attempts, 1)
+
+    def test_expired_lease_is_reclaimed(self) -> None:
+        """A job left running by a crashed worker is claimed again once its lease expires"""
+
+        GeocodingJob.objects.filter(id=self.job.id).update(
+            status=GeocodingJob.Status.RUNNING, next_attempt_at=timezone.now() - timedelta(seconds=1)
+        )
+        self.service.geocode_address.return_value = GeocodingResult(
+            latitude=Decimal("45.5"), longitude=Decimal("-122.6"), postcode=None
+        )
+
+        self.assertEqual(self.worker.run_once(), 1)
+
+    def test_retailer_edited_while_job_in_flight_keeps_the_edit(self) -> None:
+        """Fields edited while the geocoder runs are not overwritten by the worker's save"""
+
+        def rename_then_geocode(**address: str | None) -> GeocodingResult:
+            Retailer.objects.filter(id=self.retailer.id).update(name="Plaid Pantry #2", country="US")
+            return GeocodingResult(latitude=Decimal("45.5"), longitude=Decimal("-122.6"), postcode="97201")
+
+        self.service.geocode_address.side_effect = rename_then_geocode
+
+        self.worker.run_once()
+
+        self.retailer.refresh_from_db()
+        self.assertEqual((self.retailer.name, self.retailer.country), ("Plaid Pantry #2", "US"))
+        self.assertEqual(self.retailer.latitude, Decimal("45.5"))
+        self.assertEqual(self.retailer.geocoding_status, GeocodingStatus.SUCCEEDED)
+
+    def test_address_edited_while_job_in_flight_is_geocoded_again(self) -> None:
+        """A result for an outdated address is discarded and the job is queued again for the new one"""
+
+        def move_then_geocode(**address: str | None) -> GeocodingResult:
+            Retailer.objects.filter(id=self.retailer.id).update(street_address="1 NW Couch Street")
+            return GeocodingResult(latitude=Decimal("45.5"), longitude=Decimal("-122.6"), postcode="97201")
+
+        self.service.geocode_address.side_effect = move_then_geocode
+        self.worker.run_once()
+
+        self.retailer.refresh_from_db()
+        self.job.refresh_from_db()
+        self.assertIsNone(self.retailer.latitude)
+        self.assertEqual(self.job.status, GeocodingJob.Status.QUEUED)
+        self.assertEqual(self.job.attempts, 0)
+
+        self.service.geocode_address.side_effect = None
+        self.service.geocode_address.return_value = GeocodingResult(
+            latitude=Decimal("45.52"), longitude=Decimal("-122.67"), postcode="97209"
+        )
+        self.assertEqual(self.worker.run_once(), 1)
+
+        self.service.geocode_address.assert_called_with(street_address="1 NW Couch Street", city="Portland", postcode=None)
+        self.retailer.refresh_from_db()
+        self.assertEqual(self.retailer.latitude, Decimal("45.52"))
+
+    def test_retailer_deleted_while_job_in_flight_drops_the_job(self) -> None:
+        """Deleting a retailer mid-job neither raises nor stops the worker from processing later jobs"""
+
+        other = Retailer.objects.create(name="Corner", street_address="1 Main Street", city="Portland",
+                                        geocoding_status=GeocodingStatus.PENDING)
+        enqueue_geocoding(other)
+
+        def geocode(**address: str | None) -> GeocodingResult:
+            Retailer.objects.filter(id=self.retailer.id).delete()
+            return GeocodingResult(latitude=Decimal("45.5"), longitude=Decimal("-122.6"), postcode=None)
+
+        self.service.geocode_address.side_effect = geocode
+
+        self.assertEqual(self.worker.run_once(), 2)
+
+        other.refresh_from_db()
+        self.assertEqual(other.geocoding_status, GeocodingStatus.SUCCEEDED)
+        self.assertFalse(GeocodingJob.objects.filter(retailer_id=self.retailer.id).exists())
+        self.assertEqual(self.worker.run_once(), 0)
+
+    def test_retailer_deleted_while_failing_job_in_flight_drops_the_job(self) -> None:
+        def delete_then_fail(**address: str | None) -> GeocodingResult:
+            Retailer.objects.filter(id=self.retailer.id).delete()
+            raise GeocodingNoResultsError()
+
+        self.service.geocode_address.side_effect = delete_then_fail
+
+        self.assertEqual(self.worker.run_once(), 1)
+        self.assertFalse(GeocodingJob.objects.exists())
+
+    def test_run_once_deletes_expired_cache_entries_once_per_interval(self) -> None:
+        def add_cache_entry(address_key: str) -> None:
+            GeocodingCacheEntry.objects.create(address_key=address_key, is_negative=True,
+                                               expires_at=timezone.now() - timedelta(seconds=1))
+
+        self.worker.CACHE_PURGE_BATCH_SIZE = 2
+        for address_key in ("a", "b", "c"):
+            add_cache_entry(address_key)
+        GeocodingCacheEntry.objects.create(address_key="fresh", is_negative=True,
+                                           expires_at=timezone.now() + timedelta(days=1))
+        self.service.geocode_address.side_effect = GeocodingNoResultsError()
+
+        self.worker.run_once()
+        self.assertEqual(list(GeocodingCacheEntry.objects.values_list("address_key", flat=True)), ["fresh"])
+
+        # the next purge waits for the interval to pass
+        add_cache_entry("d")
+        self.worker.run_once()
+        self.assertTrue(GeocodingCacheEntry.objects.filter(address_key="d").exists())
+
+
+class ProcessGeocodingJobsCommandTest(TestCase):
+    """Tests the long-running worker command. The GeocodingService is mocked."""
+
+    def test_worker_recovers_after_its_connection_becomes_unusable(self) -> None:
+        """A connection broken under the running worker (e.g. by a database restart) is replaced"""
+
+        retailer = Retailer.objects.create(name="Plaid Pantry", street_address="1305 SW 11th Avenue", city="Portland")
+        enqueue_geocoding(retailer)
+        service = Mock()
+        service.geocode_address.return_value = GeocodingResult(
+            latitude=Decimal("45.5162468"), longitude=Decimal("-122.6857963"), postcode="97201"
+        )
+        worker = GeocodingWorker(geocoding_service=service)
+        claim_jobs = worker._claim_jobs
+        connection_state = {'broken': True, 'errors_occurred': False}
+
+        def claim_jobs_on_connection() -> list[GeocodingJob]:
+            if connection_state['broken']:
+                connection_state['errors_occurred'] = True
+                raise OperationalError("server closed the connection unexpectedly")
+            return claim_jobs()
+
+        def close_unusable_connection() -> None:
+            # like Django, only a connection that raised is checked, and replaced if it no longer answers
+            if connection_state['errors_occurred']:
+                connection_state.update(broken=False, errors_occurred=False)
+
+        stdout, stderr = StringIO(), StringIO()
+        command = 'inventory.management.commands.process_geocoding_jobs'
+        with patch.object(worker, '_claim_jobs', side_effect=claim_jobs_on_connection), \
+                patch(f'{command}.GeocodingWorker', return_value=worker), \
+                patch(f'{command}.close_old_connections', side_effect=close_unusable_connection), \
+                patch(f'{command}.time.sleep', side_effect=[None, KeyboardInterrupt]):
+            call_command("process_geocoding_jobs", stdout=stdout, stderr=stderr)
+
+        self.assertIn("server closed the connection unexpectedly", stderr.getvalue())
+        self.assertIn("Processed 1 geocoding job(s).", stdout.getvalue())
+        retailer.refresh_from_db()
+        self.assertEqual(retailer.geocoding_status, GeocodingStatus.SUCCEEDED)
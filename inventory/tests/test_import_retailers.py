@@ -0,0 +1,112 @@
+import json
+import os
+import tempfile
+
+from decimal import Decimal
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from io import StringIO
+from unittest.mock import patch
+
+from inventory.export import export_ndjson
+from inventory.models import GeocodingJob, GeocodingStatus, Retailer, Soda
+from inventory.services.bulk_import import _copy_row, _csv_file, upsert_retailers
+from inventory.services.geocoding_queue import enqueue_geocoding_bulk
+from inventory.soda_mask import mask_for_bits
+
+
+class ImportRetailersCommandTest(TestCase):
+    """Tests the import_retailers command on the bulk_create path (COPY needs PostgreSQL)."""
+
+    def setUp(self) -> None:
+        self.soda_ch = Soda.objects.create(name="CherryCokeZero", abbreviation="CH")
+        self.soda_cz = Soda.objects.create(name="CokeZero", abbreviation="CZ")
+
+    def _write_file(self, suffix: str, content: str) -> str:
+        file = tempfile.NamedTemporaryFile("w", suffix=suffix, delete=False, encoding="utf-8")
+        with file:
+            file.write(content)
+        self.addCleanup(os.remove, file.name)
+        return file.name
+
+    def _import(self, path: str, *args: str) -> tuple[str, str]:
+        stdout, stderr = StringIO(), StringIO()
+        call_command("import_retailers", path, *args, stdout=stdout, stderr=stderr)
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_import_csv_creates_retailers_and_skips_invalid_rows(self) -> None:
+        path = self._write_file(".csv", "\n".join([
+            "name,street_address,city,postcode,country,latitude,longitude,sodas",
+            'shell,598 Bryant Street,San Francisco,94107,USA,37.7790000,-122.3920000,"CH,cz"',
+            "plaid,1 Main Street,Portland,,,,,",
+            "corner,2 Main Street,Portland,,,,,CH",
+            "unknown_soda,3 Main Street,Portland,,,,,XX",
+            "bad_latitude,4 Main Street,Portland,,,not-a-number,-122.6,",
+            "repeat,2 Main Street,Portland,,,,,",
+        ]) + "\n")
+
+        stdout, stderr = self._import(path, "--batch-size", "2")
+
+        self.assertIn("created=3 updated=0 geocoding_queued=2 skipped=3", stdout)
+        self.assertIn("line 5:", stderr)
+        self.assertIn("line 6:", stderr)
+        self.assertIn("line 7:", stderr)
+
+        shell = Retailer.objects.get(name="shell")
+        self.assertEqual({soda.abbreviation for soda in shell.sodas.all()}, {"CH", "CZ"})
+        self.assertEqual(shell.soda_mask, mask_for_bits([self.soda_ch.bit_index, self.soda_cz.bit_index]))
+        self.assertEqual(shell.latitude, Decimal("37.7790000"))
+        self.assertEqual(shell.geocoding_status, GeocodingStatus.NOT_REQUESTED)
+
+        plaid = Retailer.objects.get(name="plaid")
+        self.assertIsNone(plaid.postcode)
+        self.assertEqual(plaid.country, "")
+        self.assertEqual(plaid.geocoding_status, GeocodingStatus.PENDING)
+        self.assertEqual(GeocodingJob.objects.filter(retailer__city="Portland").count(), 2)
+
+    def test_import_ndjson_export_round_trips_and_updates_by_street_address(self) -> None:
+        retailer = Retailer.objects.create(name="shell", street_address="598 Bryant Street", city="San Francisco",
+                                           latitude=Decimal("37.779"), longitude=Decimal("-122.392"))
+        retailer.sodas.add(self.soda_ch)
+        exported = "".join(export_ndjson())
+
+        renamed = exported.replace('"name":"shell"', '"name":"shell_renamed"').replace('["CH"]', '["CH","CZ"]')
+        new_line = json.dumps({"name": "new", "street_address": "1 New Street", "city": "Oakland", "sodas": ["CZ"]})
+        path = self._write_file(".ndjson", renamed + new_line + "\n")
+
+        stdout, _ = self._import(path)
+
+        self.assertIn("created=1 updated=1", stdout)
+        retailer.refresh_from_db()
+        self.assertEqual(retailer.name, "shell_renamed")
+        self.assertEqual(retailer.soda_mask, mask_for_bits([self.soda_ch.bit_index, self.soda_cz.bit_index]))
+        self.assertEqual(list(Retailer.objects.get(name="new").sodas.all()), [self.soda_cz])
+
+    def test_bulk_upsert_stamps_retailers_when_its_transaction_ends(self) -> None:
+        """Rows of a long import are not stamped with its start time, which a change feed client may have read past"""
+
+        last_statement_started_at = []
+
+        def enqueue_late(retailer_ids: list[int]) -> int:
+            last_statement_started_at.append(timezone.now())
+            return enqueue_geocoding_bulk(retailer_ids)
+
+        with patch('inventory.services.bulk_import.enqueue_geocoding_bulk', side_effect=enqueue_late):
+            upsert_retailers([
+                {"name": "Shell", "street_address": "598 Bryant Street", "city": "San Francisco",
+                 "country": "US", "sodas": [self.soda_ch.id]},
+                {"name": "Corner", "street_address": "1 Market Street", "city": "San Francisco", "country": "US",
+                 "latitude": Decimal("37.7"), "longitude": Decimal("-122.4"), "sodas": []},
+            ])
+
+        for timestamp in Retailer.objects.values_list('timestamp_last_updated', flat=True):
+            self.assertGreaterEqual(timestamp, last_statement_started_at[0])
+
+    def test_copy_rows_write_nulls_as_empty_fields(self) -> None:
+        item = {"name": "plaid", "street_address": "1 Main Street", "city": "Portland", "postcode": None,
+                "country": "", "latitude": None, "longitude": None, "sodas": [self.soda_cz.id]}
+
+        copy_csv = _csv_file([_copy_row(item, {self.soda_cz.id: self.soda_cz.bit_index})]).read()
+
+        self.assertEqual(copy_csv, f"plaid,1 Main Street,Portland,,,,,,pending,{mask_for_bits([self.soda_cz.bit_index])}\r\n")
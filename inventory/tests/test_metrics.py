@@ -0,0 +1,74 @@
+from django.core.cache import cache
+from django.test import SimpleTestCase
+from django_webtest import WebTest
+
+from inventory.metrics import Histogram, reset_metrics
+from inventory.models import Retailer, Soda
+
+
+class MetricsWebTestCase(WebTest):
+    """Requests to API views are recorded per view and exposed at /metrics"""
+
+    local_environ = {"REMOTE_ADDR": "127.0.0.1"}
+
+    def setUp(self) -> None:
+        cache.clear()
+        reset_metrics()
+        soda = Soda.objects.create(name="CherryCokeZero", abbreviation="CH")
+        retailer = Retailer.objects.create(name="Shell", street_address="598 Bryant Street", city="San Francisco")
+        retailer.sodas.add(soda)
+
+    def _metric_value(self, metrics_text: str, series: str) -> float:
+        for line in metrics_text.splitlines():
+            if line.startswith(series + " "):
+                return float(line.rsplit(" ", 1)[1])
+        self.fail(f"{series} not found in:\n{metrics_text}")
+
+    def test_metrics_record_requests_per_view(self) -> None:
+        """HTTP get request to /metrics reports latency, queries, serializer time and size of earlier requests"""
+
+        list_response = self.app.get('/api/retailers/')
+        self.app.get('/api/retailers/?sodas=CH')
+
+        metrics_text = self.app.get('/metrics', extra_environ=self.local_environ).text
+        labels = '{view="retailer-list",method="GET",status="200"}'
+
+        self.assertEqual(self._metric_value(metrics_text, f"http_request_duration_seconds_count{labels}"), 2)
+        self.assertGreater(self._metric_value(metrics_text, f"http_request_db_queries_sum{labels}"), 0)
+        self.assertGreater(self._metric_value(metrics_text, f"http_request_serializer_duration_seconds_sum{labels}"), 0)
+        self.assertGreaterEqual(
+            self._metric_value(metrics_text, f"http_response_size_bytes_sum{labels}"), len(list_response.body)
+        )
+        # the scrape itself is not recorded
+        self.assertNotIn('view="metrics"', metrics_text)
+
+    def test_metrics_are_not_served_to_remote_addresses(self) -> None:
+        """HTTP get request to /metrics from a non-local address returns 404"""
+
+        response = self.app.get('/metrics', extra_environ={"REMOTE_ADDR": "203.0.113.7"}, expect_errors=True)
+        self.assertEqual(response.status, "404 Not Found")
+
+
+class HistogramTestCase(SimpleTestCase):
+
+    def test_expose_renders_cumulative_buckets(self) -> None:
+        histogram = Histogram('latency_seconds', "Latency.", (0.1, 1.0), ('view',))
+        histogram.observe(0.05, 'retailer-list')
+        histogram.observe(0.5, 'retailer-list')
+        histogram.observe(5.0, 'retailer-list')
+
+        self.assertEqual(list(histogram.expose()), [
+            '# HELP latency_seconds Latency.',
+            '# TYPE latency_seconds histogram',
+            'latency_seconds_bucket{view="retailer-list",le="0.1"} 1',
+            'latency_seconds_bucket{view="retailer-list",le="1.0"} 2',
+            'latency_seconds_bucket{view="retailer-list",le="+Inf"} 3',
+            'latency_seconds_sum{view="retailer-list"} 5.55',
+            'latency_seconds_count{view="retailer-list"} 3',
+        ])
+
+    def test_expose_escapes_label_values(self) -> None:
+        histogram = Histogram('size_bytes', "Size.", (10,), ('view',))
+        histogram.observe(1, 'a"b\\c')
+
+        self.assertIn('size_bytes_count{view="a\\"b\\\\c"} 1', list(histogram.expose()))
@@ -0,0 +1,68 @@
+from decimal import Decimal
+from django_webtest import WebTest
+
+from inventory.models import Retailer, Soda
+from inventory.tests.query_budget import QueryBudgetMixin
+
+
+class ReadEndpointQueryBudgetTestCase(QueryBudgetMixin, WebTest):
+    """Every read endpoint runs a fixed number of queries, however many rows it returns"""
+
+    def setUp(self) -> None:
+        self.soda_ch = Soda.objects.create(name="CherryCokeZero", abbreviation="CH")
+        self.soda_cz = Soda.objects.create(name="CokeZero", abbreviation="CZ")
+        self.retailer = self._create_retailer(0)
+
+    def _create_retailer(self, number: int) -> Retailer:
+        retailer = Retailer.objects.create(
+            name=f"retailer_{number}",
+            street_address=f"{number} Bryant Street",
+            city="San Francisco",
+            postcode=94107,
+            latitude=Decimal("37.7790") + Decimal(number) / 10000,
+            longitude=Decimal("-122.3920"),
+        )
+        retailer.sodas.add(self.soda_ch, self.soda_cz)
+        return retailer
+
+    def _add_retailers(self) -> None:
+        for number in range(1, 6):
+            self._create_retailer(number)
+
+    def _add_sodas(self) -> None:
+        for number in range(5):
+            self.retailer.sodas.add(Soda.objects.create(name=f"soda_{number}", abbreviation=f"S{number}"))
+
+    def test_retailer_list_query_count_is_constant(self) -> None:
+        self.assertConstantQueries('/api/retailers/', self._add_retailers, max_queries=3)
+
+    def test_filtered_retailer_list_query_count_is_constant(self) -> None:
+        self.assertConstantQueries('/api/retailers/?postcode=94107&sodas=CH,CZ', self._add_retailers, max_queries=5)
+
+    def test_nearby_retailers_query_count_is_constant(self) -> None:
+        # ranking on coordinates, then the rows returned and their sodas
+        self.assertConstantQueries('/api/retailers/nearby/?lat=37.779&lng=-122.392', self._add_retailers, max_queries=3)
+
+    def test_retailer_list_with_expanded_sodas_query_count_is_constant(self) -> None:
+        # the validators also hash the soda rows, which the expanded body embeds
+        self.assertConstantQueries('/api/retailers/?expand=sodas', self._add_retailers, max_queries=5)
+
+    def test_retailer_detail_query_count_is_constant(self) -> None:
+        self.assertConstantQueries(f'/api/retailers/{self.retailer.id}/', self._add_sodas, max_queries=3)
+
+    def test_soda_list_query_count_is_constant(self) -> None:
+        self.assertConstantQueries('/api/sodas/', self._add_sodas, max_queries=2)
+
+    def test_sodas_by_retailer_query_count_is_constant(self) -> None:
+        self.assertConstantQueries(f'/api/retailers/{self.retailer.id}/sodas/', self._add_sodas, max_queries=1)
+
+    def test_retailers_by_soda_query_count_is_constant(self) -> None:
+        self.assertConstantQueries(f'/api/sodas/{self.soda_ch.id}/retailers/', self._add_retailers, max_queries=2)
+
+    def test_nested_endpoints_check_existence_only_when_empty(self) -> None:
+        retailer_without_sodas = Retailer.objects.create(name="empty", street_address="1 Main Street", city="Oakland")
+        response = self.get_with_query_budget(f'/api/retailers/{retailer_without_sodas.id}/sodas/', max_queries=2)
+        self.assertEqual(response.json, [])
+
+        response = self.app.get('/api/retailers/999999/sodas/', expect_errors=True)
+        self.assertEqual(response.status, "404 Not Found")
@@ -0,0 +1,58 @@
+import datetime
+
+from decimal import Decimal
+from django.test import SimpleTestCase
+from rest_framework.renderers import JSONRenderer
+
+from inventory.renderers import FastJSONRenderer
+
+SAMPLE_DATA = [
+    {
+        "id": 1,
+        "name": "Caf\u00e9 \u2028\u2029 \U0001f964",
+        "latitude": Decimal("37.774900"),
+        "longitude": Decimal("-122.419400"),
+        "postcode": None,
+        "timestamp_created": datetime.datetime(2024, 5, 1, 12, 30, 15, 123456, tzinfo=datetime.timezone.utc),
+        "timestamp_last_updated": datetime.datetime(2024, 5, 1, 12, 30, 15),
+        "date": datetime.date(2024, 5, 1),
+        "sodas": ["http://testserver/api/sodas/1/"],
+        "nested": {"ratio": 0.1, "flag": True, 3: "non-string key"},
+    },
+]
+
+
+# rest_framework reads UNICODE_JSON into ensure_ascii when the renderer classes are defined
+class AsciiFastJSONRenderer(FastJSONRenderer):
+    ensure_ascii = True
+
+
+class AsciiJSONRenderer(JSONRenderer):
+    ensure_ascii = True
+
+
+class FastJSONRendererTestCase(SimpleTestCase):
+    """The default renderer produces exactly what rest_framework's JSONRenderer produces"""
+
+    def assertRendersLikeRestFramework(
+        self,
+        accepted_media_type: str = 'application/json',
+        fast_renderer: FastJSONRenderer | None = None,
+        reference_renderer: JSONRenderer | None = None,
+    ) -> None:
+        self.assertEqual(
+            (fast_renderer or FastJSONRenderer()).render(SAMPLE_DATA, accepted_media_type),
+            (reference_renderer or JSONRenderer()).render(SAMPLE_DATA, accepted_media_type),
+        )
+
+    def test_orjson_output_matches_rest_framework(self) -> None:
+        self.assertRendersLikeRestFramework()
+
+    def test_stdlib_encoder_output_matches_rest_framework_without_unicode_json(self) -> None:
+        self.assertRendersLikeRestFramework(fast_renderer=AsciiFastJSONRenderer(), reference_renderer=AsciiJSONRenderer())
+
+    def test_indented_output_matches_rest_framework(self) -> None:
+        self.assertRendersLikeRestFramework('application/json; indent=4')
+
+    def test_none_renders_empty_body(self) -> None:
+        self.assertEqual(FastJSONRenderer().render(None), b'')
@@ -1,8 +1,13 @@
+from datetime import timedelta
 from django.core.exceptions import ValidationError
+from django.core.management import call_command
 from django.db import IntegrityError
 from django.test import TestCase
+from django.utils import timezone
+from unittest.mock import patch
 
 from inventory.models import Retailer, Soda
+from inventory.soda_mask import mask_for_bits
 from inventory.tests.types import RetailerTestPersistenceData, SodaTestPersistenceData
 
 
@@ -118,4 +123,66 @@ class RetailerDBTestCase(TestCase):
         self.assertEqual(results.count(), 1)
         self.assertIn(retailer1, results)
         self.assertTrue(all(r.postcode == zip_code for r in results))
-        self.assertTrue(all(soda in r.sodas.all() for r in results))
\ No newline at end of file
+        self.assertTrue(all(soda in r.sodas.all() for r in results))
+
+class RetailerSodaMaskDBTestCase(TestCase):
+    """Retailer.soda_mask mirrors the sodas relation however it is changed"""
+
+    def setUp(self) -> None:
+        self.retailer = Retailer.objects.create(name="Shell", street_address="598 Bryant Street", city="San Francisco")
+        self.cherry = Soda.objects.create(name="Cherry Coke Zero", abbreviation="CH")
+        self.vanilla = Soda.objects.create(name="Vanilla Coke Zero", abbreviation="VZ")
+
+    def _mask(self) -> int:
+        self.retailer.refresh_from_db()
+        return self.retailer.soda_mask
+
+    def test_sodas_get_distinct_bits(self) -> None:
+        self.assertNotEqual(self.cherry.bit_index, self.vanilla.bit_index)
+
+    def test_mask_follows_forward_add_remove_and_clear(self) -> None:
+        self.retailer.sodas.add(self.cherry, self.vanilla)
+        self.assertEqual(self._mask(), mask_for_bits([self.cherry.bit_index, self.vanilla.bit_index]))
+
+        self.retailer.sodas.remove(self.cherry)
+        self.assertEqual(self._mask(), mask_for_bits([self.vanilla.bit_index]))
+
+        self.retailer.sodas.clear()
+        self.assertEqual(self._mask(), 0)
+
+    def test_mask_follows_reverse_add_and_remove(self) -> None:
+        self.cherry.retailer_set.add(self.retailer)
+        self.assertEqual(self._mask(), mask_for_bits([self.cherry.bit_index]))
+
+        self.cherry.retailer_set.remove(self.retailer)
+        self.assertEqual(self._mask(), 0)
+
+    def test_mask_updates_are_stamped_by_the_application_clock(self) -> None:
+        """Membership changes are stamped with timezone.now(), like saves, so the change feed orders them together"""
+
+        # an application clock an hour ahead of the database's tells the two apart
+        application_time = timezone.now() + timedelta(hours=1)
+        with patch('django.utils.timezone.now', return_value=application_time):
+            self.cherry.retailer_set.add(self.retailer)
+        self.assertEqual(Retailer.objects.get(id=self.retailer.id).timestamp_last_updated, application_time)
+
+        application_time += timedelta(minutes=1)
+        with patch('django.utils.timezone.now', return_value=application_time):
+            self.retailer.sodas.add(self.vanilla)
+        self.assertEqual(Retailer.objects.get(id=self.retailer.id).timestamp_last_updated, application_time)
+
+    def test_deleting_soda_clears_its_bit(self) -> None:
+        self.retailer.sodas.set([self.cherry, self.vanilla])
+
+        self.cherry.delete()
+
+        self.assertEqual(self._mask(), mask_for_bits([self.vanilla.bit_index]))
+
+    def test_loaded_fixture_has_consistent_masks(self) -> None:
+        Retailer.objects.all().delete()
+        Soda.objects.all().delete()
+        call_command("loaddata", "initdata.json", verbosity=0)
+
+        for retailer in Retailer.objects.prefetch_related("sodas"):
+            expected_mask = mask_for_bits(soda.bit_index for soda in retailer.sodas.all())
+            self.assertEqual(retailer.soda_mask, expected_mask)
@@ -1,13 +1,26 @@
+import csv
+import io
+import json
+
 from decimal import Decimal
-from django_webtest import WebTest
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django_webtest import TransactionWebTest
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
 from unittest.mock import patch
 
-from inventory.exceptions import NonNumericPostcodeError
+from inventory.models import GeocodingJob, GeocodingStatus, Retailer, Soda
+from inventory.serializers import RetailerSerializer
 from inventory.services.geocoding import GeocodingResult
+from inventory.services.geocoding_queue import GeocodingWorker
+from inventory.signals import retailers_bulk_changed
 from inventory.tests.types import RetailerTestPersistenceData, SodaTestFormData
 
 
-class RetailerWebTestCase(WebTest):
+class RetailerWebTestCase(TransactionWebTest):
     csrf_checks = False
 
     retailer1_data: RetailerTestPersistenceData = {
@@ -43,8 +56,8 @@ class RetailerWebTestCase(WebTest):
     }
 
     def setUp(self) -> None:
-        # Start mocking GeocodingService for all tests
-        self.geocoding_patcher = patch('inventory.serializers.GeocodingService')
+        # Start mocking GeocodingService (used by the background geocoding worker) for all tests
+        self.geocoding_patcher = patch('inventory.services.geocoding_queue.CachedGeocodingService')
         self.mock_geocoding_class = self.geocoding_patcher.start()
 
         # Configure default mock return value for geocoding
@@ -78,11 +91,16 @@ class RetailerWebTestCase(WebTest):
 
         # retailer2: VZ (VanillaCokeZero) and CC (CokeClassic)
         retailer2_params = {**self.retailer2_data, "sodas": [self.soda_vz_url, self.soda_cc_url]}
-        self.app.post_json('/api/retailers/', params=retailer2_params)
+        post_retailer_2 = self.app.post_json('/api/retailers/', params=retailer2_params)
+        self.retailer2_id = post_retailer_2.json["id"]
 
     def tearDown(self) -> None:
         self.geocoding_patcher.stop()
 
+    def _run_geocoding_worker(self) -> None:
+        while GeocodingWorker().run_once():
+            pass
+
     def test_view_retailers_returns_all(self) -> None:
         """HTTP get request with no params retrieves all retailers"""
 
@@ -91,13 +109,51 @@ class RetailerWebTestCase(WebTest):
         self.assertEqual(get_response.status, "200 OK")
 
         # verify content
-        response_data = get_response.json
+        response_data = get_response.json["results"]
         self.assertEqual(len(response_data), 2)
 
         result_names = [retailer["name"] for retailer in response_data]
         self.assertIn(self.retailer1_data["name"], result_names)
         self.assertIn(self.retailer2_data["name"], result_names)
 
+    def test_view_retailers_pages_with_cursor(self) -> None:
+        """HTTP get request with page_size returns one page and an opaque cursor link to the next page"""
+
+        first_page = self.app.get('/api/retailers/?page_size=1')
+        self.assertEqual(len(first_page.json["results"]), 1)
+        self.assertIsNone(first_page.json["previous"])
+        self.assertIn("cursor=", first_page.json["next"])
+
+        with CaptureQueriesContext(connection) as context:
+            second_page = self.app.get(first_page.json["next"])
+        self.assertEqual(len(second_page.json["results"]), 1)
+        self.assertIsNone(second_page.json["next"])
+
+        result_names = [first_page.json["results"][0]["name"], second_page.json["results"][0]["name"]]
+        self.assertEqual(result_names, [self.retailer1_data["name"], self.retailer2_data["name"]])
+
+        # keyset pagination: deep pages seek on the primary key instead of skipping rows
+        self.assertFalse(any("OFFSET" in query["sql"] for query in context.captured_queries))
+
+    def test_view_retailers_fast_list_matches_regular_serializer_output(self) -> None:
+        """HTTP get request for the list renders exactly the bytes of RetailerSerializer over model instances"""
+
+        self._run_geocoding_worker()
+        Retailer.objects.filter(id=self.retailer1_id).update(postcode=None)
+        retailers_bulk_changed.send(sender=Retailer, retailer_ids=[self.retailer1_id])
+
+        for url in ('/api/retailers/', '/api/retailers.json', '/api/retailers/?sodas=CC'):
+            get_response = self.app.get(url)
+
+            request = Request(APIRequestFactory().get(url))
+            retailers = Retailer.objects.order_by('id')
+            serializer = RetailerSerializer(retailers, many=True, context={
+                'request': request, 'format': 'json' if '.json' in url else None
+            })
+            expected = JSONRenderer().render({"next": None, "previous": None, "results": serializer.data})
+
+            self.assertEqual(get_response.body, expected)
+
     def test_view_retailer_by_id_succeeds(self) -> None:
         """HTTP get request with retailer ID retrieves single retailer"""
 
@@ -108,6 +164,78 @@ class RetailerWebTestCase(WebTest):
         self.assertEqual(get_response.json["city"], self.retailer1_data["city"])
         self.assertEqual(get_response.json["street_address"], self.retailer1_data["street_address"])
 
+    @override_settings(INVENTORY_RESPONSE_CACHE_ENABLED=True)
+    def test_view_retailers_with_matching_etag_returns_304(self) -> None:
+        """HTTP get request repeating a list poll with If-None-Match returns 304 without fetching the retailers"""
+
+        first_response = self.app.get('/api/retailers/?postcode=94107')
+        etag = first_response.headers["ETag"]
+        # a list can change without its newest timestamp moving, so only the ETag validates it
+        self.assertNotIn("Last-Modified", first_response.headers)
+
+        with CaptureQueriesContext(connection) as context:
+            poll_response = self.app.get('/api/retailers/?postcode=94107', headers={"If-None-Match": etag})
+
+        self.assertEqual(poll_response.status, "304 Not Modified")
+        self.assertEqual(poll_response.headers["ETag"], etag)
+        # validators are cached from the first request; nothing is fetched or serialized
+        self.assertEqual(len(context.captured_queries), 0)
+
+        # a different filter is a different representation
+        other_response = self.app.get('/api/retailers/?postcode=10003', headers={"If-None-Match": etag})
+        self.assertEqual(other_response.status, "200 OK")
+
+    def test_view_retailers_etag_changes_when_soda_membership_changes(self) -> None:
+        """HTTP get request with a stale ETag returns 200 after the retailer's sodas change"""
+
+        etag = self.app.get('/api/retailers/').headers["ETag"]
+
+        # changing only the relation still bumps the retailer's timestamp_last_updated
+        Retailer.objects.get(id=self.retailer1_id).sodas.add(Soda.objects.get(id=self.soda_vz_id))
+
+        get_response = self.app.get('/api/retailers/', headers={"If-None-Match": etag})
+        self.assertEqual(get_response.status, "200 OK")
+        self.assertNotEqual(get_response.headers["ETag"], etag)
+
+    def test_view_retailers_etag_changes_when_retailer_deleted(self) -> None:
+        """HTTP get request with a stale ETag returns 200 after a retailer in the list is deleted"""
+
+        etag = self.app.get('/api/retailers/').headers["ETag"]
+        self.app.delete(f"/api/retailers/{self.retailer1_id}/")
+
+        get_response = self.app.get('/api/retailers/', headers={"If-None-Match": etag})
+        self.assertEqual(get_response.status, "200 OK")
+        self.assertEqual(len(get_response.json["results"]), 1)
+
+    def test_view_retailers_with_if_modified_since_returns_200_after_older_retailer_deleted(self) -> None:
+        """HTTP get request for the list with only If-Modified-Since returns 200 after a retailer is deleted"""
+
+        # retailer 2 becomes the newest row, so deleting retailer 1 leaves the newest timestamp unchanged
+        self.app.patch_json(f"/api/retailers/{self.retailer2_id}/", {"country": "US"})
+        last_modified = self.app.get(f"/api/retailers/{self.retailer2_id}/").headers["Last-Modified"]
+        self.app.delete(f"/api/retailers/{self.retailer1_id}/")
+
+        get_response = self.app.get('/api/retailers/', headers={"If-Modified-Since": last_modified})
+        self.assertEqual(get_response.status, "200 OK")
+        self.assertEqual(len(get_response.json["results"]), 1)
+
+    def test_view_retailer_by_id_with_if_modified_since_returns_304(self) -> None:
+        """HTTP get request for one retailer with If-Modified-Since at its Last-Modified returns 304"""
+
+        first_response = self.app.get(f"/api/retailers/{self.retailer1_id}/")
+        last_modified = first_response.headers["Last-Modified"]
+
+        get_response = self.app.get(
+            f"/api/retailers/{self.retailer1_id}/", headers={"If-Modified-Since": last_modified}
+        )
+        self.assertEqual(get_response.status, "304 Not Modified")
+
+        # a missing retailer has no validators and still returns 404
+        missing_response = self.app.get(
+            '/api/retailers/999999/', headers={"If-Modified-Since": last_modified}, expect_errors=True
+        )
+        self.assertEqual(missing_response.status, "404 Not Found")
+
     def test_view_retailers_by_soda_returns_filtered_results(self) -> None:
         """HTTP get request with one soda in params retrieves associated retailers"""
 
@@ -138,8 +266,8 @@ class RetailerWebTestCase(WebTest):
         get_response = self.app.get(f"/api/retailers/?postcode={self.retailer2_data['postcode']}")
 
         self.assertEqual(get_response.status, "200 OK")
-        self.assertEqual(len(get_response.json), 1)
-        self.assertEqual(get_response.json[0]["name"], self.retailer2_data["name"])
+        self.assertEqual(len(get_response.json["results"]), 1)
+        self.assertEqual(get_response.json["results"][0]["name"], self.retailer2_data["name"])
 
     def test_view_retailers_by_postcode_and_soda_returns_filtered_results(self) -> None:
         """HTTP get request with postcode and one soda type in query string retrieves associated retailers"""
@@ -163,8 +291,8 @@ class RetailerWebTestCase(WebTest):
 
         # Verify response
         self.assertEqual(get_response.status, "200 OK")
-        self.assertEqual(len(get_response.json), 1)
-        self.assertEqual(get_response.json[0]["name"], self.retailer1_data["name"])
+        self.assertEqual(len(get_response.json["results"]), 1)
+        self.assertEqual(get_response.json["results"][0]["name"], self.retailer1_data["name"])
 
     def test_view_retailers_by_multiple_sodas_returns_filtered_results(self) -> None:
         """HTTP get request with multiple soda types in params retrieves associated retailers"""
@@ -173,8 +301,151 @@ class RetailerWebTestCase(WebTest):
 
         # Verify response
         self.assertEqual(get_response.status, "200 OK")
-        self.assertEqual(len(get_response.json), 1)
-        self.assertEqual(get_response.json[0]["name"], self.retailer2_data["name"])
+        self.assertEqual(len(get_response.json["results"]), 1)
+        self.assertEqual(get_response.json["results"][0]["name"], self.retailer2_data["name"])
+
+    def test_view_retailers_by_multiple_sodas_with_match_any_returns_union(self) -> None:
+        """HTTP get request with match=any retrieves retailers stocking at least one of the sodas"""
+
+        get_response = self.app.get("/api/retailers/?sodas=CH,VZ&match=any")
+
+        self.assertEqual(get_response.status, "200 OK")
+        result_names = [retailer["name"] for retailer in get_response.json["results"]]
+        self.assertCountEqual(result_names, [self.retailer1_data["name"], self.retailer2_data["name"]])
+
+    def test_view_retailers_by_unknown_soda_with_match_all_returns_empty(self) -> None:
+        """HTTP get request requiring a soda that no retailer stocks returns no results"""
+
+        get_response = self.app.get("/api/retailers/?sodas=CC,XX")
+
+        self.assertEqual(get_response.status, "200 OK")
+        self.assertEqual(get_response.json["results"], [])
+
+    def test_view_retailers_by_sodas_with_invalid_match_returns_400(self) -> None:
+        """HTTP get request with unsupported match mode returns error"""
+
+        get_response = self.app.get("/api/retailers/?sodas=CC&match=most", expect_errors=True)
+
+        self.assertEqual(get_response.status, "400 Bad Request")
+        self.assertIn("match", get_response.json)
+
+    def test_view_retailers_by_sodas_uses_constant_number_of_joins(self) -> None:
+        """Filtering by more sodas does not add joins to the query"""
+
+        one_soda_sql = self._retailer_list_sql("/api/retailers/?sodas=CC")
+        three_soda_sql = self._retailer_list_sql("/api/retailers/?sodas=CC,CH,VZ")
+
+        self.assertEqual(one_soda_sql.count("JOIN"), three_soda_sql.count("JOIN"))
+        self.assertNotIn("DISTINCT", three_soda_sql.split("FROM")[0])
+
+    def _retailer_list_sql(self, url: str) -> str:
+        with CaptureQueriesContext(connection) as context:
+            self.app.get(url)
+        return next(query["sql"] for query in context.captured_queries
+                    if query["sql"].startswith('SELECT "inventory_retailer"."id"'))
+
+    def test_view_nearby_retailers_returns_results_ordered_by_distance(self) -> None:
+        """HTTP get request to nearby endpoint retrieves retailers within radius, nearest first"""
+
+        Retailer.objects.create(name="near", street_address="near_street", city="San Francisco",
+                                latitude=Decimal("37.7750000"), longitude=Decimal("-122.4190000"))
+        Retailer.objects.create(name="nearest", street_address="nearest_street", city="San Francisco",
+                                latitude=Decimal("37.7749500"), longitude=Decimal("-122.4194500"))
+        Retailer.objects.create(name="far", street_address="far_street", city="Oakland",
+                                latitude=Decimal("37.8044000"), longitude=Decimal("-122.2712000"))
+
+        get_response = self.app.get("/api/retailers/nearby/", params={
+            "lat": "37.7749", "lng": "-122.4194", "radius_km": "2",
+        })
+
+        self.assertEqual(get_response.status, "200 OK")
+        result_names = [retailer["name"] for retailer in get_response.json]
+        self.assertEqual(result_names, ["nearest", "near"])
+
+    def test_view_nearby_retailers_loads_only_the_retailers_returned(self) -> None:
+        """HTTP get request to nearby endpoint with a limit ranks candidates by coordinates and renders only the nearest"""
+
+        for number in range(5):
+            Retailer.objects.create(name=f"candidate_{number}", street_address=f"candidate_street_{number}",
+                                    city="San Francisco", latitude=Decimal(f"37.77{number}0000"),
+                                    longitude=Decimal("-122.4194000"))
+        nearest = Retailer.objects.get(name="candidate_0")
+        nearest.sodas.add(Soda.objects.get(id=self.soda_ch_id))
+        nearest.refresh_from_db()
+
+        url = "/api/retailers/nearby/?lat=37.7700&lng=-122.4194&limit=1"
+        with CaptureQueriesContext(connection) as context:
+            get_response = self.app.get(url)
+
+        serializer = RetailerSerializer([nearest], many=True, context={'request': Request(APIRequestFactory().get(url))})
+        self.assertEqual(get_response.body, JSONRenderer().render(serializer.data))
+
+        # full rows are read for the returned retailer only
+        row_queries = [query["sql"] for query in context.captured_queries if '"inventory_retailer"."name"' in query["sql"]]
+        self.assertEqual(len(row_queries), 1)
+        self.assertIn(f'IN ({nearest.id})', row_queries[0])
+
+    def test_view_nearby_retailers_by_soda_returns_filtered_results(self) -> None:
+        """HTTP get request to nearby endpoint with sodas in params retrieves only retailers with those sodas"""
+
+        near_with_soda = Retailer.objects.create(name="near_ch", street_address="near_ch_street", city="San Francisco",
+                                                 latitude=Decimal("37.7750000"), longitude=Decimal("-122.4190000"))
+        near_with_soda.sodas.add(Soda.objects.get(abbreviation=self.soda_ch_data["abbreviation"]))
+        Retailer.objects.create(name="near_no_soda", street_address="near_no_soda_street", city="San Francisco",
+                                latitude=Decimal("37.7749500"), longitude=Decimal("-122.4194500"))
+
+        get_response = self.app.get("/api/retailers/nearby/", params={
+            "lat": "37.7749", "lng": "-122.4194", "sodas": self.soda_ch_data["abbreviation"],
+        })
+
+        self.assertEqual(get_response.status, "200 OK")
+        self.assertEqual([retailer["name"] for retailer in get_response.json], ["near_ch"])
+
+    def test_view_nearby_retailers_with_invalid_params_returns_400(self) -> None:
+        """HTTP get request to nearby endpoint with missing or out-of-range coordinates returns error"""
+
+        missing_lng = self.app.get("/api/retailers/nearby/?lat=37.7", expect_errors=True)
+        self.assertEqual(missing_lng.status, "400 Bad Request")
+        self.assertIn("lng", missing_lng.json)
+
+        bad_radius = self.app.get("/api/retailers/nearby/?lat=37.7&lng=-122.4&radius_km=5000", expect_errors=True)
+        self.assertEqual(bad_radius.status, "400 Bad Request")
+        self.assertIn("radius_km", bad_radius.json)
+
+    def test_view_retailers_by_bbox_returns_retailers_inside_viewport(self) -> None:
+        """HTTP get request with bbox in params retrieves only retailers inside the rectangle"""
+
+        Retailer.objects.create(name="inside", street_address="inside_street", city="San Francisco",
+                                latitude=Decimal("37.7750000"), longitude=Decimal("-122.4190000"))
+        Retailer.objects.create(name="outside", street_address="outside_street", city="Oakland",
+                                latitude=Decimal("37.8044000"), longitude=Decimal("-122.2712000"))
+
+        get_response = self.app.get("/api/retailers/?bbox=-122.45,37.75,-122.40,37.80")
+
+        self.assertEqual(get_response.status, "200 OK")
+        self.assertEqual([retailer["name"] for retailer in get_response.json["results"]], ["inside"])
+
+    def test_view_retailers_by_bbox_crossing_antimeridian_returns_both_sides(self) -> None:
+        """HTTP get request with bbox where min_lng > max_lng wraps around the antimeridian"""
+
+        Retailer.objects.create(name="fiji", street_address="fiji_street", city="Suva",
+                                latitude=Decimal("-18.1400000"), longitude=Decimal("178.4400000"))
+        Retailer.objects.create(name="samoa", street_address="samoa_street", city="Apia",
+                                latitude=Decimal("-13.8300000"), longitude=Decimal("-171.7600000"))
+
+        get_response = self.app.get("/api/retailers/?bbox=170,-20,-170,-10")
+
+        self.assertEqual(get_response.status, "200 OK")
+        result_names = [retailer["name"] for retailer in get_response.json["results"]]
+        self.assertCountEqual(result_names, ["fiji", "samoa"])
+
+    def test_view_retailers_by_malformed_bbox_returns_400(self) -> None:
+        """HTTP get request with malformed bbox returns error"""
+
+        get_response = self.app.get("/api/retailers/?bbox=1,2,3", expect_errors=True)
+
+        self.assertEqual(get_response.status, "400 Bad Request")
+        self.assertIn("bbox", get_response.json)
 
     def test_create_retailer_without_sodas_succeeds(self) -> None:
         """HTTP post request with required data results in creation of object and response with all object data"""
@@ -208,16 +479,18 @@ class RetailerWebTestCase(WebTest):
         get_response = self.app.get(f"/api/retailers/{new_retailer_id}/")
         self.assertEqual(get_response.status, "200 OK")
 
-        # Verify latitude and longitude were populated correctly
-        self.assertIn("latitude", post_response.json,
+        # Verify latitude and longitude were populated correctly by the geocoding worker
+        self._run_geocoding_worker()
+        get_response = self.app.get(f"/api/retailers/{new_retailer_id}/")
+        self.assertIn("latitude", get_response.json,
                       "Expected Retailer object to have key 'latitude', but it was missing.")
-        self.assertIn("longitude", post_response.json,
+        self.assertIn("longitude", get_response.json,
                       "Expected Retailer object to have key 'longitude', but it was missing.")
         self.assertAlmostEqual(
-            float(post_response.json["latitude"]), 40.7275, delta=0.01
+            float(get_response.json["latitude"]), 40.7275, delta=0.01
         )
         self.assertAlmostEqual(
-            float(post_response.json["longitude"]), -73.98, delta=0.01
+            float(get_response.json["longitude"]), -73.98, delta=0.01
         )
 
     def test_create_retailer_with_sodas_succeeds(self) -> None:
@@ -263,24 +536,26 @@ class RetailerWebTestCase(WebTest):
             "street_address": "409 Edgecombe Avenue",
         }
         post_response = self.app.post_json('/api/retailers/', params=new_retailer_params)
-
-        # Verify latitude, longitude, and zip code were populated
         self.assertEqual(post_response.status, "201 Created")
-        self.assertIn("latitude", post_response.json,
+
+        # Verify latitude, longitude, and zip code were populated by the geocoding worker
+        self._run_geocoding_worker()
+        get_response = self.app.get(f"/api/retailers/{post_response.json['id']}/")
+        self.assertIn("latitude", get_response.json,
                       "Expected Retailer object to have key 'latitude', but it was missing.")
-        self.assertIn("longitude", post_response.json,
+        self.assertIn("longitude", get_response.json,
                       "Expected Retailer object to have key 'longitude', but it was missing.")
-        self.assertIn("postcode", post_response.json,
+        self.assertIn("postcode", get_response.json,
                       "Expected Retailer object to have key 'postcode', but it was missing.")
 
         # Verify correctness of data (using approximate matching for coordinates)
         self.assertAlmostEqual(
-            float(post_response.json["latitude"]), 40.8294, delta=0.01
+            float(get_response.json["latitude"]), 40.8294, delta=0.01
         )
         self.assertAlmostEqual(
-            float(post_response.json["longitude"]), -73.94, delta=0.01
+            float(get_response.json["longitude"]), -73.94, delta=0.01
         )
-        self.assertEqual(post_response.json["postcode"], 10032)
+        self.assertEqual(get_response.json["postcode"], 10032)
 
     def test_create_retailer_with_postcode_preserves_user_value(self) -> None:
         """HTTP post request with user-provided postcode preserves that value
@@ -306,6 +581,10 @@ class RetailerWebTestCase(WebTest):
         self.assertEqual(post_response.status, "201 Created")
         self.assertEqual(post_response.json["postcode"], user_provided_postcode)
 
+        self._run_geocoding_worker()
+        get_response = self.app.get(f"/api/retailers/{post_response.json['id']}/")
+        self.assertEqual(get_response.json["postcode"], user_provided_postcode)
+
     def test_create_retailer_with_same_name_fails(self) -> None:
         """HTTP post request with duplicate name returns error"""
 
@@ -333,7 +612,7 @@ class RetailerWebTestCase(WebTest):
         self.assertEqual(post_response.status, "400 Bad Request")
 
     def test_create_retailer_with_non_numeric_postcode_from_geocoding_fails(self) -> None:
-        """HTTP post request without postcode raises NonNumericPostcodeError
+        """HTTP post request without postcode marks geocoding as failed
         when geocoding service returns non-numeric postcode"""
 
         # Configure mock to return a non-numeric postcode (e.g., UK format)
@@ -351,8 +630,41 @@ class RetailerWebTestCase(WebTest):
             # No postcode provided - will trigger geocoding postcode population
         }
 
-        with self.assertRaises(NonNumericPostcodeError):
-            self.app.post_json('/api/retailers/', params=new_retailer_params)
+        post_response = self.app.post_json('/api/retailers/', params=new_retailer_params)
+        self.assertEqual(post_response.status, "201 Created")
+
+        self._run_geocoding_worker()
+        get_response = self.app.get(f"/api/retailers/{post_response.json['id']}/")
+        self.assertEqual(get_response.json["geocoding_status"], GeocodingStatus.FAILED)
+        self.assertIsNone(get_response.json["latitude"])
+        self.assertIsNone(get_response.json["postcode"])
+
+    def test_create_retailer_returns_before_geocoding_completes(self) -> None:
+        """HTTP post request responds with null coordinates and pending status;
+        both are updated once the geocoding worker processes the queued job"""
+
+        new_retailer_params = {
+            "name": "new_retailer",
+            "city": "New York",
+            "postcode": 10009,
+            "street_address": "new_retailer_street",
+        }
+        post_response = self.app.post_json('/api/retailers/', params=new_retailer_params)
+
+        self.assertEqual(post_response.status, "201 Created")
+        self.assertIsNone(post_response.json["latitude"])
+        self.assertIsNone(post_response.json["longitude"])
+        self.assertEqual(post_response.json["geocoding_status"], GeocodingStatus.PENDING)
+        self.mock_geocoding_class.return_value.geocode_address.assert_not_called()
+
+        self._run_geocoding_worker()
+
+        get_response = self.app.get(f"/api/retailers/{post_response.json['id']}/")
+        self.assertEqual(get_response.json["geocoding_status"], GeocodingStatus.SUCCEEDED)
+        self.assertEqual(get_response.json["latitude"], "40.0000000")
+        self.assertEqual(
+            GeocodingJob.objects.get(retailer_id=post_response.json["id"]).status, GeocodingJob.Status.SUCCEEDED
+        )
 
     def test_update_retailer_with_sodas(self) -> None:
         """HTTP put request updates retailer with new soda"""
@@ -403,3 +715,294 @@ class RetailerWebTestCase(WebTest):
         # Verify retailer1 no longer exists
         get_response = self.app.get(f"/api/retailers/{self.retailer1_id}/", expect_errors=True)
         self.assertEqual(get_response.status, "404 Not Found")
+
+    def test_bulk_create_retailers_from_json_array(self) -> None:
+        """HTTP post request to bulk/ with a JSON array creates all retailers with their sodas in a fixed number of queries"""
+
+        def bulk_items(first: int, count: int) -> list[dict]:
+            return [
+                {
+                    "name": f"bulk_retailer_{number}",
+                    "street_address": f"{number} Bulk Street",
+                    "city": "Oakland",
+                    "postcode": 94601,
+                    "sodas": [self.soda_ch_url, self.soda_vz_url],
+                }
+                for number in range(first, first + count)
+            ]
+
+        with CaptureQueriesContext(connection) as small_batch:
+            self.app.post_json('/api/retailers/bulk/', params=bulk_items(0, 2))
+        with CaptureQueriesContext(connection) as large_batch:
+            post_response = self.app.post_json('/api/retailers/bulk/', params=bulk_items(2, 20))
+
+        self.assertEqual(post_response.status, "200 OK")
+        self.assertEqual(post_response.json["created"], 20)
+        self.assertEqual(post_response.json["updated"], 0)
+        self.assertEqual(post_response.json["geocoding_queued"], 20)
+        self.assertEqual(len(small_batch.captured_queries), len(large_batch.captured_queries))
+
+        retailer = Retailer.objects.get(id=post_response.json["ids"][0])
+        self.assertEqual(retailer.name, "bulk_retailer_2")
+        self.assertEqual(retailer.geocoding_status, GeocodingStatus.PENDING)
+        self.assertEqual({soda.id for soda in retailer.sodas.all()}, {self.soda_ch_id, self.soda_vz_id})
+
+        # soda filters read the mask maintained by the bulk path
+        filtered_response = self.app.get('/api/retailers/?sodas=CH,VZ&page_size=1000')
+        self.assertEqual(len(filtered_response.json["results"]), 22)
+
+        # geocoding runs in the background worker, in batches
+        self._run_geocoding_worker()
+        self.assertEqual(Retailer.objects.filter(geocoding_status=GeocodingStatus.SUCCEEDED).count(), 24)
+
+    def test_bulk_upsert_retailers_from_ndjson(self) -> None:
+        """HTTP post request to bulk/ with NDJSON updates retailers at an existing street_address and creates the rest"""
+
+        ndjson_body = "\n".join([
+            f'{{"name": "renamed_retailer_1", "street_address": "{self.retailer1_data["street_address"]}", '
+            f'"city": "Oakland", "latitude": "37.8044000", "longitude": "-122.2712000", "sodas": ["{self.soda_vz_url}"]}}',
+            '',
+            '{"name": "new_retailer", "street_address": "1 New Street", "city": "Oakland", "latitude": "37.8", "longitude": "-122.27"}',
+        ])
+        post_response = self.app.post('/api/retailers/bulk/', params=ndjson_body, content_type='application/x-ndjson')
+
+        self.assertEqual(post_response.json["created"], 1)
+        self.assertEqual(post_response.json["updated"], 1)
+        # both retailers came with coordinates
+        self.assertEqual(post_response.json["geocoding_queued"], 0)
+        self.assertEqual(post_response.json["ids"][0], self.retailer1_id)
+
+        get_response = self.app.get(f"/api/retailers/{self.retailer1_id}/")
+        self.assertEqual(get_response.json["name"], "renamed_retailer_1")
+        self.assertEqual(get_response.json["city"], "Oakland")
+        self.assertEqual(get_response.json["sodas"], [self.soda_vz_url])
+        self.assertEqual(Retailer.objects.get(id=self.retailer1_id).geohash, "9q9p1dhfd")
+
+    def test_bulk_create_with_invalid_items_returns_errors_per_item(self) -> None:
+        """HTTP post request to bulk/ with invalid items returns 400 with one error entry per item and writes nothing"""
+
+        items = [
+            {"name": "bulk_a", "street_address": "1 Bulk Street", "city": "Oakland"},
+            {"name": "bulk_b", "street_address": "1 Bulk Street", "city": "Oakland"},
+            {"name": self.retailer2_data["name"], "street_address": "2 Bulk Street", "city": "Oakland"},
+            {"name": "bulk_c", "street_address": "3 Bulk Street", "city": "Oakland",
+             "sodas": ["http://testserver/api/sodas/99999/"]},
+        ]
+        post_response = self.app.post_json('/api/retailers/bulk/', params=items, expect_errors=True)
+
+        self.assertEqual(post_response.status, "400 Bad Request")
+        self.assertEqual(post_response.json[0], {})
+        self.assertIn("street_address", post_response.json[1])
+        self.assertIn("name", post_response.json[2])
+        self.assertIn("sodas", post_response.json[3])
+        self.assertEqual(Retailer.objects.count(), 2)
+
+        malformed_response = self.app.post(
+            '/api/retailers/bulk/', params='{"name": "ok"}\n{not json', content_type='application/x-ndjson',
+            expect_errors=True,
+        )
+        self.assertEqual(malformed_response.status, "400 Bad Request")
+        self.assertIn("line 2", malformed_response.json["detail"])
+
+    def test_export_retailers_streams_ndjson(self) -> None:
+        """HTTP get request to export/ streams one JSON line per retailer with its soda abbreviations"""
+
+        self._run_geocoding_worker()
+        get_response = self.app.get('/api/retailers/export/')
+
+        self.assertEqual(get_response.content_type, "application/x-ndjson")
+        rows = [json.loads(line) for line in get_response.text.splitlines()]
+        self.assertEqual([row["name"] for row in rows], [self.retailer1_data["name"], self.retailer2_data["name"]])
+        self.assertEqual(rows[0]["sodas"], ["CC", "CH"])
+        self.assertEqual(rows[1]["sodas"], ["CC", "VZ"])
+
+        # values are rendered as in the API
+        api_retailer = self.app.get(f"/api/retailers/{self.retailer1_id}/").json
+        for field in ("id", "postcode", "latitude", "longitude", "geocoding_status", "timestamp_created"):
+            self.assertEqual(rows[0][field], api_retailer[field])
+
+    def test_export_retailers_streams_csv(self) -> None:
+        """HTTP get request to export/?format=csv streams a CSV with a header row"""
+
+        get_response = self.app.get('/api/retailers/export/?format=csv')
+
+        self.assertEqual(get_response.content_type, "text/csv")
+        rows = list(csv.DictReader(io.StringIO(get_response.text)))
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[0]["street_address"], self.retailer1_data["street_address"])
+        self.assertEqual(rows[0]["sodas"], "CC,CH")
+
+        bad_response = self.app.get('/api/retailers/export/?format=xml', expect_errors=True)
+        self.assertEqual(bad_response.status, "400 Bad Request")
+
+    def test_export_retailers_is_a_streaming_response(self) -> None:
+        """HTTP get request to export/ returns a StreamingHttpResponse that reads rows in chunks"""
+
+        response = Client().get('/api/retailers/export/')
+
+        self.assertTrue(response.streaming)
+        with patch('inventory.export.CHUNK_SIZE', 1):
+            chunks = list(Client().get('/api/retailers/export/').streaming_content)
+        self.assertEqual(len(chunks), 2)
+
+    def test_view_retailers_with_sparse_fields_returns_only_those_fields(self) -> None:
+        """HTTP get request with fields= returns only the requested fields, on every page"""
+
+        get_response = self.app.get('/api/retailers/?fields=id,name,latitude,longitude')
+        for retailer in get_response.json["results"]:
+            self.assertEqual(list(retailer), ["id", "name", "latitude", "longitude"])
+
+        # pages still follow when the cursor field (id) is not requested
+        first_page = self.app.get('/api/retailers/?fields=name&page_size=1')
+        second_page = self.app.get(first_page.json["next"])
+        self.assertEqual(second_page.json["results"], [{"name": self.retailer2_data["name"]}])
+
+        detail_response = self.app.get(f"/api/retailers/{self.retailer1_id}/?fields=name,city")
+        self.assertEqual(detail_response.json, {"name": self.retailer1_data["name"], "city": self.retailer1_data["city"]})
+
+    def test_view_retailers_with_expand_embeds_sodas(self) -> None:
+        """HTTP get request with expand=sodas embeds soda objects instead of hyperlinks, identically in list and detail"""
+
+        list_response = self.app.get('/api/retailers/?expand=sodas&fields=id,sodas')
+        retailer1 = list_response.json["results"][0]
+        self.assertEqual([soda["abbreviation"] for soda in retailer1["sodas"]], ["CH", "CC"])
+        self.assertEqual(retailer1["sodas"][0]["url"], self.soda_ch_url)
+
+        # the list (fast path) and detail (serializer over instances) render the same objects
+        detail_response = self.app.get(f"/api/retailers/{self.retailer1_id}/?expand=sodas&fields=id,sodas")
+        self.assertEqual(detail_response.json, retailer1)
+
+        nested_response = self.app.get(f"/api/sodas/{self.soda_cc_id}/retailers/?expand=sodas&fields=sodas")
+        self.assertEqual(nested_response.json[0], {"sodas": retailer1["sodas"]})
+
+    def test_view_retailers_with_expand_is_revalidated_when_soda_renamed(self) -> None:
+        """HTTP get request with expand=sodas returns 200, not 304, after an embedded soda changed"""
+
+        urls = ('/api/retailers/?expand=sodas', f'/api/retailers/{self.retailer1_id}/?expand=sodas')
+        first_responses = [self.app.get(url) for url in urls]
+        self.assertNotIn("Last-Modified", first_responses[1].headers)
+
+        self.app.patch_json(f'/api/sodas/{self.soda_ch_id}/', params={"name": "CherryCokeZeroSugar"})
+
+        for url, first_response in zip(urls, first_responses):
+            second_response = self.app.get(url, headers={"If-None-Match": first_response.headers["ETag"]})
+            self.assertEqual(second_response.status, "200 OK")
+            self.assertIn("CherryCokeZeroSugar", second_response.text)
+
+    def test_view_retailers_with_unknown_fields_or_expand_returns_400(self) -> None:
+        """HTTP get request naming unknown fields or relations returns 400"""
+
+        fields_response = self.app.get('/api/retailers/?fields=id,colour', expect_errors=True)
+        self.assertEqual(fields_response.status, "400 Bad Request")
+        self.assertIn("colour", fields_response.json["fields"])
+
+        expand_response = self.app.get(f"/api/retailers/{self.retailer1_id}/?expand=owner", expect_errors=True)
+        self.assertEqual(expand_response.status, "400 Bad Request")
+
+    def test_create_retailer_ignores_sparse_fields(self) -> None:
+        """HTTP post request with fields= still accepts and returns every field"""
+
+        post_response = self.app.post_json(
+            '/api/retailers/?fields=id',
+            params={"name": "new", "street_address": "1 New Street", "city": "Oakland", "sodas": [self.soda_ch_url]},
+        )
+        self.assertEqual(post_response.status, "201 Created")
+        self.assertEqual(post_response.json["sodas"], [self.soda_ch_url])
+
+    def test_view_retailers_in_columnar_format_returns_parallel_arrays(self) -> None:
+        """HTTP get request with format=columnar returns one array per field and a soda dictionary, honouring filters"""
+
+        get_response = self.app.get('/api/retailers/?format=columnar')
+        data = get_response.json
+        self.assertEqual(data["count"], 2)
+        self.assertEqual(data["id"], [self.retailer1_id, self.retailer2_id])
+        self.assertEqual(data["name"], [self.retailer1_data["name"], self.retailer2_data["name"]])
+        self.assertEqual(len(data["latitude"]), 2)
+        self.assertEqual(len(data["longitude"]), 2)
+
+        # decoding retailer 1's mask with the soda dictionary gives its sodas
+        soda_by_bit = dict(zip(data["sodas"]["bit_index"], data["sodas"]["abbreviation"]))
+        retailer1_sodas = {abbreviation for bit, abbreviation in soda_by_bit.items() if data["soda_mask"][0] & (1 << bit)}
+        self.assertEqual(retailer1_sodas, {"CH", "CC"})
+        self.assertEqual(set(data["sodas"]["abbreviation"]), {"CH", "CC", "VZ"})
+
+        filtered_response = self.app.get('/api/retailers/?format=columnar&postcode=10003')
+        self.assertEqual(filtered_response.json["id"], [self.retailer2_id])
+
+    def test_view_retailers_in_columnar_format_is_paginated_by_cursor(self) -> None:
+        """HTTP get request with format=columnar returns pages of page_size retailers, linked by cursor"""
+
+        first_page = self.app.get('/api/retailers/?format=columnar&page_size=1').json
+        self.assertEqual(first_page["count"], 1)
+        self.assertEqual(first_page["id"], [self.retailer1_id])
+        self.assertIsNone(first_page["previous"])
+        self.assertIn("format=columnar", first_page["next"])
+
+        second_page = self.app.get(first_page["next"]).json
+        self.assertEqual(second_page["id"], [self.retailer2_id])
+        self.assertEqual(len(second_page["sodas"]["id"]), 3)
+        self.assertIsNone(second_page["next"])
+        self.assertIsNotNone(second_page["previous"])
+
+    def test_view_retailers_in_columnar_format_etag_changes_when_soda_renamed(self) -> None:
+        """HTTP get request with format=columnar is revalidated when only the soda dictionary changes"""
+
+        first_response = self.app.get('/api/retailers/?format=columnar')
+        self.app.patch_json(f'/api/sodas/{self.soda_ch_id}/', params={"name": "CherryCokeZeroSugar"})
+
+        second_response = self.app.get('/api/retailers/?format=columnar', headers={"If-None-Match": first_response.headers["ETag"]})
+        self.assertEqual(second_response.status, "200 OK")
+        self.assertIn("CherryCokeZeroSugar", second_response.json["sodas"]["name"])
+
+    def test_view_retailer_by_id_in_columnar_format_returns_404(self) -> None:
+        """HTTP get request with format=columnar is only offered on the retailer list"""
+
+        get_response = self.app.get(f'/api/retailers/{self.retailer1_id}/?format=columnar', expect_errors=True)
+        self.assertEqual(get_response.status, "404 Not Found")
+
+    @override_settings(INVENTORY_CHANGES_SETTLE_SECONDS=0)
+    def test_view_retailer_changes_returns_updates_and_deletions_since_cursor(self) -> None:
+        """HTTP get request to the change feed returns everything first, then only what changed since the cursor"""
+
+        initial_response = self.app.get('/api/retailers/changes/')
+        self.assertEqual([retailer["id"] for retailer in initial_response.json["changed"]], [self.retailer1_id, self.retailer2_id])
+        self.assertEqual(initial_response.json["deleted"], [])
+        self.assertFalse(initial_response.json["has_more"])
+
+        cursor = initial_response.json["cursor"]
+        self.assertEqual(self.app.get(f'/api/retailers/changes/?since={cursor}').json["changed"], [])
+
+        self.app.patch_json(f'/api/retailers/{self.retailer1_id}/', params={"city": "Oakland"})
+        self.app.delete(f'/api/retailers/{self.retailer2_id}/')
+
+        changes_response = self.app.get(f'/api/retailers/changes/?since={cursor}')
+        self.assertEqual([retailer["city"] for retailer in changes_response.json["changed"]], ["Oakland"])
+        self.assertEqual(changes_response.json["deleted"], [self.retailer2_id])
+
+        next_response = self.app.get(f'/api/retailers/changes/?since={changes_response.json["cursor"]}')
+        self.assertEqual((next_response.json["changed"], next_response.json["deleted"]), ([], []))
+
+    @override_settings(INVENTORY_CHANGES_SETTLE_SECONDS=0)
+    def test_view_retailer_changes_pages_with_limit(self) -> None:
+        """HTTP get request to the change feed with limit returns one page at a time until has_more is false"""
+
+        first_page = self.app.get('/api/retailers/changes/?limit=1')
+        self.assertEqual([retailer["id"] for retailer in first_page.json["changed"]], [self.retailer1_id])
+        self.assertTrue(first_page.json["has_more"])
+
+        second_page = self.app.get(f'/api/retailers/changes/?limit=1&since={first_page.json["cursor"]}')
+        self.assertEqual([retailer["id"] for retailer in second_page.json["changed"]], [self.retailer2_id])
+        self.assertFalse(second_page.json["has_more"])
+
+    def test_view_retailer_changes_waits_for_settle_window(self) -> None:
+        """HTTP get request to the change feed does not report rows written within the settle window"""
+
+        get_response = self.app.get('/api/retailers/changes/')
+        self.assertEqual(get_response.json["changed"], [])
+
+    def test_view_retailer_changes_with_invalid_cursor_returns_400(self) -> None:
+        """HTTP get request to the change feed with a malformed cursor returns 400"""
+
+        get_response = self.app.get('/api/retailers/changes/?since=not-a-cursor', expect_errors=True)
+        self.assertEqual(get_response.status, "400 Bad Request")
+        self.assertIn("since", get_response.json)
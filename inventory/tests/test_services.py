@@ -1,10 +1,15 @@
 import requests
 
+from datetime import timedelta
 from decimal import Decimal
+from django.conf import settings
 from django.test import TestCase
+from django.utils import timezone
 from unittest.mock import Mock, patch
 
-from inventory.services.geocoding import GeocodingResult, GeocodingService
+from inventory.models import GeocodingCacheEntry
+from inventory.services.geocoding import GeocodingResult, GeocodingService, get_http_session
+from inventory.services.geocoding_cache import CachedGeocode, CachedGeocodingService, GeocodingCache, LRUCache
 from inventory.services.exceptions import (
     GeocodingAPIError,
     GeocodingNetworkError,
@@ -29,7 +34,7 @@ class GeocodingServiceTest(TestCase):
         self.service = GeocodingService(api_key="test-api-key")
 
     @patch("inventory.services.geocoding.logger")
-    @patch("inventory.services.geocoding.requests.get")
+    @patch("inventory.services.geocoding.requests.Session.get")
     def test_geocode_service_correctly_packages_api_responses(self, mock_get: Mock, mock_logger: Mock) -> None:
         mock_response = Mock()
         mock_response.json.return_value = self._build_mock_api_response()
@@ -48,7 +53,7 @@ class GeocodingServiceTest(TestCase):
         )
 
     @patch("inventory.services.geocoding.logger")
-    @patch("inventory.services.geocoding.requests.get")
+    @patch("inventory.services.geocoding.requests.Session.get")
     def test_timeout_raises_network_error(self, mock_get: Mock, mock_logger: Mock) -> None:
         mock_get.side_effect = requests.exceptions.Timeout()
 
@@ -61,7 +66,7 @@ class GeocodingServiceTest(TestCase):
         )
 
     @patch("inventory.services.geocoding.logger")
-    @patch("inventory.services.geocoding.requests.get")
+    @patch("inventory.services.geocoding.requests.Session.get")
     def test_request_exception_raises_network_error(self, mock_get: Mock, mock_logger: Mock) -> None:
         mock_get.side_effect = requests.exceptions.RequestException("Connection failed")
 
@@ -74,7 +79,7 @@ class GeocodingServiceTest(TestCase):
         )
 
     @patch("inventory.services.geocoding.logger")
-    @patch("inventory.services.geocoding.requests.get")
+    @patch("inventory.services.geocoding.requests.Session.get")
     def test_api_error_status_raises_api_error(self, mock_get: Mock, mock_logger: Mock) -> None:
         mock_response = Mock()
         mock_response.json.return_value = self._build_mock_api_response(status="REQUEST_DENIED", results=[])
@@ -86,7 +91,7 @@ class GeocodingServiceTest(TestCase):
         mock_logger.error.assert_called_once_with("Geocoding API error: %s", "REQUEST_DENIED")
 
     @patch("inventory.services.geocoding.logger")
-    @patch("inventory.services.geocoding.requests.get")
+    @patch("inventory.services.geocoding.requests.Session.get")
     def test_empty_results_raises_no_results_error(self, mock_get: Mock, mock_logger: Mock) -> None:
         mock_response = Mock()
         mock_response.json.return_value = self._build_mock_api_response(status="OK", results=[])
@@ -97,7 +102,7 @@ class GeocodingServiceTest(TestCase):
 
         mock_logger.warning.assert_called_once_with("No geocoding results for this address")
 
-    @patch("inventory.services.geocoding.requests.get")
+    @patch("inventory.services.geocoding.requests.Session.get")
     def test_missing_postcode_returns_none(self, mock_get: Mock) -> None:
         mock_response = Mock()
         mock_response.json.return_value = self._build_mock_api_response(
@@ -119,6 +124,51 @@ class GeocodingServiceTest(TestCase):
         self.assertIsInstance(result, GeocodingResult)
         self.assertIsNone(result.postcode)
 
+    @patch("inventory.services.geocoding.time.sleep")
+    @patch("inventory.services.geocoding.requests.Session.get")
+    def test_over_query_limit_is_retried_then_succeeds(self, mock_get: Mock, mock_sleep: Mock) -> None:
+        over_limit_response = Mock()
+        over_limit_response.json.return_value = self._build_mock_api_response(status="OVER_QUERY_LIMIT", results=[])
+        ok_response = Mock()
+        ok_response.json.return_value = self._build_mock_api_response()
+        mock_get.side_effect = [over_limit_response, ok_response]
+
+        result = self._call_geocode_service()
+
+        self.assertEqual(result.postcode, self.SAMPLE_RETAILER_DATA["postcode"])
+        self.assertEqual(mock_get.call_count, 2)
+        mock_sleep.assert_called_once()
+        self.assertLessEqual(mock_sleep.call_args.args[0], GeocodingService.RETRY_BACKOFF_BASE)
+
+    @patch("inventory.services.geocoding.time.sleep")
+    @patch("inventory.services.geocoding.requests.Session.get")
+    def test_server_error_is_retried_until_max_retries(self, mock_get: Mock, mock_sleep: Mock) -> None:
+        server_error_response = requests.Response()
+        server_error_response.status_code = 503
+        mock_get.return_value = server_error_response
+
+        with self.assertRaises(GeocodingNetworkError):
+            self._call_geocode_service()
+
+        self.assertEqual(mock_get.call_count, GeocodingService.DEFAULT_MAX_RETRIES + 1)
+        self.assertEqual(mock_sleep.call_count, GeocodingService.DEFAULT_MAX_RETRIES)
+
+    @patch("inventory.services.geocoding.requests.Session.get")
+    def test_client_error_is_not_retried(self, mock_get: Mock) -> None:
+        client_error_response = requests.Response()
+        client_error_response.status_code = 400
+        mock_get.return_value = client_error_response
+
+        with self.assertRaises(GeocodingNetworkError):
+            self._call_geocode_service()
+
+        mock_get.assert_called_once()
+
+    def test_http_session_is_shared_across_instances(self) -> None:
+        self.assertIs(get_http_session(), get_http_session())
+        adapter = get_http_session().get_adapter(GeocodingService.GOOGLE_MAPS_GEOCODE_URL)
+        self.assertEqual(adapter._pool_maxsize, settings.GEOCODING_HTTP_POOL_SIZE)
+
     def _build_mock_api_response(
             self,
             status: str = "OK",
@@ -142,4 +192,93 @@ class GeocodingServiceTest(TestCase):
         return self.service.geocode_address(
             street_address=self.SAMPLE_RETAILER_DATA["street_address"],
             city=self.SAMPLE_RETAILER_DATA["city"],
-        )
\ No newline at end of file
+        )
+
+class CachedGeocodingServiceTest(TestCase):
+    """Tests the two-tier geocoding cache. The underlying GeocodingService lookup is mocked."""
+
+    ADDRESS = {"street_address": "1305 SW 11th Avenue", "city": "Portland"}
+    RESULT = GeocodingResult(latitude=Decimal("45.5162468"), longitude=Decimal("-122.6857963"), postcode="97201")
+
+    def setUp(self) -> None:
+        self.memory_cache = LRUCache(max_entries=2)
+        self.service = CachedGeocodingService(api_key="test-api-key", cache=GeocodingCache(memory_cache=self.memory_cache))
+
+    @patch.object(GeocodingService, "geocode_address")
+    def test_repeated_address_is_served_from_cache(self, mock_geocode: Mock) -> None:
+        mock_geocode.return_value = self.RESULT
+
+        first = self.service.geocode_address(**self.ADDRESS)
+        second = self.service.geocode_address(street_address="1305  sw 11th avenue ", city="PORTLAND")
+
+        self.assertEqual(first, self.RESULT)
+        self.assertEqual(second, self.RESULT)
+        mock_geocode.assert_called_once()
+
+    @patch.object(GeocodingService, "geocode_address")
+    def test_database_tier_is_used_after_memory_tier_is_cleared(self, mock_geocode: Mock) -> None:
+        mock_geocode.return_value = self.RESULT
+        self.service.geocode_address(**self.ADDRESS)
+        self.memory_cache.clear()
+
+        result = self.service.geocode_address(**self.ADDRESS)
+
+        self.assertEqual(result, self.RESULT)
+        mock_geocode.assert_called_once()
+        self.assertEqual(GeocodingCacheEntry.objects.get().address_key, "1305 sw 11th avenue, portland")
+
+    @patch.object(GeocodingService, "geocode_address")
+    def test_no_results_is_negatively_cached(self, mock_geocode: Mock) -> None:
+        mock_geocode.side_effect = GeocodingNoResultsError()
+
+        for _ in range(2):
+            with self.assertRaises(GeocodingNoResultsError):
+                self.service.geocode_address(**self.ADDRESS)
+
+        mock_geocode.assert_called_once()
+        self.assertTrue(GeocodingCacheEntry.objects.get().is_negative)
+
+    @patch.object(GeocodingService, "geocode_address")
+    def test_network_errors_are_not_cached(self, mock_geocode: Mock) -> None:
+        mock_geocode.side_effect = GeocodingNetworkError()
+
+        for _ in range(2):
+            with self.assertRaises(GeocodingNetworkError):
+                self.service.geocode_address(**self.ADDRESS)
+
+        self.assertEqual(mock_geocode.call_count, 2)
+        self.assertFalse(GeocodingCacheEntry.objects.exists())
+
+    @patch.object(GeocodingService, "geocode_address")
+    def test_expired_entry_is_fetched_again(self, mock_geocode: Mock) -> None:
+        mock_geocode.return_value = self.RESULT
+        self.service.geocode_address(**self.ADDRESS)
+        self.memory_cache.clear()
+        GeocodingCacheEntry.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+
+        self.service.geocode_address(**self.ADDRESS)
+
+        self.assertEqual(mock_geocode.call_count, 2)
+
+    def test_delete_expired_removes_only_expired_entries(self) -> None:
+        cache = GeocodingCache(memory_cache=self.memory_cache)
+        cache.set("fresh", self.RESULT)
+        cache.set_negative("missed")
+        cache.set("stale", self.RESULT)
+        GeocodingCacheEntry.objects.exclude(address_key="fresh").update(expires_at=timezone.now() - timedelta(seconds=1))
+
+        self.assertEqual(cache.delete_expired(batch_size=1), 1)
+        self.assertEqual(cache.delete_expired(), 1)
+
+        self.assertEqual(list(GeocodingCacheEntry.objects.values_list("address_key", flat=True)), ["fresh"])
+
+    def test_lru_evicts_least_recently_used_entry(self) -> None:
+        cached = CachedGeocode(result=self.RESULT)
+        self.memory_cache.set("a", cached, ttl_seconds=60)
+        self.memory_cache.set("b", cached, ttl_seconds=60)
+        self.memory_cache.get("a")
+        self.memory_cache.set("c", cached, ttl_seconds=60)
+
+        self.assertIsNotNone(self.memory_cache.get("a"))
+        self.assertIsNone(self.memory_cache.get("b"))
+        self.assertEqual(len(self.memory_cache), 2)
@@ -1,8 +1,10 @@
 # using test.TestCase instead of unittest.TestCase to make sure tests run within the suite - not just in isolation
 from django.db import IntegrityError
 from django.test import TestCase
+from unittest.mock import patch
 
 from inventory.models import Retailer, Soda
+from inventory.soda_mask import next_free_bit_index
 
 
 class SodaDBTestCase(TestCase):
@@ -29,6 +31,17 @@ class SodaDBTestCase(TestCase):
         with self.assertRaises(IntegrityError):
             Soda.objects.create(name="CherryCokeZero2", abbreviation="CZ", low_calorie=False)
 
+    def test_soda_created_concurrently_with_another_takes_the_next_free_bit(self) -> None:
+        """A soda whose free bit was taken by a concurrent create is saved with another bit"""
+        taken_bit_index = Soda.objects.get(abbreviation="CZ").bit_index
+
+        # the first lookup answers as if the other create had not committed yet
+        with patch("inventory.signals.next_free_bit_index", side_effect=[taken_bit_index, next_free_bit_index()]):
+            soda = Soda.objects.create(name="Vanilla Coke Zero", abbreviation="VZ", low_calorie=True)
+
+        self.assertNotEqual(soda.bit_index, taken_bit_index)
+        self.assertEqual(Soda.objects.filter(bit_index=soda.bit_index).get(), soda)
+
     def test_database_retrieves_soda_by_retailer(self) -> None:
         """Sodas are retreived in a group by retailer"""
         retailer = Retailer.objects.create(name="Shell", street_address="598 Bryant Street", city="San Francisco", postcode="94107")
@@ -1,10 +1,16 @@
 # using test.TestCase instead of unittest.TestCase to make sure tests run within the suite - not just in isolation
-from django_webtest import WebTest
-
+from django_webtest import TransactionWebTest
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from inventory.models import Soda
+from inventory.serializers import SodaSerializer
+from inventory.soda_mask import MAX_SODAS
 from inventory.tests.types import SodaTestFormData
 
 
-class SodaWebTestCase(WebTest):
+class SodaWebTestCase(TransactionWebTest):
     csrf_checks = False
 
     soda_ch_data: SodaTestFormData = {
@@ -31,13 +37,38 @@ class SodaWebTestCase(WebTest):
         self.assertEqual(get_response.status, "200 OK")
 
         # verify content
-        response_data = get_response.json
+        response_data = get_response.json["results"]
         self.assertEqual(len(response_data), 2)
 
         result_names = [soda["name"] for soda in response_data]
         self.assertIn(self.soda_ch_data["name"], result_names)
         self.assertIn(self.soda_cc_data["name"], result_names)
 
+    def test_view_sodas_fast_list_matches_regular_serializer_output(self) -> None:
+        """HTTP get request for the list renders exactly the bytes of SodaSerializer over model instances"""
+
+        get_response = self.app.get('/api/sodas/')
+
+        request = Request(APIRequestFactory().get('/api/sodas/'))
+        serializer = SodaSerializer(Soda.objects.order_by('id'), many=True, context={'request': request})
+        expected = JSONRenderer().render({"next": None, "previous": None, "results": serializer.data})
+
+        self.assertEqual(get_response.body, expected)
+
+    def test_view_sodas_with_matching_etag_returns_304(self) -> None:
+        """HTTP get request with If-None-Match returns 304 until a soda changes"""
+
+        etag = self.app.get('/api/sodas/').headers["ETag"]
+
+        get_response = self.app.get('/api/sodas/', headers={"If-None-Match": etag})
+        self.assertEqual(get_response.status, "304 Not Modified")
+
+        soda_url = self.post_soda_ch.json["url"]
+        self.app.patch_json(soda_url, params={"name": "CherryCokeZeroSugar"})
+
+        get_response = self.app.get('/api/sodas/', headers={"If-None-Match": etag})
+        self.assertEqual(get_response.status, "200 OK")
+
     def test_view_all_sodas_by_retailer_filters_correctly(self) -> None:
         """HTTP get request with retailer ID and 'sodas' in params retrieves all sodas associated with that retailer"""
 
@@ -154,6 +185,22 @@ class SodaWebTestCase(WebTest):
 
         self.assertEqual(post_response.status, "400 Bad Request")
 
+    def test_create_soda_beyond_soda_mask_capacity_fails(self) -> None:
+        """HTTP post request for a soda when every soda mask bit is taken returns 400"""
+
+        taken = set(Soda.objects.values_list("bit_index", flat=True))
+        Soda.objects.bulk_create([Soda(name=f"Soda {bit_index}", abbreviation=f"{bit_index:02d}", bit_index=bit_index)
+                                  for bit_index in range(MAX_SODAS) if bit_index not in taken])
+
+        post_response = self.app.post_json(
+            '/api/sodas/', params={"abbreviation": "SC", "low_calorie": "True", "name": "Sour Cherry Coke"},
+            expect_errors=True,
+        )
+
+        self.assertEqual(post_response.status, "400 Bad Request")
+        self.assertIn("No free soda bit is left in the retailer soda mask.", post_response.json)
+        self.assertFalse(Soda.objects.filter(name="Sour Cherry Coke").exists())
+
     def test_delete_soda_succeeds(self) -> None:
         """HTTP delete request removes soda"""
 
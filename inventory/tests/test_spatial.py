@@ -0,0 +1,35 @@
+from django.test import SimpleTestCase
+
+from inventory.spatial import (
+    bounding_box_for_radius,
+    encode_geohash,
+    geohash_cells_covering,
+    haversine_km,
+)
+
+
+class SpatialIndexTestCase(SimpleTestCase):
+    """Tests the geohash grid helpers used by the nearby retailer search."""
+
+    def test_encode_geohash_matches_reference_value(self) -> None:
+        # reference value from the original geohash specification
+        self.assertEqual(encode_geohash(57.64911, 10.40744, precision=11), "u4pruydqqvj")
+
+    def test_covering_cells_contain_every_point_in_radius(self) -> None:
+        center_lat, center_lng, radius_km = 37.7749, -122.4194, 3.0
+        cells = geohash_cells_covering(bounding_box_for_radius(center_lat, center_lng, radius_km))
+
+        self.assertTrue(0 < len(cells) <= 4)
+        for delta_lat, delta_lng in [(0.0, 0.0), (0.026, 0.0), (-0.026, 0.0), (0.0, 0.033), (0.0, -0.033)]:
+            point_hash = encode_geohash(center_lat + delta_lat, center_lng + delta_lng)
+            self.assertTrue(any(point_hash.startswith(cell) for cell in cells))
+
+    def test_covering_cells_empty_when_box_crosses_antimeridian(self) -> None:
+        bbox = bounding_box_for_radius(0.0, 179.99, 5.0)
+
+        self.assertTrue(bbox.crosses_antimeridian)
+        self.assertEqual(geohash_cells_covering(bbox), [])
+
+    def test_haversine_distance_between_known_cities(self) -> None:
+        # San Francisco to Los Angeles is ~559km great-circle distance
+        self.assertAlmostEqual(haversine_km(37.7749, -122.4194, 34.0522, -118.2437), 559, delta=2)
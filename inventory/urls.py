@@ -2,7 +2,7 @@
 from django.urls import path, include
 from rest_framework import routers
 
-from . import views
+from . import events, views
 
 
 router = routers.DefaultRouter()
@@ -10,8 +10,11 @@ router.register(r'retailers', views.RetailerViewSet, basename='retailer') # adde
 router.register(r'sodas', views.SodaViewSet)
 
 urlpatterns = [
+    path('retailers/export/', views.export_retailers),
+    path('retailers/events/', events.retailer_events),
     path('retailers/<int:pk>/sodas/', views.sodas_by_retailer),
     path('sodas/<int:pk>/retailers/', views.retailers_by_sodas),
+    path('availability/', views.availability),
     path('', include(router.urls)),
     path('api-auth/', include('rest_framework.urls', namespace='rest_framework')),
 ]
@@ -1,65 +1,367 @@
-from django.db.models import QuerySet
+import heapq
+import math
+
+from django.db.models import Prefetch, Q, QuerySet
+from django.http import HttpRequest, JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.views.decorators.http import require_GET
 from rest_framework import viewsets
-from rest_framework.decorators import api_view
+from rest_framework.decorators import action, api_view
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import JSONParser
 from rest_framework.request import Request
 from rest_framework.response import Response
 
-from .models import Retailer, Soda
-from .serializers import RetailerSerializer, SodaSerializer
+from .caching import CachedReadMixin, cache_read_response
+from .changes import ChangeCursor, initial_cursor, read_changes
+from .columnar import ColumnarListMixin, is_columnar
+from .conditional import ConditionalGetMixin, Validators, combined_validators, content_validators
+from .documents import DocumentReadMixin
+from .export import EXPORT_FORMATS
+from .models import AvailabilityRollup, Retailer, Soda
+from .pagination import IdCursorPagination
+from .parsers import NDJSONParser
+from .serializers import AvailabilitySerializer, RetailerBulkSerializer, RetailerSerializer, SodaSerializer
+from .services.bulk_import import upsert_retailers
+from .soda_mask import filter_by_soda_mask, mask_for_bits
+from .spatial import BoundingBox, bounding_box_for_radius, geohash_cells_covering, haversine_km
+
+NEARBY_DEFAULT_RADIUS_KM = 5.0
+NEARBY_MAX_RADIUS_KM = 100.0
+NEARBY_DEFAULT_LIMIT = 50
+NEARBY_MAX_LIMIT = 500
+
+SODA_MATCH_ALL = 'all'
+SODA_MATCH_ANY = 'any'
+
+SODA_VALIDATOR_FIELDS = ('id', 'name', 'abbreviation', 'low_calorie')
+
+BULK_MAX_RETAILERS = 5000
+
+CHANGES_DEFAULT_LIMIT = 500
+CHANGES_MAX_LIMIT = 1000
+
+
+class FastListMixin:
+    """
+    ViewSet mixin that lists `.values()` rows rendered by the serializer's FastReadMixin instead of
+    serializing model instances. Responses are identical to the regular list.
+    """
+
+    def list(self, request: Request, *args, **kwargs) -> Response:
+        serializer = self.get_serializer()
+        # cursor pagination reads each row's position from 'id', even when ?fields= leaves it out
+        columns = dict.fromkeys([*serializer.values_fields(), 'id'])
+        queryset = self.filter_queryset(self.get_queryset()).prefetch_related(None).values(*columns)
+
+        page = self.paginate_queryset(queryset)
+        if page is None:
+            return Response(serializer.represent_rows(list(queryset)))
+        return self.get_paginated_response(serializer.represent_rows(page))
 
 
-class RetailerViewSet(viewsets.ModelViewSet[Retailer]):
+class RetailerViewSet(
+    ConditionalGetMixin,
+    CachedReadMixin,
+    ColumnarListMixin,
+    DocumentReadMixin,
+    FastListMixin,
+    viewsets.ModelViewSet[Retailer],
+):
     """
     API endpoint that allows retailers to be viewed or edited.
+    The list is also available as parallel arrays for map clients with ?format=columnar (see inventory.columnar).
+    Plain JSON reads are served from stored retailer documents (see inventory.documents).
     """
 
     serializer_class = RetailerSerializer
+    pagination_class = IdCursorPagination
     # queryset = Retailer.objects.all()
 
     def get_queryset(self) -> QuerySet[Retailer]:
-        queryset = Retailer.objects.prefetch_related('sodas')
+        # sodas are ordered by id, as FastListMixin renders them
+        queryset = Retailer.objects.prefetch_related(Prefetch('sodas', queryset=Soda.objects.order_by('id')))
         post_code = self.request.query_params.get('postcode', None)
         sodas= self.request.query_params.get('sodas', None)
+        bbox = self.request.query_params.get('bbox', None)
 
         if post_code is not None:
             queryset = queryset.filter(postcode=post_code)
 
+        if bbox is not None:
+            queryset = _filter_by_bounding_box(queryset, _parse_bbox_param(bbox))
+
         if sodas is not None:
-            soda_abbrevs = sodas.split(",")
-            for abbrev in soda_abbrevs:
-                queryset = queryset.filter(sodas__abbreviation=abbrev)
-            queryset = queryset.distinct()
+            match = self.request.query_params.get('match', SODA_MATCH_ALL)
+            queryset = _filter_by_sodas(queryset, sodas.split(","), match)
 
         return queryset
 
+    def get_list_validators(self, request: Request) -> Validators:
+        validators = super().get_list_validators(request)
+        if is_columnar(request) or 'expand' in request.query_params:
+            return combined_validators(request, validators, _soda_validators(request))
+        return validators
+
+    def get_detail_validators(self, request: Request) -> Validators | None:
+        validators = super().get_detail_validators(request)
+        if validators is not None and 'expand' in request.query_params:
+            return combined_validators(request, validators, _soda_validators(request))
+        return validators
+
+    @action(detail=False, methods=['get'])
+    def nearby(self, request: Request) -> Response:
+        """
+        API endpoint that lists retailers within radius_km of (lat, lng), nearest first.
+        Accepts the same postcode and sodas filters as the retailer list.
+        """
+        latitude = _parse_float_param(request, 'lat', minimum=-90, maximum=90)
+        longitude = _parse_float_param(request, 'lng', minimum=-180, maximum=180)
+        radius_km = _parse_float_param(
+            request, 'radius_km', default=NEARBY_DEFAULT_RADIUS_KM, minimum=0, maximum=NEARBY_MAX_RADIUS_KM
+        )
+        limit = int(_parse_float_param(request, 'limit', default=NEARBY_DEFAULT_LIMIT, minimum=1, maximum=NEARBY_MAX_LIMIT))
+
+        bbox = bounding_box_for_radius(latitude, longitude, radius_km)
+        queryset = _filter_by_bounding_box(self.get_queryset(), bbox)
 
-class SodaViewSet(viewsets.ModelViewSet[Soda]):
+        # restrict the scan to the index ranges of the geohash cells around the search area
+        cells = geohash_cells_covering(bbox)
+        if cells:
+            cell_filter = Q()
+            for cell in cells:
+                cell_filter |= Q(geohash__startswith=cell)
+            queryset = queryset.filter(cell_filter)
+
+        # rank on coordinates alone, then load and render only the retailers returned
+        in_radius = []
+        for retailer_id, retailer_latitude, retailer_longitude in (queryset
+                                                                   .prefetch_related(None)
+                                                                   .values_list('id', 'latitude', 'longitude')):
+            distance_km = haversine_km(latitude, longitude, float(retailer_latitude), float(retailer_longitude))
+            if distance_km <= radius_km:
+                in_radius.append((distance_km, retailer_id))
+        nearest_ids = [retailer_id for _, retailer_id in heapq.nsmallest(limit, in_radius)]
+
+        serializer = self.get_serializer()
+        rows_by_id = {row['pk']: row for row in (Retailer.objects
+                                                 .filter(id__in=nearest_ids)
+                                                 .values(*serializer.values_fields()))}
+        return Response(serializer.represent_rows([rows_by_id[retailer_id] for retailer_id in nearest_ids]))
+
+    @action(detail=False, methods=['get'])
+    def changes(self, request: Request) -> Response:
+        """
+        API endpoint that lists retailers created or updated, and the ids of retailers deleted, since the
+        `since` cursor (omit it to start a replica). Pass the returned cursor as `since` on the next request.
+        The list filters do not apply: a replica of a filtered list could not tell when a retailer leaves it.
+        """
+        raw_cursor = request.query_params.get('since')
+        try:
+            cursor = ChangeCursor.decode(raw_cursor) if raw_cursor else initial_cursor()
+        except ValueError:
+            raise ValidationError({'since': "Invalid cursor."})
+        limit = int(_parse_float_param(request, 'limit', default=CHANGES_DEFAULT_LIMIT, minimum=1, maximum=CHANGES_MAX_LIMIT))
+
+        serializer = self.get_serializer()
+        page = read_changes(cursor, limit, serializer.values_fields())
+        return Response({
+            'changed': serializer.represent_rows(page.rows),
+            'deleted': page.deleted_ids,
+            'cursor': page.cursor.encode(),
+            'has_more': page.has_more,
+        })
+
+    @action(detail=False, methods=['post'], parser_classes=[JSONParser, NDJSONParser])
+    def bulk(self, request: Request) -> Response:
+        """
+        API endpoint that creates many retailers at once, or updates those with the same street_address.
+        Accepts a JSON array or NDJSON (Content-Type: application/x-ndjson, one retailer per line).
+        """
+        serializer = RetailerBulkSerializer(
+            data=request.data, many=True, max_length=BULK_MAX_RETAILERS, context={'request': request}
+        )
+        serializer.is_valid(raise_exception=True)
+
+        result = upsert_retailers(serializer.validated_data)
+        return Response({
+            'created': result.created,
+            'updated': result.updated,
+            'geocoding_queued': result.geocoding_queued,
+            'ids': result.retailer_ids,
+        })
+
+
+def _soda_validators(request: Request) -> Validators:
+    # the soda dictionary (?format=columnar) and expanded sodas (?expand=sodas) change without touching any retailer
+    soda_rows = Soda.objects.order_by('id').values_list(*SODA_VALIDATOR_FIELDS, 'bit_index')
+    return content_validators(request, soda_rows)
+
+
+def _filter_by_sodas(queryset: QuerySet[Retailer], abbreviations: list[str], match: str) -> QuerySet[Retailer]:
+    """
+    Restrict to retailers stocking all (or any) of the given sodas with one bitwise predicate on
+    Retailer.soda_mask, so the retailer-soda join table is not touched however many sodas are requested.
+    """
+
+    if match not in (SODA_MATCH_ALL, SODA_MATCH_ANY):
+        raise ValidationError({'match': f"Must be '{SODA_MATCH_ALL}' or '{SODA_MATCH_ANY}'."})
+
+    unique_abbreviations = {abbrev.strip().upper() for abbrev in abbreviations if abbrev.strip()}
+    bit_indexes = list(Soda.objects.filter(abbreviation__in=unique_abbreviations).values_list('bit_index', flat=True))
+
+    if not bit_indexes or (match == SODA_MATCH_ALL and len(bit_indexes) < len(unique_abbreviations)):
+        # an unknown soda cannot be stocked
+        return queryset.none()
+
+    return filter_by_soda_mask(queryset, mask_for_bits(bit_indexes), match_all=(match == SODA_MATCH_ALL))
+
+
+def _filter_by_bounding_box(queryset: QuerySet[Retailer], bbox: BoundingBox) -> QuerySet[Retailer]:
+    """Restrict to retailers inside the box using range lookups on the indexed coordinate columns."""
+
+    queryset = queryset.filter(latitude__range=(bbox.min_lat, bbox.max_lat))
+    if bbox.crosses_antimeridian:
+        return queryset.filter(Q(longitude__gte=bbox.min_lng) | Q(longitude__lte=bbox.max_lng))
+    return queryset.filter(longitude__range=(bbox.min_lng, bbox.max_lng))
+
+
+def _parse_bbox_param(raw_value: str) -> BoundingBox:
+    """
+    Parse 'min_lng,min_lat,max_lng,max_lat' (the GeoJSON bbox order used by map clients).
+    Raises ValidationError (HTTP 400) if malformed or out of range.
+    """
+
+    try:
+        min_lng, min_lat, max_lng, max_lat = (float(part) for part in raw_value.split(","))
+    except ValueError:
+        raise ValidationError({'bbox': "Expected four numbers: min_lng,min_lat,max_lng,max_lat."})
+
+    if not all(math.isfinite(value) for value in (min_lng, min_lat, max_lng, max_lat)):
+        raise ValidationError({'bbox': "Expected four numbers: min_lng,min_lat,max_lng,max_lat."})
+    if not (-90 <= min_lat <= max_lat <= 90):
+        raise ValidationError({'bbox': "Latitudes must be between -90 and 90 with min_lat <= max_lat."})
+    if not (-180 <= min_lng <= 180 and -180 <= max_lng <= 180):
+        raise ValidationError({'bbox': "Longitudes must be between -180 and 180."})
+
+    # min_lng > max_lng is allowed: the viewport crosses the antimeridian
+    return BoundingBox(min_lat=min_lat, min_lng=min_lng, max_lat=max_lat, max_lng=max_lng)
+
+
+def _parse_float_param(
+    request: Request,
+    name: str,
+    default: float | None = None,
+    minimum: float | None = None,
+    maximum: float | None = None,
+) -> float:
+    """Read a numeric query param. Raises ValidationError (HTTP 400) if missing, malformed or out of range."""
+
+    raw_value = request.query_params.get(name)
+    if raw_value is None:
+        if default is None:
+            raise ValidationError({name: "This query parameter is required."})
+        return default
+
+    try:
+        value = float(raw_value)
+    except ValueError:
+        raise ValidationError({name: "A valid number is required."})
+
+    if not math.isfinite(value):
+        raise ValidationError({name: "A valid number is required."})
+
+    if (minimum is not None and value < minimum) or (maximum is not None and value > maximum):
+        raise ValidationError({name: f"Must be between {minimum} and {maximum}."})
+    return value
+
+
+class SodaViewSet(ConditionalGetMixin, CachedReadMixin, FastListMixin, viewsets.ModelViewSet[Soda]):
     """
     API endpoint that allows sodas to be viewed or edited.
     """
     queryset = Soda.objects.all()
     serializer_class = SodaSerializer
+    pagination_class = IdCursorPagination
+
+    # sodas have no timestamp; the table is tiny, so validators hash the rows themselves
+    def get_list_validators(self, request: Request) -> Validators:
+        return content_validators(request, self.get_queryset().order_by('id').values_list(*SODA_VALIDATOR_FIELDS))
+
+    def get_detail_validators(self, request: Request) -> Validators | None:
+        rows = list(self.get_lookup_queryset().values_list(*SODA_VALIDATOR_FIELDS))
+        return content_validators(request, rows) if rows else None
 
 
 @api_view(['GET'])
+@cache_read_response
 def sodas_by_retailer(request: Request, pk: int) -> Response:
     """
     API endpoint that shows sodas filtered by retailer.
     """
-    retailer = get_object_or_404(Retailer, id=pk)
-    retailer_sodas = retailer.sodas.all()
+    retailer_sodas = Soda.objects.filter(retailer=pk).order_by('id')
+    if not retailer_sodas:
+        # only an empty result needs to tell "no sodas" from "no such retailer"
+        get_object_or_404(Retailer, id=pk)
     serializer_context = {'request': request}
     serializer = SodaSerializer(retailer_sodas, many=True, context=serializer_context)
     return Response(serializer.data)
 
 @api_view(['GET'])
+@cache_read_response
 def retailers_by_sodas(request: Request, pk: int) -> Response:
     """
     API endpoint that shows retailers filtered by soda.
     """
-    soda = get_object_or_404(Soda, id=pk)
-    soda_retailers = soda.retailer_set.all()
+    soda_retailers = (Retailer.objects
+                      .filter(sodas=pk)
+                      .order_by('id')
+                      .prefetch_related(Prefetch('sodas', queryset=Soda.objects.order_by('id'))))
+    if not soda_retailers:
+        get_object_or_404(Soda, id=pk)
     serializer_context = {'request': request}
     serializer = RetailerSerializer(soda_retailers, context=serializer_context, many=True)
     return Response(serializer.data)
+
+
+@api_view(['GET'])
+@cache_read_response
+def availability(request: Request) -> Response:
+    """
+    API endpoint that shows how many retailers stock each soda in one postcode, city or country
+    (exactly one of those query params), read from the precomputed rollups (see inventory.availability).
+    """
+    given = [level for level in AvailabilityRollup.Level.values if level in request.query_params]
+    if len(given) != 1:
+        raise ValidationError({'detail': f"Exactly one of {', '.join(AvailabilityRollup.Level.values)} is required."})
+
+    level = given[0]
+    key = request.query_params[level].strip()
+    if level == AvailabilityRollup.Level.POSTCODE:
+        # postcodes are stored as integers and keyed as their decimal form (see inventory.availability)
+        try:
+            key = str(int(key))
+        except ValueError:
+            raise ValidationError({level: "A valid integer is required."})
+    rollups = (AvailabilityRollup.objects
+               .filter(level=level, key=key, retailer_count__gt=0)
+               .select_related('soda')
+               .order_by('soda_id'))
+    serializer = AvailabilitySerializer(rollups, many=True, context={'request': request})
+    return Response({'level': level, 'key': key, 'sodas': serializer.data})
+
+
+@require_GET
+def export_retailers(request: HttpRequest) -> StreamingHttpResponse | JsonResponse:
+    """
+    Endpoint that streams every retailer with its soda abbreviations, as NDJSON (default) or CSV (?format=csv).
+    A plain Django view: DRF would buffer the whole rendered body and reserves the `format` param.
+    """
+    export_format = request.GET.get('format', 'ndjson')
+    if export_format not in EXPORT_FORMATS:
+        return JsonResponse({'format': [f"Must be one of: {', '.join(EXPORT_FORMATS)}."]}, status=400)
+
+    generate, content_type = EXPORT_FORMATS[export_format]
+    response = StreamingHttpResponse(generate(), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="retailers.{export_format}"'
+    return response